@@ -1,21 +1,210 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, g, url_for
 from dotenv import load_dotenv
+from werkzeug.exceptions import ServiceUnavailable
 import sys
 import os
+import atexit
+import functools
+import contextvars
+import queue
+from concurrent.futures import Future
 from datetime import datetime
 
 # Add parent directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from game import RPGGame, Character, Item, GroqEngine
+from game import RPGGame, Character, Item, GroqEngine, RULES_DIR
+from rules_watcher import RulesWatcher
+from narration import NarrationQueue
+from autosave import AutosaveService
+from save_store import SaveStore
+from session_registry import SessionRegistry, new_session_id, is_valid_session_id
+from session_actors import SessionActors
+from jobs import JobQueue, PENDING
 
 app = Flask(__name__)
 
-# Initialize Groq engine and game
+# Initialize Groq engine
 groq_engine = GroqEngine()
-game = RPGGame(groq_engine=groq_engine, save_dir="saves")
+# Saves go to SQLite instead of JSON files when RPG_SAVE_DB names a database file
+load_dotenv()
+save_db = os.getenv('RPG_SAVE_DB')
+save_store = SaveStore(save_db) if save_db else None
+
+# Combat narration runs in the background so attack results aren't held up by the LLM
+narration_queue = NarrationQueue(max_workers=2, max_pending=8)
+NARRATION_TIMEOUT = 8.0  # Seconds to keep the stream open waiting for narration
+
+# Commands are autosaved in the background once the player pauses; pending
+# autosaves are written out when the server stops
+autosaver = AutosaveService()
+atexit.register(autosaver.shutdown)
+
+# Every browser (or API client) gets its own game, with its own saves under
+# saves/sessions/<id>. Games not used lately are written to disk when memory
+# runs short (RPG_SESSION_BUDGET_MB) and come back on their next request.
+# At most RPG_MAX_STORED_SESSIONS sessions are kept on disk; ones unused for
+# as long as the session cookie lasts make room for new ones.
+SESSION_COOKIE = 'rpg_session'
+sessions = SessionRegistry(
+    lambda session_id: RPGGame(groq_engine=groq_engine, save_dir=os.path.join("saves", "sessions", session_id),
+                               store=save_store),
+    budget_bytes=int(os.getenv('RPG_SESSION_BUDGET_MB', '512')) * 1024 * 1024,
+    on_evict=autosaver.forget,
+    rules_dir_path=RULES_DIR,
+    sessions_dir=os.path.join("saves", "sessions"),
+    max_stored_sessions=int(os.getenv('RPG_MAX_STORED_SESSIONS', '10000')),
+)
+atexit.register(sessions.close)
+# Each session's requests run one at a time, in arrival order, on a shared
+# pool of RPG_SESSION_WORKERS threads; different sessions run in parallel.
+# Requests that wait on the LLM get a pool of RPG_LLM_WORKERS threads of their
+# own, and while one waits, its session's GET requests are answered meanwhile
+actors = SessionActors(sessions, max_workers=int(os.getenv('RPG_SESSION_WORKERS', '16')),
+                       max_slow_workers=int(os.getenv('RPG_LLM_WORKERS', '16')))
+atexit.register(actors.shutdown)  # Runs before sessions.close (atexit is last-in, first-out)
+# Slow endpoints (LLM calls) can answer at once with a job id instead of
+# holding a server thread; see in_session and /api/jobs
+jobs = JobQueue()
+JOB_KEEPALIVE = 15.0  # Seconds between keep-alive comments while a job's SSE channel waits
+
+# Pick up edits to the rule files in "Json Files" without restarting
+rules_watcher = RulesWatcher(sessions).start()
+
+@app.before_request
+def identify_session():
+    if not request.path.startswith('/api/'):
+        return
+    session_id = request.headers.get('X-Session-ID') or request.cookies.get(SESSION_COOKIE)
+    if not is_valid_session_id(session_id):
+        session_id = new_session_id()
+    if not sessions.admit(session_id):
+        return jsonify({"error": "The server is full; try again later"}), 503
+    g.session_id = session_id
+
+_STREAM_END = object()
+
+def _relay(chunks):
+    while True:
+        chunk = chunks.get()
+        if chunk is _STREAM_END:
+            return
+        if callable(chunk):
+            # A chunk the view left to be waited for here, off the actor (see in_session)
+            chunk = chunk()
+            if not chunk:
+                continue
+        yield chunk
+
+def deferrable(view):
+    """Mark a slow view that clients may run as a job (see in_session)."""
+    view.deferrable = True
+    return waits_on_llm(view)
+
+def waits_on_llm(view):
+    """Mark a view that calls the LLM, to run on the actors' slow workers (see SessionActors)."""
+    view.waits_on_llm = True
+    return view
+
+def timeline_control(view):
+    """Mark a view that moves the game through its own history (see in_session)."""
+    view.timeline_control = True
+    return view
+
+def _wants_job():
+    return 'respond-async' in request.headers.get('Prefer', '') or request.args.get('async') in ('1', 'true')
+
+def _job_result(response):
+    return response.status_code, response.get_json(silent=True) if response.is_json else response.get_data(as_text=True)
+
+def _answer_unanswered(head, task):
+    # run() answers head itself; this covers tasks that never got that far
+    # (the game could not be loaded, or the actors were shut down)
+    if not head.done():
+        error = None if task.cancelled() else task.exception()
+        head.set_exception(error or ServiceUnavailable("The server is shutting down"))
+
+def in_session(view):
+    """
+    Run a view on its session's actor (see SessionActors), with the session's
+    game in g.game. A streamed response is produced on the actor as well, and
+    only relayed to the client from the request thread, so nothing touches
+    the game outside the actor. A streamed view may also yield a callable
+    (that must not touch the game): the request thread calls it, e.g. to wait
+    on narration, and sends what it returns, while the actor goes on.
+
+    A deferrable view asked for with "Prefer: respond-async" (or ?async=1)
+    answers 202 with a job at once instead; its response is then collected
+    from /api/jobs/<id> or its SSE channel.
+
+    Views that wait on the LLM run on the actors' slow workers, and GET views
+    count as read-only: they run while the session waits on the LLM rather
+    than after it.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        head = Future()
+        chunks = queue.Queue()
+
+        def run(game):
+            try:
+                g.game = game
+                response = app.make_response(view(*args, **kwargs))
+                if not response.is_streamed:
+                    if request.method == 'POST' and response.status_code < 400:
+                        autosaver.request(game)
+                        # Every request that changed the game is a step undo can take back,
+                        # except loading, undoing and branching, which only move along the history
+                        if not getattr(view, 'timeline_control', False):
+                            game.timeline.checkpoint()
+                    head.set_result(response)
+                    return
+                body, response.response = response.response, _relay(chunks)
+                head.set_result(response)
+            except Exception as e:
+                head.set_exception(e)
+                return
+            try:
+                for chunk in body:
+                    chunks.put(chunk)
+            finally:
+                if hasattr(body, 'close'):
+                    body.close()
+                chunks.put(_STREAM_END)
+
+        # The view still reads request and g, so it runs in a copy of this thread's context
+        context = contextvars.copy_context()
+        session_id = g.session_id
+        slow = getattr(view, 'waits_on_llm', False)
+        read_only = request.method == 'GET'
+
+        def start():
+            task = actors.submit(session_id, lambda game: context.run(run, game), slow=slow, read_only=read_only)
+            task.add_done_callback(functools.partial(_answer_unanswered, head))
+            return head
+
+        if getattr(view, 'deferrable', False) and _wants_job():
+            # Read the body now: the request is over by the time the view runs
+            request.get_data()
+            job = jobs.submit(session_id, request.path, start, convert=_job_result)
+            if job is None:
+                return jsonify({"error": "Too many requests in progress; try again shortly"}), 503
+            return jsonify(job.to_dict()), 202, {'Location': url_for('get_job', job_id=job.id)}
+        return start().result()
+    return wrapper
+
+@app.after_request
+def remember_session(response):
+    if 'session_id' in g:
+        response.headers['X-Session-ID'] = g.session_id
+        if request.cookies.get(SESSION_COOKIE) != g.session_id:
+            response.set_cookie(SESSION_COOKIE, g.session_id, max_age=30 * 24 * 3600, httponly=True, samesite='Lax')
+    return response
 
 @app.route('/api/command', methods=['POST'])
+@in_session
+@deferrable
 def handle_command():
+    game = g.game
     if not game.current_player:
         return jsonify({"error": "No active game session"}), 400
         
@@ -35,27 +224,94 @@ def index():
     return render_template('index.html')
 
 @app.route('/api/save_game', methods=['POST'])
+@in_session
 def save_game():
+    game = g.game
     if not game.current_player:
         return jsonify({"error": "No active game to save"}), 400
         
     save_name = request.json.get('save_name', 'autosave')
-    result = game.save_game(save_name)
+    result = game.save_game(save_name, journal=bool(request.json.get('journal', False)),
+                            binary=bool(request.json.get('binary', False)),
+                            chunked=bool(request.json.get('chunked', False)))
     return jsonify({"message": result})
 
 @app.route('/api/load_game', methods=['POST'])
+@in_session
+@timeline_control
 def load_game():
+    game = g.game
     save_name = request.json.get('save_name', 'autosave')
+    # The loaded game replaces the one being autosaved; start over from it
+    autosaver.forget(game)
     result = game.load_game(save_name)
     return jsonify({"message": result})
 
+@app.route('/api/undo', methods=['POST'])
+@in_session
+@timeline_control
+def undo():
+    game = g.game
+    if not game.current_player:
+        return jsonify({"error": "No active game session"}), 400
+    try:
+        turns = int((request.json or {}).get('turns', 1))
+    except (TypeError, ValueError):
+        return jsonify({"error": "turns must be a number"}), 400
+    if turns < 1:
+        return jsonify({"error": "turns must be at least 1"}), 400
+    undone = game.timeline.undo(turns)
+    return jsonify({"undone": undone, "location": game.current_player.current_location})
+
+@app.route('/api/branches', methods=['GET'])
+@in_session
+def list_branches():
+    game = g.game
+    head = game.timeline.head
+    return jsonify({
+        "branches": [{"name": name, "current": snapshot is head, **snapshot.to_dict()}
+                     for name, snapshot in game.timeline.branches.items()],
+        "history": [snapshot.to_dict() for snapshot in game.timeline.history()],
+    })
+
+@app.route('/api/branch', methods=['POST'])
+@in_session
+@timeline_control
+def create_branch():
+    game = g.game
+    name = (request.json or {}).get('name')
+    if not name:
+        return jsonify({"error": "A branch name is required"}), 400
+    snapshot = game.timeline.branch(name)
+    if snapshot is None:
+        return jsonify({"error": "No active game session"}), 400
+    return jsonify({"name": name, **snapshot.to_dict()})
+
+@app.route('/api/switch_branch', methods=['POST'])
+@in_session
+@timeline_control
+def switch_branch():
+    game = g.game
+    name = (request.json or {}).get('name')
+    if not name:
+        return jsonify({"error": "A branch name is required"}), 400
+    try:
+        snapshot = game.timeline.checkout(name)
+    except KeyError:
+        return jsonify({"error": f"No branch named '{name}'"}), 404
+    return jsonify({"name": name, **snapshot.to_dict()})
+
 @app.route('/api/init_game', methods=['POST'])
+@in_session
 def init_game():
+    game = g.game
     game.initialize_game_data()
     return jsonify({"status": "success"})
 
 @app.route('/api/create_character', methods=['POST'])
+@in_session
 def create_character():
+    game = g.game
     data = request.json
     name = data.get('name')
     character_class = data.get('class')
@@ -64,6 +320,7 @@ def create_character():
         return jsonify({"error": "Name and class are required"}), 400
 
     try:
+        autosaver.forget(game)
         game.current_player = game.create_character(name, character_class)
         return jsonify({"status": "success", "character": {
             "name": game.current_player.name,
@@ -80,7 +337,9 @@ def create_character():
         return jsonify({"error": f"Failed to create character: {str(e)}"}), 500
 
 @app.route('/api/get_player_status', methods=['GET'])
+@in_session
 def get_player_status():
+    game = g.game
     if game.current_player:
         # Get equipped items
         equipment = {}
@@ -107,7 +366,9 @@ def get_player_status():
     return jsonify({"error": "No player created"}), 400
 
 @app.route('/api/get_enemy_status', methods=['GET'])
+@in_session
 def get_enemy_status():
+    game = g.game
     if game.current_enemy:
         return jsonify({
             "name": game.current_enemy.name,
@@ -115,9 +376,36 @@ def get_enemy_status():
         })
     return jsonify({"error": "No enemy in combat"}), 400
 
-from flask import Response, stream_with_context
+from flask import Response
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import json
 
+def _game_state_event(game):
+    return {
+        'type': 'game_state',
+        'content': {
+            'player': {
+                'name': game.current_player.name,
+                'health': game.current_player.hit_points,
+                'level': game.current_player.level,
+                'location': game.current_player.current_location
+            },
+            'combat_mode': game.combat_mode
+        }
+    }
+
+def _combat_description_event(narration):
+    """Wait for combat narration (on the request thread, see _relay) and return its event."""
+    try:
+        combat_desc = narration.result(timeout=NARRATION_TIMEOUT)
+    except FutureTimeoutError:
+        app.logger.info("Combat narration timed out; skipping.")
+        return None
+    except Exception as e:
+        app.logger.warning("Combat narration failed: %s", e)
+        return None
+    return f"data: {json.dumps({'type': 'combat_description', 'content': combat_desc})}\n\n"
+
 def generate_stream_response(command, game):
     try:
         # Create context for command processing
@@ -139,70 +427,52 @@ def generate_stream_response(command, game):
         # Check if command starts with any movement prefix
         is_movement = any(command.lower().startswith(prefix.lower()) for prefix in movement_prefixes)
 
-        # Process the command once
+        # Process the command once; attacks go through here too, so they are
+        # recorded and checkpointed like every other command
+        last_attack = game.last_attack
         response = game.process_input(command, context)
-        
+
+        # An attack was resolved: send the result straight away, then the
+        # narration once it arrives, waited for off the session's actor
+        if game.last_attack is not None and game.last_attack is not last_attack:
+            yield f"data: {json.dumps({'type': 'combat_result', 'content': response, 'outcome': game.last_attack})}\n\n"
+            yield f"data: {json.dumps(_game_state_event(game))}\n\n"
+
+            narration_args = game.combat_narration_args()
+            if narration_args:
+                narration = narration_queue.submit(
+                    narration_args, game.groq_engine.generate_combat_description, *narration_args
+                )
+                if narration is not None:
+                    yield functools.partial(_combat_description_event, narration)
+            return
+
         # If it's a movement command, send the response and return
         if is_movement:
             if response:
                 yield f"data: {json.dumps({'type': 'response', 'content': response})}\n\n"
             return
 
-        # Special handling for combat
-        if command.lower() == "attack" and game.combat_mode and game.current_player:
-            # Send initial response if any
-            if response:
-                yield f"data: {json.dumps({'type': 'response', 'content': response})}\n\n"
-                
-            # Generate combat description
-            player_tuple = (
-                game.current_player.name,
-                game.current_player.character_class,
-                game.current_player.level,
-                game.current_player.hit_points
-            )
-            
-            enemy_name = game.current_enemy.get('name', 'Unknown Enemy') if isinstance(game.current_enemy, dict) else getattr(game.current_enemy, 'name', 'Unknown Enemy')
-            enemy_level = game.current_enemy.get('level', 'N/A') if isinstance(game.current_enemy, dict) else getattr(game.current_enemy, 'level', 'N/A')
-            enemy_hp = game.current_enemy.get('hit_points', 'N/A') if isinstance(game.current_enemy, dict) else getattr(game.current_enemy, 'hit_points', 'N/A')
-
-            enemy_tuple = (enemy_name, enemy_level, enemy_hp)
-            
-            # Stream combat description
-            combat_desc = game.groq_engine.generate_combat_description(player_tuple, enemy_tuple)
-            yield f"data: {json.dumps({'type': 'combat_description', 'content': combat_desc})}\n\n"
-            
-            # Stream combat result
-            combat_result = game.handle_attack()
-            yield f"data: {json.dumps({'type': 'combat_result', 'content': combat_result})}\n\n"
-        # For all other commands, just send the response if it exists
-        elif response:
+        if response:
             yield f"data: {json.dumps({'type': 'response', 'content': response})}\n\n"
 
         # Send final game state update if we have a player
         if game.current_player:
-            game_state = {
-                'type': 'game_state',
-                'content': {
-                    'player': {
-                        'name': game.current_player.name,
-                        'health': game.current_player.hit_points,
-                        'level': game.current_player.level,
-                        'location': game.current_player.current_location
-                    },
-                    'combat_mode': game.combat_mode
-                }
-            }
-            yield f"data: {json.dumps(game_state)}\n\n"
+            yield f"data: {json.dumps(_game_state_event(game))}\n\n"
             
     except Exception as e:
         app.logger.error("Error in command processing: %s", str(e), exc_info=True)
         yield f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
     finally:
+        # Streamed commands are autosaved here, once they have finished
+        autosaver.request(game)
         yield "data: {\"type\": \"end\"}\n\n"
 
 @app.route('/api/console_command', methods=['POST'])
+@in_session
+@waits_on_llm
 def console_command():
+    game = g.game
     data = request.get_json()
     if not data or 'command' not in data:
         return jsonify({"error": "No command provided"}), 400
@@ -212,7 +482,7 @@ def console_command():
         return jsonify({"error": "Empty command"}), 400
 
     return Response(
-        stream_with_context(generate_stream_response(command, game)),
+        generate_stream_response(command, game),
         mimetype='text/event-stream',
         headers={
             'Cache-Control': 'no-cache',
@@ -221,8 +491,48 @@ def console_command():
         }
     )
 
+# Job status is answered from here, not on the session's actor, which may
+# still be busy running the job
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = jobs.get(g.session_id, job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    session_id = g.session_id
+    if jobs.get(session_id, job_id) is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+
+    def generate():
+        while True:
+            job = jobs.wait(session_id, job_id, timeout=JOB_KEEPALIVE)
+            if job is None:
+                yield f"data: {json.dumps({'type': 'error', 'content': 'Unknown or expired job'})}\n\n"
+                break
+            if job.status != PENDING:
+                yield f"data: {json.dumps({'type': 'job', 'content': job.to_dict()})}\n\n"
+                break
+            yield ": keep-alive\n\n"
+        yield "data: {\"type\": \"end\"}\n\n"
+
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'Connection': 'keep-alive',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
 @app.route('/api/look_around', methods=['POST'])
+@in_session
+@deferrable
 def look_around():
+    game = g.game
     try:
         if not game.current_player:
             app.logger.warning("Look around attempted with no player")
@@ -255,7 +565,9 @@ def look_around():
         return jsonify({"error": f"Failed to look around: {str(e)}"}), 500
 
 @app.route('/api/check_inventory', methods=['GET'])
+@in_session
 def check_inventory():
+    game = g.game
     if not game.current_player:
         return jsonify({"error": "No player created"}), 400
 
@@ -272,7 +584,9 @@ def check_inventory():
     })
 
 @app.route('/api/get_location_description', methods=['GET'])
+@in_session
 def get_location_description():
+    game = g.game
     if not game.current_player:
         return jsonify({"error": "No player created"}), 400
 
@@ -285,7 +599,10 @@ def get_location_description():
     return jsonify({"description": description})
 
 @app.route('/api/get_npc_dialogue', methods=['POST'])
+@in_session
+@deferrable
 def get_npc_dialogue():
+    game = g.game
     data = request.json
     npc_name = data.get('npc_name')
     player_message = data.get('message', '')
@@ -324,12 +641,16 @@ def get_npc_dialogue():
             player_class=game.current_player.character_class,
             location=game.current_player.current_location,
             player_message=player_message,
-            npc_role=npc_role
+            npc_role=npc_role,
+            memories=tuple(game.recall_memories(player_message, actual_npc_name)) if player_message else (),
+            story=game.story_summary("region")
         )
         
         # Update last interaction time
         if npc:
             npc.last_interaction = datetime.now()
+        if player_message:
+            game.remember_npc_fact(actual_npc_name, f"{game.current_player.name} said: {player_message}; {actual_npc_name} replied: {dialogue}")
             
         return jsonify({
             "dialogue": dialogue,
@@ -351,7 +672,9 @@ def get_npc_dialogue():
         return jsonify({"error": f"Failed to generate NPC dialogue: {error_msg}"}), 500
 
 @app.route('/api/move_player', methods=['POST'])
+@in_session
 def move_player():
+    game = g.game
     data = request.json
     destination = data.get('destination')
 
@@ -362,7 +685,9 @@ def move_player():
     return jsonify({"result": result})
 
 @app.route('/api/get_inventory', methods=['GET'])
+@in_session
 def get_inventory():
+    game = g.game
     if not game.current_player:
         return jsonify({"error": "No player created"}), 400
 
@@ -370,7 +695,9 @@ def get_inventory():
     return jsonify({"inventory": inventory})
 
 @app.route('/api/equip_item', methods=['POST'])
+@in_session
 def equip_item():
+    game = g.game
     data = request.json
     item_name = data.get('item_name')
 
@@ -381,7 +708,9 @@ def equip_item():
     return jsonify({"result": result})
 
 @app.route('/api/unequip_item', methods=['POST'])
+@in_session
 def unequip_item():
+    game = g.game
     data = request.json
     slot = data.get('slot')
 
@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, Any, List, Optional
+
+import save_format
+import save_journal
+import save_system
+import chunk_store
+
+logger = logging.getLogger(__name__)
+
+AUTOSAVE_NAME = "autosave.json"
+# Seconds without new changes before an autosave is written
+DEFAULT_DELAY = 2.0
+# Longest a change waits while new triggers keep pushing the write back
+MAX_DELAY = 15.0
+
+_dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str).encode
+
+
+class _PendingSave:
+    """Autosave state for one game: what the file holds, and changes not yet written."""
+
+    def __init__(self, game: Any, path: str, filename: str, base: str, marks: Dict[str, Any]):
+        self.game = game
+        self.path = path
+        self.filename = filename
+        self.marks = marks  # Game state as of the last capture (see RPGGame._current_journal_marks)
+        self.base: Optional[str] = base  # Encoded full state, until the first write decodes it
+        self.state: Optional[Dict[str, Any]] = None  # Private copy of the save, only touched by writers
+        self.ops: List[str] = []  # Encoded journal ops captured since the last write
+        self.first_request = 0.0
+        self.last_request = 0.0
+        self.writing = False
+
+
+class AutosaveService:
+    """
+    Debounced, crash-safe background autosaves.
+
+    request() runs on the game thread after a command. It captures only what
+    changed since the previous request, as encoded journal ops (see
+    save_journal.py), so it stays cheap however big the world is. A worker
+    thread waits until a game has been quiet for `delay` seconds (or
+    `max_delay` since its first unsaved change), coalesces every captured
+    change into its private copy of the save, and writes the whole file
+    atomically (temp file, fsync, rename) on a background pool. flush() and
+    shutdown() write all pending saves in parallel.
+    """
+
+    def __init__(self, delay: float = DEFAULT_DELAY, max_delay: float = MAX_DELAY, max_workers: int = 4):
+        self.delay = delay
+        self.max_delay = max_delay
+        self._pending: Dict[int, _PendingSave] = {}
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="autosave")
+        self._stopped = False
+        self._worker = threading.Thread(target=self._run, name="autosave-scheduler", daemon=True)
+        self._worker.start()
+
+    def request(self, game: Any, filename: str = AUTOSAVE_NAME) -> None:
+        """
+        Note that game changed and should be autosaved to filename in its save_dir.
+        Call from the thread that runs the game's commands.
+        """
+        if self._stopped or not game.current_player:
+            return
+        path = os.path.join(game.save_dir, filename)
+        with self._cond:
+            pending = self._pending.get(id(game))
+        if pending is None or pending.path != path or pending.game is not game:
+            # First autosave of this game (or to a new file): capture everything once
+            pending = _PendingSave(game, path, filename, _dumps(game._build_save_data()), game._current_journal_marks())
+        else:
+            ops = game._journal_ops(pending.marks)
+            if not ops:
+                return
+            encoded = _dumps(ops)
+            with self._cond:
+                pending.ops.append(encoded)
+        now = time.monotonic()
+        with self._cond:
+            self._pending[id(game)] = pending
+            if not pending.first_request:
+                pending.first_request = now
+            pending.last_request = now
+            self._cond.notify()
+
+    def forget(self, game: Any) -> None:
+        """Stop autosaving game, dropping changes that were not written yet."""
+        with self._cond:
+            self._pending.pop(id(game), None)
+
+    def _is_due(self, pending: _PendingSave, now: float) -> bool:
+        return (not pending.writing and pending.first_request
+                and (now - pending.last_request >= self.delay or now - pending.first_request >= self.max_delay))
+
+    def _run(self) -> None:
+        with self._cond:
+            while not self._stopped:
+                now = time.monotonic()
+                for pending in list(self._pending.values()):
+                    if self._is_due(pending, now):
+                        self._start_write(pending)
+                deadlines = [
+                    min(pending.last_request + self.delay, pending.first_request + self.max_delay)
+                    for pending in self._pending.values() if pending.first_request and not pending.writing
+                ]
+                self._cond.wait(timeout=max(0.0, min(deadlines) - now) if deadlines else None)
+
+    def _start_write(self, pending: _PendingSave) -> Optional[Future]:
+        """Hand a pending save to the pool. Call with self._cond held."""
+        ops, pending.ops = pending.ops, []
+        pending.first_request = pending.last_request = 0.0
+        pending.writing = True
+        try:
+            return self._executor.submit(self._write, pending, ops)
+        except RuntimeError:
+            # The interpreter is exiting and has already stopped the pool
+            # (e.g. shutdown() running from atexit): write in this thread
+            self._write(pending, ops)
+            return None
+
+    def _write(self, pending: _PendingSave, ops: List[str]) -> None:
+        try:
+            if pending.state is None:
+                pending.state = json.loads(pending.base)
+                pending.base = None
+            for encoded in ops:
+                save_journal.apply_ops(pending.state, json.loads(encoded))
+            state = pending.state
+            if pending.path.endswith(save_format.BINARY_EXTENSION):
+                save_system.write_atomic(pending.path, lambda f: save_format.dump(state, f))
+            else:
+                save_system.write_json_atomic(pending.path, state)
+                # The autosave is a full save; an old journal for this file no longer applies
+                save_journal.discard_journal(pending.path)
+            chunk_store.for_dir(os.path.dirname(pending.path)).release(pending.filename)
+            save_system.record_save(pending.filename, state, os.path.dirname(pending.path))
+        except Exception as e:
+            logger.error(f"Autosave to {pending.path} failed: {e}")
+        finally:
+            with self._cond:
+                pending.writing = False
+                self._cond.notify()
+
+    def flush(self, game: Any = None, timeout: Optional[float] = None) -> None:
+        """
+        Write pending autosaves now, in parallel, and wait for them.
+
+        Args:
+            game: Only this game's autosave (default: every game's)
+            timeout: Seconds to wait at most
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._cond:
+                targets = [p for p in self._pending.values() if game is None or p.game is game]
+                busy = [p for p in targets if p.writing]
+                started = [p for p in targets if not p.writing and (p.first_request or p.ops)]
+                futures = [f for f in map(self._start_write, started) if f is not None]
+                if not started and not busy:
+                    return
+            wait(futures, timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+            if busy:
+                with self._cond:
+                    self._cond.wait_for(lambda: not any(p.writing for p in busy),
+                                        timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+
+    def shutdown(self, timeout: Optional[float] = 30.0) -> None:
+        """Flush every pending autosave in parallel and stop the service."""
+        if self._stopped:
+            return
+        self.flush(timeout=timeout)
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._executor.shutdown(wait=True)
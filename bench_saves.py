@@ -0,0 +1,108 @@
+"""
+Compare save formats on synthetic worlds: size on disk, save time and load
+time for the pretty-printed JSON saves, compact JSON, and the binary format
+from save_format.py with each compression.
+
+Usage: python bench_saves.py [npc_count ...]   (default: 1000 10000 100000)
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+from datetime import datetime
+
+import save_format
+from game import NPC, NPCMemory, Character, Item, event_store
+
+
+def build_world(npc_count: int) -> dict:
+    """Save data shaped like RPGGame._build_save_data, with npc_count NPCs."""
+    memory = NPCMemory()
+    for i in range(npc_count):
+        npc = NPC(f"Villager {i}", "farmer" if i % 3 else "merchant", f"Village {i % 50}")
+        npc.update_relationship("player_ara", affinity_change=i % 20 - 10, fact=f"Ara helped with the harvest in year {i % 7}")
+        npc.add_dialogue(f"Good day, traveller. The crops are {'good' if i % 2 else 'poor'} this year.")
+        npc.known_locations.add(f"Village {(i + 1) % 50}")
+        memory.add_npc(npc)
+
+    player = Character("Ara", "Warrior")
+    player.inventory = [Item(f"Potion {i}", "consumable", {"heal": 5}) for i in range(20)]
+    events = event_store.EventStore()
+    for i in range(npc_count // 10):
+        events.add("quest", f"Finished errand {i} for Villager {i}", f"Village {i % 50}", i % 10 + 1, i * 15)
+    actions = [{"timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "action": f"look {i}",
+                "response": "You see fields and a windmill.", "location": "Village 1"} for i in range(50)]
+    return {
+        "player": player.to_dict(),
+        "session_memory": {"actions": actions, "important_events": events.to_list(),
+                           "visited_locations": [f"Village {i}" for i in range(50)]},
+        "npc_memory": memory.to_dict(),
+        "timestamp": datetime.now().isoformat(),
+        "version": "1.1.0",
+    }
+
+
+def measure(save, load, path: str, repeat: int = 3):
+    """Best-of-repeat save and load times (seconds) and the file size."""
+    save_times, load_times = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        save(path)
+        save_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        load(path)
+        load_times.append(time.perf_counter() - start)
+    return min(save_times), min(load_times), os.path.getsize(path)
+
+
+def formats(data: dict):
+    def json_save(indent, separators=None):
+        def save(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=indent, separators=separators, ensure_ascii=False, default=str)
+        return save
+
+    def json_load(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def binary_save(compression):
+        def save(path):
+            with open(path, 'wb') as f:
+                save_format.dump(data, f, compression)
+        return save
+
+    def binary_load(path):
+        with open(path, 'rb') as f:
+            return save_format.load(f)
+
+    yield "json (indent=2)", json_save(2), json_load
+    yield "json (compact)", json_save(None, (",", ":")), json_load
+    for compression in ("none", "zlib", "lzma"):
+        yield f"binary ({compression})", binary_save(compression), binary_load
+
+
+def main(npc_counts):
+    with tempfile.TemporaryDirectory() as tmp:
+        for npc_count in npc_counts:
+            data = build_world(npc_count)
+            print(f"\n{npc_count} NPCs")
+            print(f"{'format':<18}{'size':>12}{'save ms':>10}{'load ms':>10}")
+            baseline = None
+            for name, save, load in formats(data):
+                path = os.path.join(tmp, "bench.save")
+                save_time, load_time, size = measure(save, load, path, repeat=1 if npc_count >= 100000 else 3)
+                baseline = baseline or size
+                print(f"{name:<18}{size:>12,}{save_time * 1000:>10.1f}{load_time * 1000:>10.1f}   ({size / baseline:.0%} of json)")
+            # The binary reader also skips sections it was not asked for
+            with open(path, 'wb') as f:
+                save_format.dump(data, f)
+            start = time.perf_counter()
+            with open(path, 'rb') as f:
+                save_format.load(f, ("player",))
+            print(f"binary (zlib), player section only: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,274 @@
+import os
+import json
+import zlib
+import hashlib
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHUNK_DIR = "chunks"
+# Entries per chunk; lists are cut every CHUNK_ITEMS entries, dicts are
+# hashed by key into a power-of-two number of chunks of about this size
+CHUNK_ITEMS = 256
+CHUNK_REF = "$chunks"
+# Large, mostly-append sections of a save that are stored as chunks
+CHUNKED_SECTIONS = (("session_memory", "important_events"), ("npc_memory", "npcs"))
+
+_dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str).encode
+
+_stores: Dict[str, 'ChunkStore'] = {}
+_stores_lock = threading.Lock()
+
+
+def for_dir(save_dir: str) -> 'ChunkStore':
+    """The chunk store of a save directory (one instance per directory)."""
+    key = os.path.abspath(save_dir)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = ChunkStore(save_dir)
+        return _stores[key]
+
+
+def is_chunk_ref(value: Any) -> bool:
+    return isinstance(value, dict) and CHUNK_REF in value
+
+
+def is_chunked(state: Dict[str, Any]) -> bool:
+    """Whether a save dict holds chunk references (see ChunkStore.split)."""
+    return any(is_chunk_ref(_get(state, path)) for path in CHUNKED_SECTIONS)
+
+
+def _get(state: Dict[str, Any], path: Tuple[str, ...]) -> Any:
+    value: Any = state
+    for key in path:
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def _replace(state: Dict[str, Any], path: Tuple[str, ...], value: Any) -> Dict[str, Any]:
+    """Copy of state with value at path, copying only the dicts along the path."""
+    state = dict(state)
+    parent = state
+    for key in path[:-1]:
+        parent[key] = dict(parent.get(key) or {})
+        parent = parent[key]
+    parent[path[-1]] = value
+    return state
+
+
+def _write_file(path: str, data: bytes) -> None:
+    """Write a file via a temp file and rename, so readers never see a partial one."""
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class ChunkStore:
+    """
+    Content-addressed chunks shared between saves.
+
+    Large sections that mostly grow by appending (events, NPCs) are cut
+    into chunks named by the SHA-256 of their contents, so successive saves
+    share every chunk that did not change and a new save only writes the
+    new ones. Each save's chunk list is kept in refs/<save>.json; a chunk
+    is deleted when the last save referencing it is deleted or overwritten.
+
+    Chunks are pinned from put() until retain(), and a save retains its
+    chunks before its file is written and drops the old ones (commit)
+    after, so neither a concurrent delete nor a crash can leave a save
+    pointing at a deleted chunk; a crash can only leak chunks, which gc()
+    removes.
+    """
+
+    def __init__(self, save_dir: str):
+        self.root = os.path.join(save_dir, CHUNK_DIR)
+        self.refs_dir = os.path.join(self.root, "refs")
+        self._lock = threading.RLock()
+        self._refs: Optional[Dict[str, Set[str]]] = None  # Save -> chunk digests, loaded on first use
+        self._counts: Counter = Counter()
+        self._pinned: Counter = Counter()  # Chunks put() by saves that have not retained them yet
+
+    def _chunk_path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def _refs_path(self, save_name: str) -> str:
+        return os.path.join(self.refs_dir, f"{save_name}.json")
+
+    def _load_refs(self) -> Dict[str, Set[str]]:
+        if self._refs is None:
+            refs = {}
+            if os.path.isdir(self.refs_dir):
+                for file in os.listdir(self.refs_dir):
+                    if not file.endswith(".json"):
+                        continue
+                    try:
+                        with open(os.path.join(self.refs_dir, file), 'r', encoding='utf-8') as f:
+                            refs[file[:-len(".json")]] = set(json.load(f))
+                    except (OSError, ValueError) as e:
+                        logger.warning(f"Unreadable chunk refs {file}: {e}")
+            self._refs = refs
+            self._counts = Counter(digest for digests in refs.values() for digest in digests)
+        return self._refs
+
+    # ===== Chunks =====
+
+    def put(self, value: Any) -> str:
+        """Store one chunk (if it is not stored yet) and return its digest."""
+        encoded = _dumps(value).encode('utf-8')
+        digest = hashlib.sha256(encoded).hexdigest()
+        path = self._chunk_path(digest)
+        with self._lock:
+            self._pinned[digest] += 1
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                _write_file(path, zlib.compress(encoded, 6))
+        return digest
+
+    def get(self, digest: str) -> Any:
+        with open(self._chunk_path(digest), 'rb') as f:
+            return json.loads(zlib.decompress(f.read()))
+
+    def split(self, state: Dict[str, Any], sections: Iterable[Tuple[str, ...]] = CHUNKED_SECTIONS) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Store the large sections of a save dict as chunks.
+
+        Returns:
+            (copy of state with those sections replaced by chunk references,
+             every digest the copy refers to; pass them to retain())
+        """
+        digests = []
+        for path in sections:
+            value = _get(state, path)
+            if isinstance(value, list) and len(value) > CHUNK_ITEMS:
+                chunks = [self.put(value[start:start + CHUNK_ITEMS]) for start in range(0, len(value), CHUNK_ITEMS)]
+                ref = {CHUNK_REF: chunks, "kind": "list", "count": len(value)}
+            elif isinstance(value, dict) and len(value) > CHUNK_ITEMS:
+                buckets = 1
+                while buckets * CHUNK_ITEMS < len(value):
+                    buckets *= 2
+                batches: List[Dict[str, Any]] = [{} for _ in range(buckets)]
+                for key, item in value.items():
+                    batches[zlib.crc32(str(key).encode('utf-8')) % buckets][key] = item
+                # Sorted, so a bucket whose entries did not change encodes the same
+                chunks = [self.put(dict(sorted(batch.items()))) for batch in batches]
+                ref = {CHUNK_REF: chunks, "kind": "dict", "count": len(value)}
+            else:
+                continue
+            state = _replace(state, path, ref)
+            digests.extend(chunks)
+        return state, digests
+
+    def load_ref(self, ref: Dict[str, Any]) -> Any:
+        """The list or dict a chunk reference stands for."""
+        if ref.get("kind") == "dict":
+            value: Any = {}
+            for digest in ref[CHUNK_REF]:
+                value.update(self.get(digest))
+        else:
+            value = []
+            for digest in ref[CHUNK_REF]:
+                value.extend(self.get(digest))
+        return value
+
+    def load_entry(self, ref: Dict[str, Any], key: str) -> Any:
+        """One entry of a chunked dict, reading only the chunk it hashes to (None if absent)."""
+        chunks = ref[CHUNK_REF]
+        return self.get(chunks[zlib.crc32(key.encode('utf-8')) % len(chunks)]).get(key) if chunks else None
+
+    def expand(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy of a save dict with its chunk references replaced by the data."""
+        for path in CHUNKED_SECTIONS:
+            ref = _get(state, path)
+            if is_chunk_ref(ref):
+                state = _replace(state, path, self.load_ref(ref))
+        return state
+
+    # ===== References =====
+
+    def _set_refs(self, save_name: str, digests: Set[str]) -> None:
+        """Replace a save's chunk list, deleting chunks nothing refers to any more. Call with the lock held."""
+        refs = self._load_refs()
+        old = refs.get(save_name, set())
+        os.makedirs(self.refs_dir, exist_ok=True)
+        _write_file(self._refs_path(save_name), _dumps(sorted(digests)).encode('utf-8'))
+        refs[save_name] = digests
+        self._counts.update(digests - old)
+        self._counts.subtract(old - digests)
+        self._delete_unreferenced(old - digests)
+
+    def retain(self, save_name: str, digests: Iterable[str]) -> None:
+        """Reference the chunks from split() for a save about to be written, keeping the ones it had."""
+        digests = list(digests)
+        with self._lock:
+            self._set_refs(save_name, self._load_refs().get(save_name, set()) | set(digests))
+            self._pinned.subtract(digests)
+            self._pinned = +self._pinned
+
+    def commit(self, save_name: str, digests: Iterable[str]) -> None:
+        """Record the chunks of a save that was just written, releasing the ones it no longer uses."""
+        with self._lock:
+            self._set_refs(save_name, set(digests))
+
+    def release(self, save_name: str) -> int:
+        """
+        Forget a save's chunks, e.g. when it is deleted or overwritten by an
+        unchunked save, and delete the ones no other save uses.
+
+        Returns:
+            Number of chunks deleted
+        """
+        with self._lock:
+            refs = self._load_refs()
+            if save_name not in refs:
+                return 0
+            old = refs.pop(save_name)
+            try:
+                os.remove(self._refs_path(save_name))
+            except FileNotFoundError:
+                pass
+            self._counts.subtract(old)
+            return self._delete_unreferenced(old)
+
+    def _delete_unreferenced(self, digests: Iterable[str]) -> int:
+        deleted = 0
+        for digest in digests:
+            if self._counts[digest] > 0 or self._pinned[digest] > 0:
+                continue
+            del self._counts[digest]
+            try:
+                os.remove(self._chunk_path(digest))
+                deleted += 1
+            except FileNotFoundError:
+                pass
+        return deleted
+
+    def gc(self) -> int:
+        """Delete chunks no save refers to (e.g. left by a crash mid-save). Returns the number deleted."""
+        with self._lock:
+            self._load_refs()
+            deleted = 0
+            if not os.path.isdir(self.root):
+                return 0
+            for prefix in os.listdir(self.root):
+                directory = os.path.join(self.root, prefix)
+                if prefix == "refs" or not os.path.isdir(directory):
+                    continue
+                for digest in os.listdir(directory):
+                    if self._counts[digest] <= 0 and self._pinned[digest] <= 0:
+                        os.remove(os.path.join(directory, digest))
+                        deleted += 1
+            return deleted
+
+    def size(self) -> int:
+        """Bytes of chunk data on disk."""
+        total = 0
+        for directory, _, files in os.walk(self.root):
+            if os.path.basename(directory) != "refs":
+                total += sum(os.path.getsize(os.path.join(directory, file)) for file in files)
+        return total
@@ -0,0 +1,398 @@
+import re
+import logging
+from collections.abc import Mapping
+from dataclasses import dataclass, field, replace
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from dice import DiceRoller, compile_dice, np
+
+logger = logging.getLogger(__name__)
+
+# To-hit and defense bonus for each enemies.json difficulty tier
+TIER_BONUS = {
+    "easy": 0,
+    "medium": 1,
+    "hard": 2,
+    "extreme": 3,
+    "impossible": 4,
+    "nightmare": 5,
+}
+BASE_DEFENSE = 10
+
+_DAMAGE_TEXT_RE = re.compile(r"\(([^)]*?)\s*DAMAGE\)", re.IGNORECASE)
+_ARMOR_TEXT_RE = re.compile(r"\((\d+)\s*ARMOR", re.IGNORECASE)
+
+
+def _modifier(score: int) -> int:
+    return (score - 10) // 2
+
+
+def health_bucket(hp: int, max_hp: Optional[int] = None) -> str:
+    """
+    Coarse health state for a fighter, e.g. "wounded".
+
+    Narration is keyed on these buckets instead of exact HP, so the same
+    description can be reused across many turns.
+    """
+    if hp <= 0:
+        return "down"
+    if not max_hp or hp >= max_hp:
+        return "unhurt"
+    ratio = hp / max_hp
+    if ratio >= 0.66:
+        return "lightly wounded"
+    if ratio >= 0.33:
+        return "wounded"
+    return "badly wounded"
+
+
+@dataclass
+class Combatant:
+    """Everything combat needs to know about one fighter."""
+    name: str
+    hp: int
+    damage: str = "1D6"
+    armor: int = 0
+    attack_bonus: int = 0
+    defense: int = BASE_DEFENSE
+
+    @classmethod
+    def from_character(cls, character: Any) -> 'Combatant':
+        """
+        Build a combatant from a player Character.
+
+        Weapon "bonus" adds to hit and armor "bonus" to defense (as in
+        get_attack_bonus/get_defense_bonus). An optional weapon "damage" stat
+        sets the damage dice and an optional armor "armor" stat reduces
+        incoming damage. Falls back to the first weapon/armor in the
+        inventory when nothing is equipped.
+        """
+        def gear(slot: str):
+            item = character.equipped.get(slot)
+            if item is None:
+                item = next((i for i in character.inventory if i.item_type == slot), None)
+            return item
+
+        weapon, armor = gear("weapon"), gear("armor")
+        attrs = character.attributes
+        weapon_stats = weapon.stats if weapon else {}
+        armor_stats = armor.stats if armor else {}
+        damage = str(weapon_stats.get("damage", "1D6"))
+        toughness_mod = _modifier(attrs.get("toughness", 10))
+        if toughness_mod:
+            damage = f"{damage}{toughness_mod:+d}"
+        return cls(
+            name=character.name,
+            hp=character.hit_points,
+            damage=damage,
+            armor=int(armor_stats.get("armor", 0)),
+            attack_bonus=toughness_mod + int(weapon_stats.get("bonus", 0)),
+            defense=BASE_DEFENSE + _modifier(attrs.get("nimbleness", 10)) + int(armor_stats.get("bonus", 0)),
+        )
+
+    @classmethod
+    def from_stats(cls, name: str, stats: Mapping, difficulty: Optional[str] = None) -> 'Combatant':
+        """
+        Build a combatant from rule-file enemy stats.
+
+        Accepts the enemies.json shape ({"hp", "armor", "damage"}), the
+        example_mission.json shape ({"HP", "equipment", "armor"} with damage
+        and armor written as "(1D6 DAMAGE)" / "(1 ARMOR)" in the text), and
+        the RPGGame.enemies shape ({"hit_points", "attributes"}).
+        """
+        bonus = TIER_BONUS.get(difficulty or "", 0)
+        hp = stats.get("hp", stats.get("HP", stats.get("hit_points", 1)))
+        damage = stats.get("damage")
+        armor = stats.get("armor", 0)
+
+        equipment = stats.get("equipment")
+        if damage is None and equipment:
+            text = equipment if isinstance(equipment, str) else str(equipment.get("weapon", ""))
+            match = _DAMAGE_TEXT_RE.search(text)
+            damage = match.group(1) if match else None
+        if isinstance(armor, str) or (isinstance(equipment, Mapping) and "armor" in equipment):
+            armor_text = armor if isinstance(armor, str) else str(equipment.get("armor", ""))
+            match = _ARMOR_TEXT_RE.search(armor_text)
+            armor = int(match.group(1)) if match else 0
+
+        attributes = stats.get("attributes", {})
+        attack_bonus = bonus + _modifier(attributes.get("strength", 10))
+        defense = BASE_DEFENSE + bonus + _modifier(attributes.get("dexterity", 10))
+        return cls(
+            name=name,
+            hp=int(hp),
+            damage=str(damage) if damage is not None else "1D6",
+            armor=int(armor),
+            attack_bonus=attack_bonus,
+            defense=defense,
+        )
+
+
+def load_enemy_roster(rules: Any) -> Dict[str, Combatant]:
+    """
+    Collect every enemy with usable stats from the rule files.
+
+    Returns:
+        Dict keyed by "tier:<difficulty>", "boss:<difficulty>", premade enemy
+        and boss names, and example mission enemies ("ronin_security.merc")
+    """
+    roster: Dict[str, Combatant] = {}
+    enemies = rules.get("enemies.json", {})
+
+    tiers = enemies.get("enemy_difficulties", {})
+    for tier, info in tiers.items():
+        roster[f"tier:{tier}"] = Combatant.from_stats(tier, info.get("stats", {}), tier)
+    for name, info in enemies.get("premade_enemies", {}).items():
+        tier = info.get("difficulty")
+        if tier in tiers:
+            roster[name] = replace(roster[f"tier:{tier}"], name=name)
+
+    bosses = enemies.get("bosses", {})
+    for tier, stats in bosses.get("difficulty_scale", {}).items():
+        roster[f"boss:{tier}"] = Combatant.from_stats(f"{tier} boss", stats, tier)
+    for name, info in bosses.get("premade_bosses", {}).items():
+        roster[name] = Combatant.from_stats(name, info.get("stats", {}), info.get("difficulty"))
+
+    def walk(node: Mapping, path: str) -> None:
+        if "HP" in node:
+            roster[path] = Combatant.from_stats(path, node)
+            return
+        for key, value in node.items():
+            if isinstance(value, Mapping):
+                walk(value, f"{path}.{key}")
+
+    for name, node in rules.get("example_mission.json", {}).get("enemy_stats", {}).items():
+        if isinstance(node, Mapping):
+            walk(node, name)
+    return roster
+
+
+@dataclass
+class EncounterResult:
+    winner: str  # "players", "enemies" or "draw"
+    rounds: int
+    survivors: Dict[str, int] = field(default_factory=dict)
+    log: List[str] = field(default_factory=list)
+
+
+@dataclass
+class SimulationResult:
+    fights: int
+    wins: int
+    losses: int
+    draws: int
+    mean_rounds: float
+    mean_ttk: float  # Rounds needed to win, over won fights only
+    mean_hp_left: float  # Player HP remaining, over won fights only
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.fights if self.fights else 0.0
+
+
+class CombatEngine:
+    """
+    Deterministic combat resolution.
+
+    Each round every living player attacks, then every living enemy does. An
+    attack hits when d20 + attack bonus >= the target's defense and deals the
+    attacker's damage dice minus the target's armor. Attackers always focus
+    the first foe still standing. With a seeded DiceRoller the same encounter
+    always plays out the same way.
+    """
+
+    def __init__(self, roller: Optional[DiceRoller] = None):
+        self.roller = roller or DiceRoller()
+
+    def attack(self, attacker: Combatant, target: Combatant) -> Tuple[bool, int]:
+        """Roll one attack. Returns (hit, damage dealt)."""
+        if self.roller.d20() + attacker.attack_bonus < target.defense:
+            return False, 0
+        return True, max(0, self.roller.roll(attacker.damage) - target.armor)
+
+    def resolve(self, players: Sequence[Combatant], enemies: Sequence[Combatant],
+                max_rounds: int = 100, record: bool = True) -> EncounterResult:
+        """
+        Fight an encounter to the end.
+
+        Args:
+            players: The player side
+            enemies: The enemy side
+            max_rounds: Rounds before the fight is called a draw
+            record: Keep a round-by-round log
+
+        Returns:
+            EncounterResult with the winner, rounds fought and survivors' HP
+        """
+        sides = (list(players), list(enemies))
+        hp = ([c.hp for c in players], [c.hp for c in enemies])
+        log: List[str] = []
+
+        def alive(side: int) -> List[int]:
+            return [i for i, points in enumerate(hp[side]) if points > 0]
+
+        def survivors() -> Dict[str, int]:
+            return {sides[side][i].name: hp[side][i] for side in (0, 1) for i in alive(side)}
+
+        for round_number in range(1, max_rounds + 1):
+            for side in (0, 1):
+                foe_side = 1 - side
+                for i in alive(side):
+                    targets = alive(foe_side)
+                    if not targets:
+                        break
+                    attacker, target = sides[side][i], sides[foe_side][targets[0]]
+                    hit, damage = self.attack(attacker, target)
+                    hp[foe_side][targets[0]] -= damage
+                    if record:
+                        if hit:
+                            log.append(f"Round {round_number}: {attacker.name} hits {target.name} for {damage} damage "
+                                       f"({max(hp[foe_side][targets[0]], 0)} HP left).")
+                        else:
+                            log.append(f"Round {round_number}: {attacker.name} misses {target.name}.")
+            if not alive(1) or not alive(0):
+                winner = "players" if alive(0) else "enemies"
+                return EncounterResult(winner, round_number, survivors(), log)
+
+        return EncounterResult("draw", max_rounds, survivors(), log)
+
+
+def simulate(player: Combatant, enemy: Combatant, fights: int = 10000, group_size: int = 1,
+             seed: Optional[int] = None, max_rounds: int = 100) -> SimulationResult:
+    """
+    Run many one-player-versus-group fights for balance tuning.
+
+    With NumPy every fight advances in lockstep, one vectorized step per
+    round, which runs tens of thousands of fights per second. Without NumPy
+    the fights are resolved one at a time with CombatEngine.
+
+    Args:
+        player: The player combatant
+        enemy: Stats shared by every enemy in the group
+        fights: Number of fights to run
+        group_size: Enemies per fight
+        seed: Seed for reproducible results
+        max_rounds: Rounds before a fight is called a draw
+    """
+    if np is None:
+        return _simulate_serial(player, enemy, fights, group_size, seed, max_rounds)
+
+    rng = np.random.default_rng(seed)
+    player_plan, enemy_plan = compile_dice(player.damage), compile_dice(enemy.damage)
+    player_hp = np.full(fights, player.hp, dtype=np.int64)
+    enemy_hp = np.full((fights, group_size), enemy.hp, dtype=np.int64)
+    rounds = np.zeros(fights, dtype=np.int64)
+    done = np.zeros(fights, dtype=bool)
+    won = np.zeros(fights, dtype=bool)
+
+    for round_number in range(1, max_rounds + 1):
+        active = np.flatnonzero(~done)
+        n = active.size
+        if not n:
+            break
+
+        # Player attacks the first enemy still standing
+        hits = rng.integers(1, 21, n) + player.attack_bonus >= enemy.defense
+        damage = np.maximum(player_plan.roll_many(n, rng) - enemy.armor, 0) * hits
+        group = enemy_hp[active]
+        target = np.argmax(group > 0, axis=1)
+        group[np.arange(n), target] -= damage
+        enemy_hp[active] = group
+        standing = group > 0
+        cleared = ~standing.any(axis=1)
+
+        # Every enemy still standing attacks back
+        enemy_hits = rng.integers(1, 21, (n, group_size)) + enemy.attack_bonus >= player.defense
+        enemy_damage = np.maximum(enemy_plan.roll_many(n * group_size, rng).reshape(n, group_size) - player.armor, 0)
+        player_hp[active] -= (enemy_damage * enemy_hits * standing).sum(axis=1)
+
+        finished = cleared | (player_hp[active] <= 0)
+        won[active[cleared]] = True
+        done[active[finished]] = True
+        rounds[active[finished]] = round_number
+
+    rounds[~done] = max_rounds
+    wins = int(won.sum())
+    losses = int((done & ~won).sum())
+    return SimulationResult(
+        fights=fights,
+        wins=wins,
+        losses=losses,
+        draws=fights - wins - losses,
+        mean_rounds=float(rounds.mean()) if fights else 0.0,
+        mean_ttk=float(rounds[won].mean()) if wins else 0.0,
+        mean_hp_left=float(player_hp[won].mean()) if wins else 0.0,
+    )
+
+
+def _simulate_serial(player: Combatant, enemy: Combatant, fights: int, group_size: int,
+                     seed: Optional[int], max_rounds: int) -> SimulationResult:
+    engine = CombatEngine(DiceRoller(seed))
+    wins = losses = 0
+    total_rounds = win_rounds = hp_left = 0
+    for _ in range(fights):
+        group = [replace(enemy, name=f"{enemy.name} {i + 1}") for i in range(group_size)]
+        result = engine.resolve([player], group, max_rounds, record=False)
+        total_rounds += result.rounds
+        if result.winner == "players":
+            wins += 1
+            win_rounds += result.rounds
+            hp_left += result.survivors.get(player.name, 0)
+        elif result.winner == "enemies":
+            losses += 1
+    return SimulationResult(
+        fights=fights,
+        wins=wins,
+        losses=losses,
+        draws=fights - wins - losses,
+        mean_rounds=total_rounds / fights if fights else 0.0,
+        mean_ttk=win_rounds / wins if wins else 0.0,
+        mean_hp_left=hp_left / wins if wins else 0.0,
+    )
+
+
+def balance_report(players: Dict[str, Combatant], enemies: Dict[str, Combatant],
+                   fights: int = 10000, seed: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Simulate every player against every enemy.
+
+    Args:
+        players: Player combatants keyed by label (e.g. class name)
+        enemies: Enemy combatants keyed by label (e.g. "tier:hard")
+
+    Returns:
+        One row per pairing with win rate and time-to-kill
+    """
+    rows = []
+    for player_label, player in players.items():
+        for enemy_label, enemy in enemies.items():
+            result = simulate(player, enemy, fights, seed=seed)
+            rows.append({
+                "player": player_label,
+                "enemy": enemy_label,
+                "win_rate": round(result.win_rate, 3),
+                "mean_ttk": round(result.mean_ttk, 2),
+                "mean_rounds": round(result.mean_rounds, 2),
+                "mean_hp_left": round(result.mean_hp_left, 2),
+            })
+    return rows
+
+
+if __name__ == '__main__':
+    import time
+    from game import RPGGame, GroqEngine
+
+    game = RPGGame(GroqEngine())
+    players = {}
+    for character_class in ("Warrior", "Mage", "Rogue"):
+        players[character_class] = Combatant.from_character(game.create_character("Sim", character_class))
+    roster = load_enemy_roster(game.rules)
+    tiers = {label: enemy for label, enemy in roster.items() if label.startswith("tier:")}
+
+    start = time.perf_counter()
+    rows = balance_report(players, tiers, fights=10000, seed=1)
+    elapsed = time.perf_counter() - start
+    print(f"{'class':<10}{'enemy':<18}{'win rate':>10}{'ttk':>8}{'hp left':>9}")
+    for row in rows:
+        print(f"{row['player']:<10}{row['enemy']:<18}{row['win_rate']:>10.1%}{row['mean_ttk']:>8.2f}{row['mean_hp_left']:>9.2f}")
+    print(f"\n{len(rows) * 10000} fights in {elapsed:.2f}s")
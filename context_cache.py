@@ -0,0 +1,63 @@
+from typing import Callable, Dict, Hashable, List, Sequence, Tuple
+
+
+class ContextSections:
+    """
+    Incrementally rendered prompt context.
+
+    The context is made of named sections (location, recent actions, player
+    status, combat, ...). Each section has a cheap key function returning
+    the values it depends on, and a render function producing its text.
+    When a section's key changes its version counter is bumped and only that
+    fragment is rendered again; the joined string for a list of sections is
+    memoized on their versions, so asking for an unchanged context costs one
+    key check per section.
+    """
+
+    def __init__(self):
+        self._sections: Dict[str, Tuple[Callable[[], Hashable], Callable[[], str]]] = {}
+        self._keys: Dict[str, Hashable] = {}
+        self._fragments: Dict[str, str] = {}
+        self.versions: Dict[str, int] = {}
+        self._joined: Dict[Tuple[str, ...], Tuple[Tuple[int, ...], str]] = {}
+
+    def add(self, name: str, key: Callable[[], Hashable], render: Callable[[], str]) -> None:
+        """
+        Register a section.
+
+        Args:
+            name: Section name
+            key: Returns everything the section's text depends on
+            render: Returns the section's text ("" to leave it out)
+        """
+        self._sections[name] = (key, render)
+        self.versions[name] = 0
+        self.invalidate(name)
+
+    def invalidate(self, name: str = None) -> None:
+        """Force one section (or every section) to render again on next use."""
+        for section in [name] if name else list(self._sections):
+            self._keys.pop(section, None)
+            self._fragments.pop(section, None)
+
+    def fragment(self, name: str) -> str:
+        """A section's text, rendered again only if its key changed."""
+        key, render = self._sections[name]
+        current = key()
+        if name not in self._fragments or self._keys.get(name) != current:
+            self._fragments[name] = render()
+            self._keys[name] = current
+            self.versions[name] += 1
+        return self._fragments[name]
+
+    def render(self, names: Sequence[str]) -> str:
+        """The named sections joined by newlines, skipping empty ones."""
+        names = tuple(names)
+        fragments: List[str] = [self.fragment(name) for name in names]
+        stamp = tuple(self.versions[name] for name in names)
+        cached = self._joined.get(names)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        joined = "\n".join(filter(None, fragments))
+        self._joined[names] = (stamp, joined)
+        return joined
@@ -0,0 +1,154 @@
+import re
+import random
+import functools
+import itertools
+from typing import Dict, List, Optional, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # Batched rolls fall back to the standard library
+    np = None
+
+_TERM_RE = re.compile(r"([+-]?)\s*(?:(\d*)\s*[dD]\s*(\d+)|(\d+))")
+_EXPR_RE = re.compile(r"^\s*[+-]?\s*(?:\d*\s*[dD]\s*\d+|\d+)(?:\s*[+-]\s*(?:\d*\s*[dD]\s*\d+|\d+))*")
+
+
+class RollPlan:
+    """
+    A compiled dice expression such as "2D6+1".
+
+    Holds the dice groups and flat modifier, plus the exact probability
+    distribution of the total, computed once by convolution.
+    """
+
+    __slots__ = ("expression", "dice", "modifier", "minimum", "_probs", "_cum_weights", "_support")
+
+    def __init__(self, expression: str, dice: Tuple[Tuple[int, int, int], ...], modifier: int):
+        self.expression = expression
+        self.dice = dice  # (count, sides, sign)
+        self.modifier = modifier
+
+        # Convolve one uniform die at a time: probs[i] is P(total == minimum + i)
+        minimum, probs = modifier, [1.0]
+        for count, sides, sign in dice:
+            face = [1.0 / sides] * sides
+            for _ in range(count):
+                probs = _convolve(probs, face)
+                # A subtracted die spans -sides..-1; uniform faces make the shape identical
+                minimum += 1 if sign > 0 else -sides
+        self.minimum = minimum
+        self._probs = probs
+        self._cum_weights = list(itertools.accumulate(probs))
+        self._support = list(range(minimum, minimum + len(probs)))
+
+    def __repr__(self) -> str:
+        return f"RollPlan({self.expression!r})"
+
+    @property
+    def maximum(self) -> int:
+        return self.minimum + len(self._probs) - 1
+
+    def mean(self) -> float:
+        return sum(v * p for v, p in zip(self._support, self._probs))
+
+    def distribution(self) -> Dict[int, float]:
+        """Exact probability of every possible total."""
+        return dict(zip(self._support, self._probs))
+
+    def chance_at_least(self, target: int) -> float:
+        """Probability that a roll totals target or more."""
+        index = target - self.minimum
+        if index <= 0:
+            return 1.0
+        if index >= len(self._probs):
+            return 0.0
+        return 1.0 - self._cum_weights[index - 1]
+
+    def roll(self, rng: Optional[random.Random] = None) -> int:
+        """Roll the expression once, die by die."""
+        randint = (rng or random).randint
+        total = self.modifier
+        for count, sides, sign in self.dice:
+            for _ in range(count):
+                total += sign * randint(1, sides)
+        return total
+
+    def roll_many(self, count: int, rng: Union[random.Random, "np.random.Generator", None] = None):
+        """
+        Roll the expression many times.
+
+        Samples straight from the exact distribution, so the cost doesn't grow
+        with the number of dice. With NumPy and a numpy Generator this returns
+        an int array and handles millions of rolls per call; otherwise a list.
+        """
+        if np is not None and isinstance(rng, np.random.Generator):
+            return rng.choice(np.arange(self.minimum, self.maximum + 1), size=count, p=np.asarray(self._probs))
+        rng = rng or random
+        return rng.choices(self._support, cum_weights=self._cum_weights, k=count)
+
+
+def _convolve(a: List[float], b: List[float]) -> List[float]:
+    if np is not None and len(a) * len(b) > 256:
+        return np.convolve(a, b).tolist()
+    out = [0.0] * (len(a) + len(b) - 1)
+    for i, pa in enumerate(a):
+        if pa:
+            for j, pb in enumerate(b):
+                out[i + j] += pa * pb
+    return out
+
+
+@functools.lru_cache(maxsize=512)
+def compile_dice(expression: Union[str, int]) -> RollPlan:
+    """
+    Parse a dice expression into a reusable roll plan.
+
+    Accepts the notation used in the rule files: "1D6+1", "2D6", "3D6",
+    "1D6 DAMAGE", "+1D6", or a plain number such as 3. Trailing words are
+    ignored.
+
+    Raises:
+        ValueError: If no dice expression can be found
+    """
+    text = str(expression)
+    match = _EXPR_RE.match(text)
+    if not match:
+        raise ValueError(f"Invalid dice expression: {expression!r}")
+
+    dice: List[Tuple[int, int, int]] = []
+    modifier = 0
+    for sign_text, count_text, sides_text, flat_text in _TERM_RE.findall(match.group(0)):
+        sign = -1 if sign_text == '-' else 1
+        if flat_text:
+            modifier += sign * int(flat_text)
+            continue
+        count, sides = int(count_text or 1), int(sides_text)
+        if sides < 1:
+            raise ValueError(f"Invalid die size in {expression!r}")
+        if count:
+            dice.append((count, sides, sign))
+    return RollPlan(match.group(0).strip(), tuple(dice), modifier)
+
+
+class DiceRoller:
+    """
+    Seeded source of dice rolls shared by combat and balance tooling.
+
+    Single rolls use random.Random; batched rolls use a NumPy Generator when
+    NumPy is installed. Both are derived from the same seed, so a seeded
+    roller always reproduces the same results.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed) if np is not None else None
+
+    def roll(self, expression: Union[str, int]) -> int:
+        return compile_dice(expression).roll(self.rng)
+
+    def roll_many(self, expression: Union[str, int], count: int):
+        return compile_dice(expression).roll_many(count, self.np_rng or self.rng)
+
+    def d20(self) -> int:
+        return self.rng.randint(1, 20)
@@ -0,0 +1,236 @@
+import random
+import logging
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
+from combat import TIER_BONUS, Combatant
+from dice import compile_dice
+from generators import AliasSampler
+
+logger = logging.getLogger(__name__)
+
+# Chance that moving into a location with an encounter table triggers a fight
+DEFAULT_ENCOUNTER_CHANCE = 0.2
+
+_TIERS = list(TIER_BONUS)
+
+
+def _display_name(name: str) -> str:
+    return name.replace('_', ' ').title() if name.islower() else name
+
+
+def _tier_for_level(level: int) -> str:
+    return _TIERS[max(0, min(int(level) - 1, len(_TIERS) - 1))]
+
+
+def _group_size_sampler(group_size: Any) -> Optional[AliasSampler]:
+    """
+    Sampler for a premade enemy's group size ("1D6 appear", "3 appear").
+
+    Returns:
+        None when the group is always a single enemy
+    """
+    if group_size in (None, "", 1, "1"):
+        return None
+    try:
+        plan = compile_dice(group_size)
+    except ValueError:
+        logger.warning("Unrecognized group size %r; spawning a single enemy.", group_size)
+        return None
+    sizes = {max(1, size): p for size, p in plan.distribution().items()}
+    return AliasSampler(list(sizes), list(sizes.values()))
+
+
+@dataclass
+class Enemy:
+    """A spawned enemy, with the name/level/hit_points fields combat reads."""
+    name: str
+    level: int
+    hit_points: int
+    difficulty: str
+    stats: Dict[str, Any] = field(default_factory=dict)
+
+    def to_combatant(self) -> Combatant:
+        return Combatant.from_stats(self.name, {**self.stats, "hp": self.hit_points}, self.difficulty)
+
+
+@dataclass(frozen=True)
+class SpawnEntry:
+    """One row of a precomputed spawn table."""
+    name: str
+    difficulty: str
+    level: int
+    stats: Tuple[Tuple[str, Any], ...]
+    group: Optional[AliasSampler] = None
+
+    def spawn(self, rng: random.Random) -> List[Enemy]:
+        count = self.group.sample(rng) if self.group else 1
+        stats = dict(self.stats)
+        hp = int(stats.get("hp", stats.get("hit_points", 1)))
+        label = _display_name(self.name)
+        return [
+            Enemy(label if count == 1 else f"{label} {i + 1}", self.level, hp, self.difficulty, dict(stats))
+            for i in range(count)
+        ]
+
+
+@dataclass
+class Encounter:
+    location: str
+    entry: SpawnEntry
+    enemies: List[Enemy]
+
+    @property
+    def difficulty(self) -> str:
+        return self.entry.difficulty
+
+    def describe(self) -> str:
+        label = _display_name(self.entry.name)
+        if len(self.enemies) == 1:
+            return f"A hostile {label} ({self.difficulty}) blocks your way!"
+        return f"Hostiles block your way: {len(self.enemies)} x {label} ({self.difficulty})!"
+
+
+class EncounterTable:
+    """Alias-method spawn table: one O(1) draw picks the enemy, another its group size."""
+
+    def __init__(self, entries: List[SpawnEntry], weights: Optional[List[float]] = None, chance: float = DEFAULT_ENCOUNTER_CHANCE):
+        self.sampler = AliasSampler(entries, weights or [1.0] * len(entries))
+        self.chance = chance
+
+    def roll(self, location: str, rng: random.Random) -> Encounter:
+        entry = self.sampler.sample(rng)
+        return Encounter(location, entry, entry.spawn(rng))
+
+
+class EncounterGenerator:
+    """
+    Random encounters for locations, built from enemies.json and location data.
+
+    Spawn tables are precomputed whenever the rules or locations change:
+    one per enemies.json difficulty tier (from the premade enemies of that
+    tier, with their "1D6 appear" group sizes), and one per location that
+    lists its own "enemies". A location may instead name a tier with
+    "encounter_difficulty", and can override the trigger chance with
+    "encounter_chance". Rolling is a dict lookup plus a few O(1) alias
+    draws, cheap enough to do on every move.
+    """
+
+    def __init__(self, rules: Any, locations: Optional[Dict[str, Any]] = None,
+                 enemies: Optional[Dict[str, Any]] = None, seed: Optional[int] = None):
+        """
+        Args:
+            rules: Rule loader (e.g. LazyRuleLoader) or dict of parsed rule files
+            locations: Location data keyed by name (RPGGame.locations)
+            enemies: Extra enemy stats keyed by name (RPGGame.enemies)
+            seed: Seed for reproducible encounters
+        """
+        self.rules = rules
+        self.rng = random.Random(seed)
+        self.difficulty_tables: Dict[str, EncounterTable] = {}
+        self.location_tables: Dict[str, EncounterTable] = {}
+        self._premade: Dict[str, SpawnEntry] = {}
+        self._locations: Dict[str, Any] = {}
+        self._enemies: Dict[str, Any] = {}
+        self.build(locations, enemies)
+
+    def build(self, locations: Optional[Dict[str, Any]] = None, enemies: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Precompute every spawn table. Arguments left out reuse the ones from
+        the previous build, so this also serves to refresh after a rules reload.
+        The new tables are built aside and swapped in at the end, so roll()
+        never sees a half-built set.
+        """
+        if locations is not None:
+            self._locations = locations
+        if enemies is not None:
+            self._enemies = enemies
+
+        enemy_rules = self.rules.get("enemies.json", {}) or {}
+        tier_stats = {tier: dict(info.get("stats", {})) for tier, info in enemy_rules.get("enemy_difficulties", {}).items()}
+
+        premade = {}
+        for name, info in enemy_rules.get("premade_enemies", {}).items():
+            tier = info.get("difficulty")
+            if tier not in tier_stats or info.get("is_boss"):
+                continue
+            premade[name] = SpawnEntry(name, tier, TIER_BONUS[tier] + 1, tuple(tier_stats[tier].items()),
+                                       _group_size_sampler(info.get("group_size")))
+
+        difficulty_tables = {}
+        for tier in tier_stats:
+            entries = [entry for entry in premade.values() if entry.difficulty == tier]
+            if not entries:
+                entries = [SpawnEntry(f"{tier} enemy", tier, TIER_BONUS[tier] + 1, tuple(tier_stats[tier].items()))]
+            difficulty_tables[tier] = EncounterTable(entries)
+
+        location_tables = {}
+        for name, data in self._locations.items():
+            table = self._location_table(name, data, premade, difficulty_tables)
+            if table is not None:
+                location_tables[name] = table
+
+        self._premade = premade
+        self.difficulty_tables = difficulty_tables
+        self.location_tables = location_tables
+
+    def _entry(self, enemy_name: str, premade: Optional[Dict[str, SpawnEntry]] = None) -> Optional[SpawnEntry]:
+        premade = self._premade if premade is None else premade
+        if enemy_name in premade:
+            return premade[enemy_name]
+        stats = self._enemies.get(enemy_name)
+        if isinstance(stats, Mapping):
+            level = int(stats.get("level", 1))
+            return SpawnEntry(enemy_name, _tier_for_level(level), level, tuple(stats.items()))
+        logger.warning("No stats for enemy '%s'; leaving it out of the spawn table.", enemy_name)
+        return None
+
+    def add_location(self, name: str, data: Mapping) -> None:
+        """Precompute (or clear) the spawn table for one location."""
+        table = self._location_table(name, data, self._premade, self.difficulty_tables)
+        if table is None:
+            self.location_tables.pop(name, None)
+        else:
+            self.location_tables[name] = table
+
+    def _location_table(self, name: str, data: Mapping, premade: Dict[str, SpawnEntry],
+                        difficulty_tables: Dict[str, EncounterTable]) -> Optional[EncounterTable]:
+        chance = float(data.get("encounter_chance", DEFAULT_ENCOUNTER_CHANCE))
+        entries = [entry for entry in (self._entry(enemy, premade) for enemy in data.get("enemies", [])) if entry]
+        if entries:
+            return EncounterTable(entries, chance=chance)
+        tier = data.get("encounter_difficulty")
+        if tier in difficulty_tables:
+            return EncounterTable(difficulty_tables[tier].sampler.entries, chance=chance)
+        if tier:
+            logger.warning("Unknown encounter difficulty '%s' for location '%s'.", tier, name)
+        return None
+
+    def roll(self, location: str, rng: Optional[random.Random] = None) -> Optional[Encounter]:
+        """
+        Check for a random encounter on entering a location.
+
+        Returns:
+            The Encounter, or None if nothing turns up (or the location is safe)
+        """
+        table = self.location_tables.get(location)
+        if table is None:
+            return None
+        rng = rng or self.rng
+        if rng.random() >= table.chance:
+            return None
+        return table.roll(location, rng)
+
+    def spawn(self, location: str = "", difficulty: Optional[str] = None,
+              rng: Optional[random.Random] = None) -> Optional[Encounter]:
+        """
+        Force an encounter, from a difficulty tier or else the location's table.
+
+        Returns:
+            The Encounter, or None if there is no matching table
+        """
+        table = self.difficulty_tables.get(difficulty) if difficulty else self.location_tables.get(location)
+        if table is None:
+            return None
+        return table.roll(location, rng or self.rng)
@@ -0,0 +1,214 @@
+import bisect
+import heapq
+import itertools
+from datetime import datetime
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+MINUTES_PER_DAY = 24 * 60
+
+# Unique across every store in the process, unlike id(), which is reused once a store is freed
+_generations = itertools.count(1)
+
+
+def game_minutes(game_time: Dict[str, Any]) -> int:
+    """Absolute in-game minute for an RPGGame.game_time dict (day 1, 00:00 is minute 0)."""
+    return ((int(game_time.get('day', 1)) - 1) * MINUTES_PER_DAY
+            + int(game_time.get('hour', 0)) * 60 + int(game_time.get('minute', 0)))
+
+
+class EventStore:
+    """
+    Append-only store of important game events.
+
+    Every event is kept once, as a dict with an integer "id" (its position in
+    the store), and found through secondary indexes by type, location,
+    importance and in-game time. Queries start from the smallest matching
+    index and only look at those events, so asking for the top events at one
+    location stays cheap however long the session gets.
+    """
+
+    def __init__(self):
+        self._events: List[Dict[str, Any]] = []
+        self._by_type: Dict[str, List[int]] = {}
+        self._by_location: Dict[str, List[int]] = {}
+        self._by_importance: Dict[int, List[int]] = {}
+        self._times: List[int] = []  # Game minutes, sorted
+        self._time_ids: List[int] = []  # Event ids in the same order as _times
+        # New for every store and whenever events are dropped, so a reader that remembers a count knows to start over
+        self.generation = next(_generations)
+
+    @classmethod
+    def from_list(cls, events: Iterable[Dict[str, Any]]) -> 'EventStore':
+        """Rebuild a store from saved event dicts (ids are reassigned in order)."""
+        store = cls()
+        store.extend(events)
+        return store
+
+    def extend(self, events: Iterable[Dict[str, Any]]) -> None:
+        """Add saved event dicts in order (ids are reassigned)."""
+        for event in events:
+            if isinstance(event, dict):
+                self.add(
+                    event.get('type', 'event'),
+                    event.get('description', ''),
+                    event.get('location', 'unknown'),
+                    event.get('importance', 5),
+                    event.get('game_time', 0),
+                    event.get('timestamp'),
+                )
+
+    def truncate(self, count: int) -> None:
+        """Drop every event with id >= count, e.g. when the game is rewound. Costs O(dropped events)."""
+        if count >= len(self._events):
+            return
+        dropped = self._events[count:]
+        del self._events[count:]
+        # Index lists are in id order, so each dropped id is the last of its lists
+        for event in reversed(dropped):
+            for index, key in ((self._by_type, event['type']), (self._by_location, event['location']),
+                               (self._by_importance, event['importance'])):
+                ids = index[key]
+                ids.pop()
+                if not ids:
+                    del index[key]
+        while self._time_ids and self._time_ids[-1] >= count:
+            self._times.pop()
+            self._time_ids.pop()
+        if len(self._time_ids) > count:
+            # Some dropped events were filed earlier in time (the clock was moved back)
+            kept = [i for i, event_id in enumerate(self._time_ids) if event_id < count]
+            self._times = [self._times[i] for i in kept]
+            self._time_ids = [self._time_ids[i] for i in kept]
+        self.generation = next(_generations)
+
+    def add(self, event_type: str, description: str, location: str, importance: int = 5,
+            game_time: int = 0, timestamp: Optional[str] = None) -> int:
+        """
+        Record an event.
+
+        Args:
+            event_type: e.g. 'combat', 'quest', 'discovery'
+            description: What happened
+            location: Where it happened
+            importance: 1-10 (clamped)
+            game_time: In-game minute, see game_minutes()
+            timestamp: Real-world ISO timestamp (defaults to now)
+
+        Returns:
+            The new event's id
+        """
+        event_id = len(self._events)
+        importance = max(1, min(10, int(importance)))
+        game_time = int(game_time)
+        self._events.append({
+            'id': event_id,
+            'type': event_type,
+            'description': description,
+            'timestamp': timestamp or datetime.now().isoformat(),
+            'location': location,
+            'importance': importance,
+            'game_time': game_time,
+        })
+        self._by_type.setdefault(event_type, []).append(event_id)
+        self._by_location.setdefault(location, []).append(event_id)
+        self._by_importance.setdefault(importance, []).append(event_id)
+        if not self._times or game_time >= self._times[-1]:
+            self._times.append(game_time)
+            self._time_ids.append(event_id)
+        else:
+            # Only happens if the clock is moved back, e.g. after loading a save
+            index = bisect.bisect_right(self._times, game_time)
+            self._times.insert(index, game_time)
+            self._time_ids.insert(index, event_id)
+        return event_id
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._events)
+
+    def get(self, event_id: int) -> Optional[Dict[str, Any]]:
+        return self._events[event_id] if 0 <= event_id < len(self._events) else None
+
+    def ids_at(self, location: str) -> List[int]:
+        return list(self._by_location.get(location, ()))
+
+    def locations(self) -> List[str]:
+        return list(self._by_location)
+
+    def query(self, event_type: Optional[str] = None, location: Optional[str] = None,
+              min_importance: int = 1, since: Optional[int] = None, until: Optional[int] = None,
+              limit: Optional[int] = None, order: str = "importance") -> List[Dict[str, Any]]:
+        """
+        Find events matching every given filter.
+
+        Args:
+            event_type: Only events of this type
+            location: Only events at this location
+            min_importance: Only events at least this important
+            since: Earliest in-game minute (inclusive)
+            until: Latest in-game minute (inclusive)
+            limit: Maximum number of results
+            order: "importance" (most important first, newest first on ties)
+                or "recent" (newest first)
+
+        Returns:
+            List of event dicts
+        """
+        candidates: List[Iterable[int]] = []
+        if event_type is not None:
+            candidates.append(self._by_type.get(event_type, ()))
+        if location is not None:
+            candidates.append(self._by_location.get(location, ()))
+        if since is not None or until is not None:
+            lo = bisect.bisect_left(self._times, since) if since is not None else 0
+            hi = bisect.bisect_right(self._times, until) if until is not None else len(self._times)
+            candidates.append(self._time_ids[lo:hi])
+        if min_importance > 1:
+            candidates.append([i for level in range(min_importance, 11) for i in self._by_importance.get(level, ())])
+        driver = min(candidates, key=len) if candidates else range(len(self._events))
+
+        matches = []
+        for event_id in driver:
+            event = self._events[event_id]
+            if event_type is not None and event['type'] != event_type:
+                continue
+            if location is not None and event['location'] != location:
+                continue
+            if event['importance'] < min_importance:
+                continue
+            if since is not None and event['game_time'] < since:
+                continue
+            if until is not None and event['game_time'] > until:
+                continue
+            matches.append(event)
+
+        if order == "recent":
+            key = lambda e: (e['game_time'], e['id'])
+        else:
+            key = lambda e: (e['importance'], e['game_time'], e['id'])
+        if limit is not None:
+            return heapq.nlargest(limit, matches, key=key)
+        return sorted(matches, key=key, reverse=True)
+
+    def top(self, k: int = 5, location: Optional[str] = None, event_type: Optional[str] = None,
+            days: Optional[float] = None, now: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        The k most important events, e.g. top(5, location="Forest Clearing",
+        days=3, now=game_minutes(game.game_time)).
+
+        Args:
+            k: Number of events
+            location: Restrict to one location
+            event_type: Restrict to one event type
+            days: Only events from the last this many in-game days before now
+            now: Current in-game minute (required with days)
+        """
+        since = None
+        if days is not None and now is not None:
+            since = now - int(days * MINUTES_PER_DAY)
+        return self.query(event_type=event_type, location=location, since=since, limit=k)
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return list(self._events)
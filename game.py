@@ -1,13 +1,33 @@
+import copy
 import json
 import os
 import time
 import logging
 import random
+import threading
 from collections import deque
-from typing import Dict, Any, List, Optional, Deque, Union, Tuple, Set
-from pathlib import Path
+from typing import Callable, Dict, Any, List, Optional, Deque, Union, Tuple, Set
 import save_system
+import save_journal
+import save_format
+import chunk_store
+import save_store
+import lazy_load
+import rules_pack
+import rules_search
+import generators
+import dice
+import combat
+import encounters
+import session_log
+import event_store
+import memory_search
+import summaries
+import snapshots
+import session_actors
+from context_cache import ContextSections
 import functools
+import itertools
 import re
 import sys
 from dataclasses import dataclass, field, asdict
@@ -38,6 +58,26 @@ class NPCRelationship:
         """Check if a fact is known about this relationship."""
         return fact in self.known_facts
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the relationship to a dictionary for serialization."""
+        return {
+            "affinity": self.affinity,
+            "last_interaction": self.last_interaction.isoformat() if self.last_interaction else None,
+            "interaction_count": self.interaction_count,
+            "known_facts": sorted(self.known_facts),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'NPCRelationship':
+        """Create a relationship from a dictionary."""
+        last_interaction = data.get("last_interaction")
+        return cls(
+            affinity=data.get("affinity", 0),
+            last_interaction=datetime.fromisoformat(last_interaction) if last_interaction else None,
+            interaction_count=data.get("interaction_count", 0),
+            known_facts=set(data.get("known_facts", [])),
+        )
+
 class NPC:
     """Represents a non-player character with relationships and memory."""
     
@@ -57,6 +97,16 @@ class NPC:
         self.temporary: bool = False  # Whether this is a temporary NPC
         self.dialogue_history = deque(maxlen=5)  # Track last 5 lines of dialogue
         self.consecutive_questions = 0  # Track consecutive questions asked
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        self._touch()
+
+    def _touch(self) -> None:
+        """Tell the owning NPCMemory this NPC changed (see NPCMemory.changed_since)."""
+        memory = self.__dict__.get('_memory')
+        if memory is not None:
+            memory.mark_changed(self.name)
         
     def update_relationship(self, entity_id: str, affinity_change: int = 0, fact: Optional[str] = None) -> NPCRelationship:
         """Update relationship with another entity."""
@@ -73,6 +123,7 @@ class NPC:
             
         relationship.interaction_count += 1
         relationship.last_interaction = datetime.now()
+        self._touch()
         
         return relationship
     
@@ -80,6 +131,8 @@ class NPC:
         """Get relationship with another entity, creating if it doesn't exist."""
         if entity_id not in self.relationships:
             self.relationships[entity_id] = NPCRelationship()
+        # The caller may modify the relationship
+        self._touch()
         return self.relationships[entity_id]
     
     def get_disposition(self, entity_id: str) -> str:
@@ -125,6 +178,7 @@ class NPC:
             dialogue: The dialogue line to add
         """
         self.dialogue_history.append(dialogue)
+        self._touch()
         
         # Update consecutive question counter
         if dialogue.strip().endswith('?'):
@@ -145,7 +199,7 @@ class NPC:
             },
             "inventory": self.inventory,
             "schedule": self.schedule,
-            "known_locations": list(self.known_locations),
+            "known_locations": sorted(self.known_locations),
             "first_met": self.first_met.isoformat(),
             "last_seen": self.last_seen.isoformat(),
             "is_merchant": self.is_merchant,
@@ -189,16 +243,26 @@ class NPC:
         
         return npc
 
+# Unique across every NPCMemory in the process, unlike id(), which is reused once one is freed
+_npc_memory_generations = itertools.count(1)
+
+
 class NPCMemory:
     """Manages NPCs and their relationships in the game world."""
     
     def __init__(self):
+        self.generation = next(_npc_memory_generations)
         self.npcs: Dict[str, NPC] = {}
         self.factions: Dict[str, Dict[str, int]] = {}
+        # Change counter, and the counter value at each NPC's latest change,
+        # ordered oldest change first
+        self.version = 0
+        self._changed: Dict[str, int] = {}
         
     def add_npc(self, npc: NPC) -> None:
         """Add an NPC to the memory system."""
         self.npcs[npc.name.lower()] = npc
+        npc._memory = self
         
         # Initialize faction relationships if needed
         if npc.faction not in self.factions:
@@ -207,6 +271,33 @@ class NPCMemory:
     def get_npc(self, name: str) -> Optional[NPC]:
         """Get an NPC by name (case-insensitive)."""
         return self.npcs.get(name.lower())
+
+    def remove_npc(self, name: str) -> None:
+        """Remove an NPC from the memory system."""
+        npc = self.npcs.pop(name.lower(), None)
+        if npc is not None:
+            npc._memory = None
+            self.mark_changed(name)
+
+    def mark_changed(self, name: str) -> None:
+        """Record that an NPC was added, modified or removed."""
+        key = name.lower()
+        self.version += 1
+        # Re-insert so the dict stays ordered by latest change
+        self._changed.pop(key, None)
+        self._changed[key] = self.version
+
+    def changed_since(self, version: int) -> List[str]:
+        """
+        Names (lowercase) of NPCs changed after the given version, newest first.
+        Costs O(changes), however many NPCs there are.
+        """
+        names = []
+        for key, changed_at in reversed(self._changed.items()):
+            if changed_at <= version:
+                break
+            names.append(key)
+        return names
     
     def update_npc_location(self, npc_name: str, new_location: str) -> None:
         """Update an NPC's location."""
@@ -259,11 +350,111 @@ class NPCMemory:
         
         return memory
 
+
+class LazyNPCMemory(NPCMemory):
+    """
+    NPCMemory restored from a save on first use.
+
+    get_npc() reads single NPCs from the save until the whole memory is
+    needed (any other attribute) or materialize() runs, e.g. on a
+    background thread; NPCs handed out before that are kept, so nobody ends
+    up holding a stale copy.
+    """
+
+    def __init__(self, read_all: Callable[[], Optional[Dict]], read_one: Callable[[str], Optional[Dict]]):
+        """
+        Args:
+            read_all: Returns the saved NPC memory (as NPCMemory.to_dict)
+            read_one: Returns one saved NPC (as NPC.to_dict) by lowercase name, or None
+        """
+        # Deliberately no NPCMemory.__init__: its attributes appear when materialized
+        self.generation = next(_npc_memory_generations)
+        self._lock = threading.RLock()  # Held while materializing
+        self._early_lock = threading.Lock()  # Guards _early, so get_npc never waits for a full build
+        self._read_all = read_all
+        self._read_one = read_one
+        self._early: Dict[str, Optional[NPC]] = {}
+
+    @property
+    def materialized(self) -> bool:
+        return 'npcs' in self.__dict__
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes not set yet
+        if name.startswith('__') or name in ('_lock', '_early_lock', '_read_all', '_read_one', '_early', 'loaded_version'):
+            raise AttributeError(name)
+        self.materialize()
+        return object.__getattribute__(self, name)
+
+    def get_npc(self, name: str) -> Optional[NPC]:
+        if self.materialized:
+            return super().get_npc(name)
+        with self._early_lock:
+            if self.materialized:
+                return super().get_npc(name)
+            key = name.lower()
+            if key not in self._early:
+                data = self._read_one(key)
+                self._early[key] = NPC.from_dict(data) if data else None
+            return self._early[key]
+
+    def handed_out(self) -> Optional[List[NPC]]:
+        """The NPCs get_npc has handed out so far, or None once materialized (see loaded_version)."""
+        with self._early_lock:
+            if self.materialized:
+                return None
+            return [npc for npc in self._early.values() if npc is not None]
+
+    def materialize(self) -> None:
+        """Build every NPC (keeping the ones already handed out)."""
+        with self._lock:
+            if self.materialized:
+                return
+            memory = NPCMemory()
+            data = self._read_all() or {}
+            for key, npc_data in data.get("npcs", {}).items():
+                memory.add_npc(self._early.get(key.lower()) or NPC.from_dict(npc_data))
+            memory.factions = data.get("factions", {})
+            with self._early_lock:
+                # Changes to NPCs handed out earlier were not tracked: count them as changed since the load
+                self.loaded_version = memory.version
+                for key, npc in self._early.items():
+                    if npc is None:
+                        continue
+                    if memory.npcs.get(key) is not npc:
+                        # Handed out by get_npc while this was building: replaces its copy
+                        memory.add_npc(npc)
+                    else:
+                        memory.mark_changed(key)
+                for npc in memory.npcs.values():
+                    npc.__dict__['_memory'] = self
+                # npcs last: once it is set, other threads stop waiting for the lock
+                self.factions = memory.factions
+                self.version = memory.version
+                self._changed = memory._changed
+                self.npcs = memory.npcs
+                self._read_all = self._read_one = None
+                self._early = {}
+
 # Basic logging configuration
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+RULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Json Files")
+
+# Actions kept in session_memory["actions"] for prompts and summaries
+ACTIONS_WINDOW = 50
+# Entries of session_history kept in memory; older ones spill to disk
+HISTORY_WINDOW = 200
+
+# Format version written by RPGGame.save_game
+SAVE_VERSION = "1.1.0"
+# Save sections restored lazily after load_game (see RPGGame._restore_save_data)
+LAZY_SAVE_SECTIONS = (("npc_memory",), ("session_memory", "important_events"))
+SUPPORTED_SAVE_VERSIONS = ("1.0.0", "1.1.0")
+_dumps = functools.partial(json.dumps, sort_keys=True, ensure_ascii=False, default=str)
+
 class GroqEngine:
     def __init__(self):
         """Initialize the Groq AI engine."""
@@ -281,6 +472,11 @@ class GroqEngine:
                 logger.info(f"Successfully initialized Groq client with model: {self.model}")
             except Exception as e:
                 logger.error(f"Failed to initialize Groq client: {e}")
+
+    def _chat_completion(self, **kwargs: Any) -> Any:
+        """A Groq chat completion. The session's reads run meanwhile (see session_actors.waiting_on_io)."""
+        with session_actors.waiting_on_io():
+            return self.client.chat.completions.create(**kwargs)
     
     @cached(cache=LRUCache(maxsize=128), key=lambda *args, **kwargs: (
         'generate_description',
@@ -341,7 +537,7 @@ class GroqEngine:
             )
             
             # Generate the description
-            response = self.client.chat.completions.create(
+            response = self._chat_completion(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -457,7 +653,7 @@ class GroqEngine:
             user_message = player_message or f"{player_name} approaches you."
             
             # Generate the response
-            response = self.client.chat.completions.create(
+            response = self._chat_completion(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -520,7 +716,7 @@ class GroqEngine:
             - Potential dangers
             """
 
-            response = self.client.chat.completions.create(
+            response = self._chat_completion(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "You are a master Dungeon Master. Provide vivid, immersive descriptions of locations. Include sensory details, points of interest, environmental conditions, and potential dangers. Keep the description under 1000 tokens."},
@@ -550,7 +746,7 @@ class GroqEngine:
     @functools.lru_cache(maxsize=128)
     def generate_npc_dialogue(self, npc_name: str, player_name: str, location: str, 
                            player_message: str = "", npc_role: str = "person", 
-                           player_class: str = "adventurer") -> str:
+                           player_class: str = "adventurer", memories: tuple = (), story: str = "") -> str:
         """
         Generate NPC dialogue using Groq AI.
         
@@ -561,6 +757,8 @@ class GroqEngine:
             player_message: Optional message from the player
             npc_role: The role/occupation of the NPC
             player_class: The class/occupation of the player character
+            memories: Optional tuple of things this NPC should recall (see RPGGame.recall_memories)
+            story: Optional summary of the adventure so far (see RPGGame.story_summary)
             
         Returns:
             str: The NPC's response
@@ -568,7 +766,7 @@ class GroqEngine:
         if not self.client:
             return f"{npc_name} looks at you but says nothing."
 
-        cache_key = ("npc_dialogue", npc_name, player_name, location, player_class, npc_role, player_message)
+        cache_key = ("npc_dialogue", npc_name, player_name, location, player_class, npc_role, player_message, memories, story)
         if cache_key in self.description_cache:
             return self.description_cache[cache_key]
 
@@ -585,8 +783,12 @@ class GroqEngine:
                 system_prompt += " You are professional and alert, watching for trouble."
             else:
                 system_prompt += " You are polite and helpful."
+            if story:
+                system_prompt += f"\nWhat has happened so far:\n{story}"
+            if memories:
+                system_prompt += "\nYou remember:\n" + "\n".join(f"- {memory}" for memory in memories)
                 
-            response = self.client.chat.completions.create(
+            response = self._chat_completion(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -613,26 +815,69 @@ class GroqEngine:
             logger.warning(f"Failed to generate NPC dialogue: {e}")
             return f"{npc_name} mumbles something unintelligible."
 
+    def summarize(self, text: str, instructions: str, max_tokens: int = 300) -> str:
+        """
+        Summarize text for the session memory (see summaries.py).
+        
+        Args:
+            text: The text to summarize
+            instructions: What the summary should keep
+            max_tokens: Length limit for the summary
+            
+        Returns:
+            str: The summary, or "" if Groq is unavailable or the call fails
+        """
+        if not self.client:
+            return ""
+
+        try:
+            response = self._chat_completion(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": f"You keep notes for a fantasy RPG's Dungeon Master. {instructions}"},
+                    {"role": "user", "content": text}
+                ],
+                temperature=0.3,
+                max_tokens=max_tokens,
+                stream=False
+            )
+            if not response or not hasattr(response, 'choices') or not response.choices:
+                return ""
+            return response.choices[0].message.content.strip()
+        except Exception as e:
+            logger.warning(f"Failed to summarize: {e}")
+            return ""
+
     @functools.lru_cache(maxsize=128)
-    def generate_action_description(self, player_tuple: tuple, action: str) -> str:
+    def generate_action_description(self, player_tuple: tuple, action: str, rule_snippets: tuple = (),
+                                    memories: tuple = ()) -> str:
         """Generate a description of the player's action using Groq AI.
         player_tuple should be a hashable representation of essential player attributes.
         Example: (player_name, player_class, player_level)
+        rule_snippets is an optional tuple of rule excerpts (see rules_search.py)
+        used to ground the description in the game's rules.
+        memories is an optional tuple of relevant past events (see memory_search.py).
         """
         if not self.client:
             return f"You {action}."
 
-        cache_key = ("action", player_tuple, action.lower())
+        cache_key = ("action", player_tuple, action.lower(), rule_snippets, memories)
         if cache_key in self.description_cache:
             return self.description_cache[cache_key]
 
         try:
             player_name, player_class, player_level = player_tuple
             
-            response = self.client.chat.completions.create(
+            system_prompt = f"You are a master storyteller. Describe the action in an engaging way. Player: {player_name} (Level {player_level} {player_class}). Keep your response under 200 characters."
+            if rule_snippets:
+                system_prompt += "\nStay consistent with these game rules:\n" + "\n".join(f"- {snippet}" for snippet in rule_snippets)
+            if memories:
+                system_prompt += "\nRelevant things that happened earlier:\n" + "\n".join(f"- {memory}" for memory in memories)
+            
+            response = self._chat_completion(
                 model=self.model,
                 messages=[
-                    {"role": "system", "content": f"You are a master storyteller. Describe the action in an engaging way. Player: {player_name} (Level {player_level} {player_class}). Keep your response under 200 characters."},
+                    {"role": "system", "content": system_prompt},
                     {"role": "user", "content": f"Describe this action in 1-2 sentences: {action}"}
                 ],
                 temperature=0.7,
@@ -655,28 +900,36 @@ class GroqEngine:
             return f"You {action}."
 
     @functools.lru_cache(maxsize=128)
-    def generate_combat_description(self, player_tuple: tuple, enemy_tuple: tuple) -> str:
+    def generate_combat_description(self, player_tuple: tuple, enemy_tuple: tuple, outcome: str = "") -> str:
         """
         Generate a description of a combat scenario using Groq AI.
-        player_tuple: (name, class, level, current_hp)
-        enemy_tuple: (name, level, current_hp)
+        player_tuple: (name, class, level, health) where health is a bucket from combat.health_bucket
+        enemy_tuple: (name, level, health)
+        outcome: What the player's attack did ("hit", "miss" or "kill"), if known
+
+        Pass health buckets rather than exact HP so that descriptions are
+        reused across turns with similar outcomes.
         """
         if not self.client:
             return "The clash of steel rings out!"
 
-        cache_key = ("combat", player_tuple, enemy_tuple)
+        cache_key = ("combat", player_tuple, enemy_tuple, outcome)
         if cache_key in self.description_cache:
             return self.description_cache[cache_key]
 
         try:
-            player_name, player_class, player_level, player_hp = player_tuple
-            enemy_name, enemy_level, enemy_hp = enemy_tuple
-            
-            response = self.client.chat.completions.create(
+            player_name, player_class, player_level, player_health = player_tuple
+            enemy_name, enemy_level, enemy_health = enemy_tuple
+
+            prompt = f"Describe a combat scene between {player_name} (Level {player_level} {player_class}, {player_health}) and {enemy_name} (Level {enemy_level}, {enemy_health})."
+            if outcome:
+                prompt += f" {player_name}'s attack was a {outcome}."
+
+            response = self._chat_completion(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "You are a master storyteller. Describe a combat scene in an engaging way. Keep it under 300 characters."},
-                    {"role": "user", "content": f"Describe a combat scene between {player_name} (Level {player_level} {player_class}) and {enemy_name} (Level {enemy_level})."}
+                    {"role": "user", "content": prompt}
                 ],
                 temperature=0.8,
                 max_tokens=300,
@@ -721,6 +974,21 @@ class Item:
             "temporary": self.temporary
         }
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Item':
+        """Create an item from a dictionary (accepts "type" or the older "item_type" key)."""
+        item = cls(
+            data['name'],
+            data.get('type', data.get('item_type', 'misc')),
+            data.get('stats', {}),
+            data.get('stackable', False),
+            data.get('max_stack', 1),
+            data.get('temporary', False)
+        )
+        if item.stackable and data.get('quantity') is not None:
+            item.quantity = data['quantity']
+        return item
+
     def __str__(self):
         if self.stackable:
             return f"{self.name} x{self.quantity} ({self.item_type})"
@@ -871,7 +1139,10 @@ class Character:
                 
         equipped_data = {}
         for slot, item in self.equipped.items():
-            if item is None:
+            if isinstance(item, list):
+                # Accessories: a list of items
+                equipped_data[slot] = [data for data in (i.to_dict() for i in item if i) if data is not None]
+            elif item is None:
                 equipped_data[slot] = None
             else:
                 item_data = item.to_dict()
@@ -891,10 +1162,47 @@ class Character:
             "current_location": self.current_location
         }
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Character':
+        """Create a character from a dictionary written by to_dict."""
+        character = cls(
+            name=data['name'],
+            character_class=data.get('class', data.get('character_class', 'Warrior')),
+            level=data.get('level', 1)
+        )
+        if 'attributes' in data:
+            character.attributes = data['attributes']
+        if 'hit_points' in data:
+            character.hit_points = data['hit_points']
+        character.inventory = [Item.from_dict(item) for item in data.get('inventory', []) if item]
+        equipped = data.get('equipped', {})
+        for slot in ('weapon', 'armor'):
+            if equipped.get(slot):
+                character.equipped[slot] = Item.from_dict(equipped[slot])
+        character.equipped['accessories'] = [Item.from_dict(item) for item in equipped.get('accessories', []) if item]
+        character.current_location = data.get('current_location', character.current_location)
+        return character
+
 class LazyRuleLoader:
-    def __init__(self, rules_dir_path: str):
+    def __init__(self, rules_dir_path: str, use_pack: bool = False, pack_path: Optional[str] = None,
+                 shared: bool = False):
+        """
+        Args:
+            rules_dir_path: Directory holding the *.json rule files
+            use_pack: Serve rules from a compiled binary pack (see rules_pack.py)
+                instead of parsing each JSON file separately. The pack is
+                rebuilt automatically when any source file changes.
+            pack_path: Optional location of the pack file
+            shared: Memory-map the pack so worker processes share one copy of
+                the rules; sections of a rule file are decoded on first access.
+        """
         self.rules_dir_path = rules_dir_path
         self._loaded_rules: Dict[str, Any] = {}
+        self._pack: Optional[rules_pack.RulesPack] = None
+        self._use_pack = use_pack
+        self._pack_path = pack_path
+        self._shared = shared
+        self._reload_listeners: List[Any] = []
         if not os.path.isdir(self.rules_dir_path):
             # Create the directory if it doesn't exist
             try:
@@ -904,20 +1212,43 @@ class LazyRuleLoader:
                 logger.warning("Could not create rules directory '%s': %s", self.rules_dir_path, e)
                 # Depending on desired behavior, could raise an error or proceed with an empty loader
                 # For now, it will proceed, and attempts to load files will fail gracefully.
+        if use_pack:
+            # Falls back to per-file JSON parsing if the pack can't be read or built
+            self._pack = rules_pack.load_or_build(self.rules_dir_path, pack_path, mapped=shared)
+
+    def _acquire_pack(self) -> Optional[rules_pack.RulesPack]:
+        """The current pack, held open until release() (a reload may retire it meanwhile)."""
+        while True:
+            pack = self._pack
+            if pack is None or pack.acquire():
+                return pack
 
     def __getitem__(self, rule_filename: str) -> Dict[str, Any]:
-        if rule_filename not in self._loaded_rules:
+        # Work on local references so a concurrent reload() swap can't split a lookup
+        loaded_rules = self._loaded_rules
+        if rule_filename not in loaded_rules:
+            pack = self._acquire_pack()
+            if pack is not None:
+                try:
+                    if rule_filename in pack:
+                        loaded_rules[rule_filename] = pack.load(rule_filename)
+                    else:
+                        logger.warning("Rule file '%s' not found in rules pack.", rule_filename)
+                        loaded_rules[rule_filename] = {}
+                finally:
+                    pack.release()
+                return loaded_rules[rule_filename]
             filepath = os.path.join(self.rules_dir_path, rule_filename)
             try:
                 with open(filepath, 'r') as f:
-                    self._loaded_rules[rule_filename] = json.load(f)
+                    loaded_rules[rule_filename] = json.load(f)
             except FileNotFoundError:
                 logger.warning("Rule file '%s' not found.", filepath)
-                self._loaded_rules[rule_filename] = {} # Return empty dict if file not found
+                loaded_rules[rule_filename] = {} # Return empty dict if file not found
             except json.JSONDecodeError:
                 logger.warning("Could not decode JSON from '%s'.", filepath)
-                self._loaded_rules[rule_filename] = {} # Return empty dict if JSON is invalid
-        return self._loaded_rules[rule_filename]
+                loaded_rules[rule_filename] = {} # Return empty dict if JSON is invalid
+        return loaded_rules[rule_filename]
 
     def __setitem__(self, key: str, value: Any):
         raise NotImplementedError("Rules are read-only after initial definition.")
@@ -926,6 +1257,8 @@ class LazyRuleLoader:
         raise NotImplementedError("Rules are read-only and cannot be deleted.")
 
     def keys(self) -> List[str]:
+        if self._pack is not None:
+            return self._pack.keys()
         try:
             return [f for f in os.listdir(self.rules_dir_path) if f.endswith('.json')]
         except FileNotFoundError:
@@ -941,14 +1274,80 @@ class LazyRuleLoader:
         except KeyError: # Should be handled by __getitem__ returning {}
             return default if default is not None else {}
 
+    def add_reload_listener(self, callback) -> None:
+        """Register callback(changed_filenames) to run after rule files are reloaded."""
+        self._reload_listeners.append(callback)
+
+    def reload(self, changed: Optional[Set[str]] = None) -> Set[str]:
+        """
+        Pick up edited rule files without restarting.
+
+        Only the changed entries are dropped; every other parsed rule file
+        stays cached. The new state is swapped in with single attribute
+        assignments, so concurrent readers see either the old or the new
+        rules, never a half-built cache.
+
+        Args:
+            changed: Filenames that were added, modified or removed. None
+                reloads everything.
+
+        Returns:
+            The set of filenames that were invalidated
+        """
+        if changed is None:
+            changed = set(self._loaded_rules) | set(self.keys())
+        pack = None
+        if self._use_pack:
+            # Readers holding views into the old pack keep it alive until they're done
+            pack = rules_pack.load_or_build(self.rules_dir_path, self._pack_path, mapped=self._shared)
+        old_pack = self._pack
+        # Views into the old pack are dropped too, so nothing here keeps it open
+        loaded_rules = {name: rules for name, rules in self._loaded_rules.items()
+                        if name not in changed and not isinstance(rules, rules_pack.LazyRuleFile)}
+        self._pack = pack
+        self._loaded_rules = loaded_rules
+        if old_pack is not None and old_pack is not pack:
+            # Closes its file and mapping once the last view still in use is gone
+            old_pack.retire()
+        logger.info("Reloaded rule files: %s", ", ".join(sorted(changed)) or "none")
+        for callback in list(self._reload_listeners):
+            try:
+                callback(changed)
+            except Exception as e:
+                logger.error(f"Error in rules reload listener: {e}")
+        return changed
+
 class RPGGame:
-    def __init__(self, groq_engine: GroqEngine, save_dir: str = "saves"):
+    def __init__(self, groq_engine: GroqEngine, save_dir: str = "saves",
+                 store: Optional[save_store.SaveStore] = None):
+        """
+        Args:
+            groq_engine: LLM client for narration and dialogue
+            save_dir: Directory of save files
+            store: Optional SQLite save store; when set, saves go to it instead of files
+        """
         self.groq_engine = groq_engine
         self.save_dir = save_dir
+        self.store = store
         self.current_player = None
         self.combat_mode = False
         self.current_enemy = None
-        self.session_history: List[Dict[str, str]] = []
+        self.current_enemy_max_hp: Optional[int] = None
+        # Enemies from the current encounter still waiting to fight
+        self.current_encounter: List[encounters.Enemy] = []
+        # Mechanical result of the most recent player attack
+        self.last_attack: Optional[Dict[str, Any]] = None
+        self.session_history = session_log.ActionLog(HISTORY_WINDOW, self._history_spill_path())
+        # Journal of the file last saved with save_game(journal=True), and what it already holds
+        self._journal: Optional[save_journal.SaveJournal] = None
+        self._journal_marks: Dict[str, Any] = {}
+        # Store session last saved or loaded, and what the store holds for it
+        self._store_session: Optional[str] = None
+        self._store_marks: Dict[str, Any] = {}
+        # In-memory snapshots for undo and branching, taken before each command
+        self.timeline = snapshots.Timeline(self)
+        # Local relevance search over history, events and NPC facts
+        self.memory_index = memory_search.MemoryIndex()
         self.npc_memory = NPCMemory()
         self.temporary_npcs = {}  # Track dynamically created NPCs
         self.game_time = {
@@ -960,7 +1359,19 @@ class RPGGame:
         
         # Memory system
         self.conversation_history: Deque[Dict[str, str]] = deque(maxlen=100)
-        self.memory_summary: str = ""
+        # Scene -> day/region -> synopsis summaries of the session
+        self.summaries = summaries.SummaryTree(self.groq_engine.summarize)
+        # Rule files from "Json Files", served from the shared, memory-mapped rules pack
+        self.rules = LazyRuleLoader(RULES_DIR, use_pack=True, shared=True)
+        # BM25 index over rule sections for grounding DM prompts
+        self.rules_index = rules_search.load_or_build(self.rules, RULES_DIR)
+        # Alias-method samplers over the *_generator random tables
+        self.generators = generators.GeneratorEngine(self.rules)
+        # Seeded dice roller shared by combat resolution
+        self.dice = dice.DiceRoller()
+        self.combat_engine = combat.CombatEngine(self.dice)
+        # Rebuild anything derived from the rules when rule files are hot-reloaded
+        self.rules.add_reload_listener(self._on_rules_reloaded)
         # Ensure save directory exists
         os.makedirs(self.save_dir, exist_ok=True)
         self.command_handlers = {
@@ -1036,10 +1447,21 @@ class RPGGame:
             "show exits": self._handle_exits,  # Alternative
             "map": self._handle_exits,    # Some players might expect this
             
+            # Combat
+            "attack": self._handle_attack,
+            "fight": self._handle_attack,   # Alias
+            "strike": self._handle_attack,  # Alias
+            "flee": self._handle_flee,
+            "escape": self._handle_flee,    # Alias
+            "retreat": self._handle_flee,   # Alias
+            
             # Game management
             "save": self._handle_save,
             "save game": self._handle_save,  # More explicit
             "load": self._handle_load,
+            "undo": self._handle_undo,
+            "branch": self._handle_branch,
+            "switch": self._handle_switch,
             "load game": self._handle_load,  # More explicit
             "saves": self._handle_list_saves,
             "saved games": self._handle_list_saves,  # More explicit
@@ -1054,7 +1476,7 @@ class RPGGame:
             "goodbye": self._handle_exit,  # More formal exit
         }
         self.session_memory = {
-            "actions": [],
+            "actions": session_log.ActionLog(ACTIONS_WINDOW),
             "player_state": {},
             "location_history": [],
             "npc_interactions": {},
@@ -1062,10 +1484,12 @@ class RPGGame:
             "last_prompt": "",
             "last_response": "",
             "context_summary": "",
-            "important_events": [],
+            "important_events": event_store.EventStore(),
             "visited_locations": set(),
             "npcs_met": set(),
         }
+        # Prompt context, rendered per section and only when a section changes
+        self.context_sections = self._build_context_sections()
         
         # Initialize location cache
         self._current_location_cache = {}
@@ -1078,6 +1502,9 @@ class RPGGame:
         self.locations = {}
         self.initialize_locations()
         self._initialize_npcs()
+
+        # Precomputed spawn tables for random encounters on the move
+        self.encounters = encounters.EncounterGenerator(self.rules, self.locations)
         
     def initialize_locations(self):
         """Initialize game locations with their descriptions and connections."""
@@ -1105,25 +1532,37 @@ class RPGGame:
             "Forest Clearing": {
                 "description": "A serene clearing in the middle of a dense forest. The air is fresh and filled with the sounds of wildlife.",
                 "connections": ["Starting Town", "Ancient Ruins"],
-                "npcs": ["Lily"]
+                "npcs": ["Lily"],
+                "encounter_difficulty": "easy"
             },
             "Mountain Pass": {
                 "description": "A narrow path winding through the mountains. The air is thin and the wind howls through the rocks.",
                 "connections": ["Starting Town", "Dwarven Mines"],
-                "npcs": []
+                "npcs": [],
+                "encounter_difficulty": "medium"
             },
             "Dwarven Mines": {
                 "description": "The entrance to ancient dwarven mines. The air is filled with the sound of dripping water and distant echoes.",
                 "connections": ["Mountain Pass"],
-                "npcs": []
+                "npcs": [],
+                "encounter_difficulty": "hard"
             },
             "Ancient Ruins": {
                 "description": "Crumbling stone structures covered in vines. There's an air of mystery and ancient power here.",
                 "connections": ["Forest Clearing"],
-                "npcs": []
+                "npcs": [],
+                "encounter_difficulty": "hard"
             }
         }
 
+    def _on_rules_reloaded(self, changed: Set[str]) -> None:
+        """Invalidate indexes and samplers built from rule files that changed."""
+        for rule_filename in changed:
+            self.generators.invalidate(rule_filename)
+        if "enemies.json" in changed:
+            self.encounters.build()
+        self.rules_index = rules_search.load_or_build(self.rules, RULES_DIR)
+
     def is_likely_npc_name(self, name: str) -> bool:
         """Check if a word is likely an NPC name."""
         # Basic checks for potential NPC names
@@ -1181,7 +1620,7 @@ class RPGGame:
         for npc_name in list(self.temporary_npcs.keys()):
             # Remove from NPC memory
             if npc_name in self.npc_memory.npcs:
-                del self.npc_memory.npcs[npc_name]
+                self.npc_memory.remove_npc(npc_name)
             
             # Remove from location NPC lists
             for location in self.locations.values():
@@ -1690,6 +2129,12 @@ class RPGGame:
                         location=new_location,
                         importance=7
                     )
+
+                # Random encounter on arrival
+                if not self.combat_mode:
+                    encounter = self.encounters.roll(new_location)
+                    if encounter:
+                        result += "\n\n" + self.start_encounter(encounter)
             
             return result
         else:
@@ -2511,46 +2956,19 @@ class RPGGame:
     
     def condense_history(self) -> None:
         """
-        Summarize the conversation history into a memory blob using Groq.
+        Summarize the conversation history into a scene of the summary tree.
         Clears the history after summarization.
         """
         if not self.conversation_history:
             return
             
         try:
-            # Create a copy of the current history
-            old_messages = list(self.conversation_history)
-            
-            # Prepare the prompt for summarization
-            prompt = """
-            Summarize the following conversation into a concise set of key facts, 
-            important details, and character information that the AI DM should remember. 
-            Focus on:
-            - Important character details (names, relationships, traits)
-            - Significant events or decisions
-            - Player preferences or playstyle
-            - Any other important information for maintaining continuity
-            
-            Conversation:
-            """
-            
-            # Format the conversation history
+            # Format the conversation history; the tree bounds what is sent to Groq
             conversation_text = "\n".join(
                 f"{msg['role'].upper()}: {msg['content']}" 
-                for msg in old_messages
+                for msg in self.conversation_history
             )
-            
-            # Get the summary from Groq
-            summary = self.groq_engine.generate_description({
-                "prompt": prompt + "\n" + conversation_text,
-                "max_tokens": 500  # Adjust as needed
-            })
-            
-            # Update the memory summary with the new information
-            if self.memory_summary:
-                self.memory_summary = f"{self.memory_summary}\n\n{summary}"
-            else:
-                self.memory_summary = summary
+            self.summaries.add_scene(conversation_text, self.game_time['day'], self._summary_region())
                 
             # Clear the history
             self.conversation_history.clear()
@@ -2563,11 +2981,51 @@ class RPGGame:
             return
         
     def update_memory_summary(self, new_info: str) -> None:
-        """Update the memory summary with new information."""
-        if not self.memory_summary:
-            self.memory_summary = new_info
-        else:
-            self.memory_summary = f"{self.memory_summary}\n{new_info}"
+        """Record a short note in the memory summary."""
+        self.summaries.add_scene(new_info, self.game_time['day'], self._summary_region(), summarize=False)
+
+    def _summary_region(self) -> str:
+        return self.current_player.current_location if self.current_player else "Unknown"
+
+    @property
+    def memory_summary(self) -> str:
+        """The synopsis plus today's events, for prompts that want one flat summary."""
+        return self.summaries.for_prompt("day")
+
+    @memory_summary.setter
+    def memory_summary(self, text: str) -> None:
+        self.summaries = summaries.SummaryTree.from_text(text, self.groq_engine.summarize)
+
+    @property
+    def memory_index(self) -> memory_search.MemoryIndex:
+        """Relevance index of memories; after a load, built on first access (see _restore_save_data)."""
+        index = self._memory_index
+        if isinstance(index, lazy_load.Lazy):
+            index = self._memory_index = index.get()
+        return index
+
+    @memory_index.setter
+    def memory_index(self, index: Union[memory_search.MemoryIndex, lazy_load.Lazy]) -> None:
+        self._memory_index = index
+
+    def _memory_index_if_built(self) -> Optional[memory_search.MemoryIndex]:
+        """The memory index, or None while it is still to be built from a save (so nothing was indexed since)."""
+        index = self._memory_index
+        if isinstance(index, lazy_load.Lazy) and not index.ready:
+            return None
+        return self.memory_index
+
+    def story_summary(self, detail: str = "region") -> str:
+        """
+        Summary of the session at the granularity a prompt needs.
+        
+        Args:
+            detail: "synopsis", "day", "region" (the player's current location) or "scene"
+            
+        Returns:
+            str: The summary, or "" early in a session
+        """
+        return self.summaries.for_prompt(detail, region=self._summary_region())
             
     def get_game_state(self) -> Dict[str, Any]:
         """Get the complete game state for saving."""
@@ -2841,11 +3299,18 @@ class RPGGame:
         game_state = game_data.get('game_state', {})
         self.session_memory['visited_locations'] = set(game_state.get('locations_visited', []))
         self.game_time = game_state.get('game_time', self.game_time)
-        self.session_history = game_state.get('session_history', [])
+        # The loaded game's history replaces this one's
+        self._discard_history()
+        self.session_history = session_log.ActionLog.from_entries(
+            game_state.get('session_history', []), HISTORY_WINDOW, self._history_spill_path()
+        )
         
         # Restore NPC data
         if 'npc_data' in game_data:
             self.npc_memory = NPCMemory.from_dict(game_data['npc_data'])
+
+        self._rebuild_memory_index()
+        self.timeline.reset()
         
         return "Game loaded successfully!"
 
@@ -2874,9 +3339,51 @@ class RPGGame:
         except Exception as e:
             return f"Error loading game: {str(e)}"
 
+    def _handle_undo(self, args: List[str]) -> str:
+        """Take back the last few turns."""
+        if not self.current_player:
+            return "No active game. Create a character first."
+        try:
+            turns = int(args[0]) if args else 1
+        except ValueError:
+            return "Usage: undo [number of turns]"
+        if turns < 1:
+            return "Usage: undo [number of turns]"
+        steps = self.timeline.undo(turns)
+        if not steps:
+            return "Nothing to undo."
+        return f"Undid {steps} turn{'s' if steps != 1 else ''}. You are back in {self.current_player.current_location}."
+
+    def _handle_branch(self, args: List[str]) -> str:
+        """Mark the current moment by name, or list the marks."""
+        if not self.current_player:
+            return "No active game. Create a character first."
+        if not args:
+            if not self.timeline.branches:
+                return "No branches yet. Use 'branch <name>' to mark this moment."
+            result = ["=== Branches ==="]
+            for name, snapshot in self.timeline.branches.items():
+                current = " (current)" if snapshot is self.timeline.head else ""
+                result.append(f"- {name}: turn {snapshot.actions_total} in {snapshot.to_dict()['location']}{current}")
+            return "\n".join(result)
+        name = " ".join(args)
+        self.timeline.branch(name)
+        return f"Marked this moment as '{name}'. Use 'switch {name}' to come back to it."
+
+    def _handle_switch(self, args: List[str]) -> str:
+        """Go to a moment marked with branch."""
+        if not args:
+            return "Please specify a branch. Use 'branch' to list them."
+        name = " ".join(args)
+        try:
+            self.timeline.checkout(name)
+        except KeyError:
+            return f"No branch named '{name}'. Use 'branch' to list them."
+        return f"Switched to '{name}'. You are in {self.current_player.current_location}."
+
     def _handle_list_saves(self, args: List[str]) -> str:
         """List all available save files."""
-        saves = save_system.list_saves()
+        saves = save_system.list_saves(self.save_dir)
         if not saves:
             return "No save files found."
         
@@ -2897,16 +3404,23 @@ class RPGGame:
         self.current_player = None
         self.combat_mode = False
         self.current_enemy = None
-        self.session_history = []
+        self.current_enemy_max_hp = None
+        self.current_encounter = []
+        self.last_attack = None
+        self._discard_history()
+        self.session_history = session_log.ActionLog(HISTORY_WINDOW, self._history_spill_path())
+        self.memory_index = memory_search.MemoryIndex()
+        self._journal = None
+        self._store_session = None
         self.conversation_history.clear()
-        self.memory_summary = ""
+        self.summaries = summaries.SummaryTree(self.groq_engine.summarize)
         self._current_location_cache = {}
         self._last_known_player_location = None
         self.current_interaction_npc = None
         
         # Reset session memory but keep configuration
         self.session_memory = {
-            "actions": [],
+            "actions": session_log.ActionLog(ACTIONS_WINDOW),
             "player_state": {},
             "location_history": [],
             "npc_interactions": {},
@@ -2914,7 +3428,7 @@ class RPGGame:
             "last_prompt": "",
             "last_response": "",
             "context_summary": "",
-            "important_events": [],
+            "important_events": event_store.EventStore(),
             "visited_locations": set(),
             "npcs_met": set(),
         }
@@ -2941,6 +3455,11 @@ class RPGGame:
             "  save [name]      - Save your game (optional name)",
             "  load <name>      - Load a saved game",
             "  saves            - List all saved games",
+            "  attack           - Attack the enemy you are fighting",
+            "  flee             - Try to escape from a fight",
+            "  undo [n]         - Take back the last n turns (default 1)",
+            "  branch [name]    - Mark this moment to come back to (lists marks without a name)",
+            "  switch <name>    - Go to a moment marked with branch",
             "  help, h          - Show this help message",
             "  exit, quit       - Exit the game"
         ]
@@ -2968,6 +3487,8 @@ class RPGGame:
         """Process user input using command handlers."""
         if not user_input.strip():
             return ""
+        # The state before this command, for undo
+        self.timeline.checkpoint()
             
         # Split input into command and arguments
         parts = user_input.lower().split()
@@ -2975,7 +3496,7 @@ class RPGGame:
         args = parts[1:] if len(parts) > 1 else []
         
         # Advance time for any command except looking around
-        if command not in ["look", "l", "inventory", "i", "status", "stats", "help", "h"]:
+        if command not in ["look", "l", "inventory", "i", "status", "stats", "help", "h", "undo", "branch", "switch"]:
             self.advance_time()
         
         # Check for NPC interaction patterns (e.g., "talk to npc" or "npc_name, hello")
@@ -3002,9 +3523,12 @@ class RPGGame:
                 self.current_player.character_class,
                 self.current_player.level
             )
+            # Ground the description in the most relevant rule sections
+            rule_snippets = tuple(self.rules_index.retrieve(user_input, self.current_player.current_location))
+            memories = tuple(self.recall_memories(user_input))
             # Pass the original, un-lowercased, stripped input for more natural AI descriptions
             try:
-                return self.groq_engine.generate_action_description(player_tuple, user_input.strip())
+                return self.groq_engine.generate_action_description(player_tuple, user_input.strip(), rule_snippets, memories)
             except Exception as e:
                 if 'relationship_status' in str(e):
                     return "Please use the 'Talk to NPC' button at the top to interact with NPCs."
@@ -3023,6 +3547,24 @@ class RPGGame:
     #             except Exception as e:
     #                 print(f"Warning: Failed to load {filename}: {e}")
 
+    def _history_spill_path(self) -> str:
+        """
+        File that session_history entries spill to once they leave the in-memory window.
+        There is one per save directory, so a game restored from it carries on the same file.
+        """
+        return os.path.join(self.save_dir, "history", "session_history.jsonl")
+
+    def _discard_history(self) -> None:
+        """Close session_history and delete what it spilled, when the game starts over."""
+        self.session_history.close()
+        path = self._history_spill_path()
+        for remove in (os.remove, os.rmdir):
+            try:
+                remove(path)
+            except OSError:
+                pass
+            path = os.path.dirname(path)
+
     def update_session_memory(self, action: str, response: str):
         """
         Update the session memory with the latest action and response.
@@ -3031,21 +3573,13 @@ class RPGGame:
             action: The player's action or input
             response: The game's response to the action
         """
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-        action_entry = {
-            "timestamp": timestamp,
-            "action": action,
-            "response": response,
-            "location": self.current_player.current_location if self.current_player else "Unknown"
-        }
+        location = self.current_player.current_location if self.current_player else "Unknown"
         
-        # Update session history and actions
-        self.session_history.append(action_entry)
-        self.session_memory["actions"].append(action_entry)
-        
-        # Keep only the most recent 50 actions to prevent memory bloat
-        if len(self.session_memory["actions"]) > 50:
-            self.session_memory["actions"] = self.session_memory["actions"][-50:]
+        # Both logs are bounded ring buffers; session_history spills to disk
+        self.session_history.append(action, response, location)
+        actions = self.session_memory["actions"]
+        actions.append(action, response, location)
+        self.memory_index.add(f"{action}: {response}", "history", location=location)
             
         # Update last prompt/response
         self.session_memory["last_prompt"] = action
@@ -3060,11 +3594,9 @@ class RPGGame:
         self._update_context_summary()
         
         # Periodically generate a new session summary
-        if len(self.session_memory["actions"]) % 10 == 0:  # Every 10 actions
+        if actions.total % 10 == 0:  # Every 10 actions
             if self.current_player:
                 self.session_memory["last_summary"] = self.generate_session_summary()
-        if self.current_player:
-            self._update_player_state()
             
     def _update_player_state(self):
         """Update the player state in session memory."""
@@ -3086,85 +3618,132 @@ class RPGGame:
             "status_effects": []  # Can be expanded with actual status effects
         }
     
-    def _update_context_summary(self):
-        """Generate and update the context summary for the current game state."""
-        if not self.current_player:
-            self.session_memory["context_summary"] = "New game session started."
-            return
-            
-        # Get recent actions (last 3)
-        recent_actions = self.session_memory.get("actions", [])[-3:]
-        
-        # Initialize environment with default values if not present
-        if 'environment' not in self.session_memory:
-            self.session_memory['environment'] = {
-                'time_of_day': 'day',
-                'weather': 'clear'
-            }
-            
-        # Ensure required environment keys exist
-        env = self.session_memory['environment']
-        if 'time_of_day' not in env:
-            env['time_of_day'] = 'day'
-        if 'weather' not in env:
-            env['weather'] = 'clear'
-        
-        # Build context parts
-        context_parts = [
+    # Sections of the prompt context, in order
+    CONTEXT_SUMMARY_SECTIONS = ("location", "actions", "npcs", "player")
+    GROQ_CONTEXT_SECTIONS = CONTEXT_SUMMARY_SECTIONS + ("story", "combat", "events", "items", "effects")
+
+    def _build_context_sections(self) -> ContextSections:
+        """
+        Register the sections of the prompt context. Each key function only
+        reads the handful of values its section depends on, so an unchanged
+        section is never rendered again.
+        """
+        sections = ContextSections()
+        sections.add("location", self._location_context_key, self._render_location_context)
+        sections.add("actions", lambda: getattr(self.session_memory.get("actions"), "total", None),
+                     self._render_actions_context)
+        sections.add("npcs", lambda: tuple(self._context_location().get("npcs", ()) or ()),
+                     self._render_npcs_context)
+        sections.add("player", self._player_context_key, self._render_player_context)
+        sections.add("story", lambda: (self.summaries.generation, self.summaries.version, self._summary_region()),
+                     self._render_story_context)
+        sections.add("combat", self._combat_context_key, self._render_combat_context)
+        sections.add("events", self._events_context_key, self._render_events_context)
+        sections.add("items", lambda: tuple(self._context_location().get("items", ()) or ()),
+                     self._render_items_context)
+        sections.add("effects", lambda: tuple(self.session_memory.get("player_state", {}).get("status_effects") or ()),
+                     self._render_effects_context)
+        return sections
+
+    def _context_location(self) -> Dict[str, Any]:
+        location = self.session_memory.get('current_location', {})
+        return location if isinstance(location, dict) else {}
+
+    def _location_context_key(self) -> tuple:
+        env = self.session_memory.get('environment') or {}
+        return (self.current_player.current_location, env.get('time_of_day'), env.get('weather'))
+
+    def _render_location_context(self) -> str:
+        # Fill in environment defaults the first time they are needed
+        env = self.session_memory.setdefault('environment', {})
+        env.setdefault('time_of_day', 'day')
+        env.setdefault('weather', 'clear')
+        return "\n".join([
             f"Current Location: {self.current_player.current_location}",
             f"Time: {env['time_of_day'].capitalize()}",
             f"Weather: {env['weather'].capitalize()}",
-            "\nRecent Actions:"
-        ]
-        
-        # Add recent actions
-        for action in recent_actions:
+        ])
+
+    def _render_actions_context(self) -> str:
+        lines = ["\nRecent Actions:"]
+        for action in self.session_memory.get("actions", [])[-3:]:
             # Safely get timestamp and action text
             timestamp = action.get('timestamp', 'Unknown Time')
             action_text = action.get('action', 'Unknown Action')
-            context_parts.append(f"- [{timestamp}] {action_text}")
-        
-        # Add NPCs in current location if available
-        current_location = self.session_memory.get('current_location', {})
-        if isinstance(current_location, dict) and 'npcs' in current_location:
-            npcs = current_location.get('npcs', [])
-            if npcs and isinstance(npcs, list):
-                context_parts.append("\nNPCs here: " + ", ".join(str(npc) for npc in npcs))
-        
-        # Add player status
-        context_parts.extend([
+            lines.append(f"- [{timestamp}] {action_text}")
+        return "\n".join(lines)
+
+    def _render_npcs_context(self) -> str:
+        npcs = self._context_location().get('npcs', [])
+        if npcs and isinstance(npcs, list):
+            return "\nNPCs here: " + ", ".join(str(npc) for npc in npcs)
+        return ""
+
+    def _player_context_key(self) -> tuple:
+        player = self.current_player
+        return (player.name, player.hit_points, player.level, player.character_class)
+
+    def _render_player_context(self) -> str:
+        return "\n".join([
             "\nPlayer Status:",
             f"HP: {self.current_player.hit_points}",
-            f"Level: {self.current_player.level} {self.current_player.character_class}"
+            f"Level: {self.current_player.level} {self.current_player.character_class}",
         ])
-        
-        self.session_memory["context_summary"] = "\n".join(context_parts)
+
+    def _render_story_context(self) -> str:
+        # What has happened so far, in the detail relevant to where the player is
+        story = self.story_summary("region")
+        return f"\nStory so far: {story}" if story else ""
+
+    def _render_items_context(self) -> str:
+        items = self._context_location().get("items")
+        return "\nItems here: " + ", ".join(items) if items else ""
+
+    def _render_effects_context(self) -> str:
+        effects = self.session_memory.get("player_state", {}).get("status_effects")
+        return "\nStatus Effects: " + ", ".join(effects) if effects else ""
+
+    def _current_enemy_info(self) -> tuple:
+        enemy = self.current_enemy
+        if isinstance(enemy, dict):
+            return enemy.get('name', 'an enemy'), enemy.get('hp', '?')
+        return getattr(enemy, 'name', 'an enemy'), getattr(enemy, 'hit_points', '?')
+
+    def _combat_context_key(self) -> tuple:
+        if not (self.combat_mode and self.current_enemy):
+            return ()
+        return self._current_enemy_info()
+
+    def _render_combat_context(self) -> str:
+        if not (self.combat_mode and self.current_enemy):
+            return ""
+        enemy_name, enemy_hp = self._current_enemy_info()
+        return f"\nCOMBAT: Engaged with {enemy_name} (HP: {enemy_hp})"
+
+    def _events_context_key(self) -> tuple:
+        # Notable events look back a few in-game days, so the day is part of the key
+        return (self.current_player.current_location, len(self._event_store()), self.game_time['day'])
+
+    def _render_events_context(self) -> str:
+        notable = self.get_notable_events(self.current_player.current_location, k=3)
+        if notable:
+            return "\nNotable events here: " + "; ".join(event['description'] for event in notable)
+        return ""
+
+    def _update_context_summary(self):
+        """Update the context summary for the current game state, re-rendering only changed sections."""
+        if not self.current_player:
+            self.session_memory["context_summary"] = "New game session started."
+            return
+        self.session_memory["context_summary"] = self.context_sections.render(self.CONTEXT_SUMMARY_SECTIONS)
     
     def build_groq_context(self) -> str:
         """Build a rich context string for Groq AI prompts."""
         if not hasattr(self, 'session_memory') or not self.session_memory:
             return "New game session. No context available yet."
-            
-        # Start with the pre-built context summary
-        context = [self.session_memory.get("context_summary", "")]
-        
-        # Add any additional context that might be useful for the AI
-        if self.combat_mode and self.current_enemy:
-            context.append(f"\nCOMBAT: Engaged with {self.current_enemy.get('name', 'an enemy')} (HP: {self.current_enemy.get('hp', '?')})")
-        
-        # Add items in the current location if available
-        if 'items' in self.session_memory.get('current_location', {}):
-            items = self.session_memory['current_location']['items']
-            if items:
-                context.append("\nItems here: " + ", ".join(items))
-        
-        # Add any important game state information
-        if self.session_memory.get('player_state', {}).get('status_effects'):
-            effects = self.session_memory['player_state']['status_effects']
-            if effects:
-                context.append("\nStatus Effects: " + ", ".join(effects))
-        
-        return "\n".join(filter(None, context))
+        if not self.current_player:
+            return self.session_memory.get("context_summary", "")
+        return self.context_sections.render(self.GROQ_CONTEXT_SECTIONS)
 
     def _generate_session_summary(self):
         """Generate a summary of recent actions for session context."""
@@ -3263,6 +3842,7 @@ class RPGGame:
                 }
             }
         }
+        self.encounters.build(self.locations, self.enemies)
 
     def create_character(self, name: str, character_class: str) -> Character:
         """Create a new character with the given name and class."""
@@ -3284,6 +3864,8 @@ class RPGGame:
             gold_item = self.current_player.get_item("Gold Pieces")
             if gold_item:
                 gold_item.quantity = 10  # Start with 10 gold pieces
+            # Undo history belongs to the previous character
+            self.timeline.reset()
                 
             return self.current_player
         except ValueError as e:
@@ -3357,36 +3939,134 @@ class RPGGame:
         if not self.current_enemy:
             return "No enemy to attack!"
             
+        enemy_hp_before = self.current_enemy.hit_points
+        if self.current_enemy_max_hp is None:
+            self.current_enemy_max_hp = enemy_hp_before
+
         # Calculate attack roll
-        roll = random.randint(1, 20)
+        roll = self.dice.d20()
         # Access squad_tactics.json through LazyRuleLoader
         squad_tactics_rules = self.rules["squad_tactics.json"]
+        # Toughness is what strength used to be; its modifier adds to hit and damage
+        attributes = self.current_player.attributes
+        modifier = (attributes.get("toughness", attributes.get("strength", 10)) - 10) // 2
+        weapon_damage = self.dice.roll("1d6")
         if not squad_tactics_rules: # Handle case where rule file failed to load
              logger.warning("squad_tactics.json rules not available for combat.")
-             hit_bonus = self.current_player.attributes.get("strength", 0) # Default bonus
-             damage = self.current_player.attributes.get("strength", 0) # Default damage
+             hit_bonus = modifier # Default bonus
+             damage = max(1, weapon_damage + modifier) # Default damage
         else:
-            hit_bonus = self.current_player.attributes.get("strength", 0) + squad_tactics_rules.get("combat", {}).get("hit_bonus", 0)
-            damage = self.current_player.attributes.get("strength", 0) + squad_tactics_rules.get("combat", {}).get("damage_bonus", 0)
+            hit_bonus = modifier + squad_tactics_rules.get("combat", {}).get("hit_bonus", 0)
+            damage = max(1, weapon_damage + modifier + squad_tactics_rules.get("combat", {}).get("damage_bonus", 0))
 
         total_roll = roll + hit_bonus
-        
+        enemy = self.current_enemy
+        self.last_attack = {
+            "enemy": enemy.name,
+            "enemy_level": getattr(enemy, 'level', 'N/A'),
+            "enemy_max_hp": self.current_enemy_max_hp,
+            "roll": roll,
+            "total": total_roll,
+            "outcome": "miss",
+            "damage": 0,
+            "enemy_hp": enemy_hp_before,
+        }
+
         # Check if hit
         if total_roll >= 10:  # Base AC
-            self.current_enemy.hit_points -= damage
-            
-            if self.current_enemy.hit_points <= 0:
+            enemy.hit_points -= damage
+            self.last_attack.update(outcome="hit", damage=damage, enemy_hp=max(enemy.hit_points, 0))
+
+            if enemy.hit_points <= 0:
+                self.last_attack["outcome"] = "kill"
+                if self.current_encounter:
+                    self.current_enemy = self.current_encounter.pop(0)
+                    self.current_enemy_max_hp = None
+                    return f"You strike down the {enemy.name}! The {self.current_enemy.name} steps up to fight."
                 self.end_combat("You defeated the enemy!")
                 return "You strike a killing blow! The enemy falls to the ground."
-                
-            return f"You hit the {self.current_enemy.name} for {damage} damage!"
-        
-        return f"You miss the {self.current_enemy.name}!"
+
+            return f"You hit the {enemy.name} for {damage} damage!"
+
+        return f"You miss the {enemy.name}!"
+
+    def _handle_attack(self, args: List[str]) -> str:
+        """Attack the current enemy (see handle_attack)."""
+        if not self.combat_mode or not self.current_enemy or not self.current_player:
+            self.last_attack = None
+            return "There is nothing to fight here."
+        enemy_name = self.current_enemy.name
+        result = self.handle_attack()
+        self.update_session_memory(f"attacked the {enemy_name}", result)
+        return result
+
+    def _handle_flee(self, args: List[str]) -> str:
+        """Try to escape from combat: a d20 plus nimbleness modifier against DC 10."""
+        if not self.combat_mode or not self.current_enemy or not self.current_player:
+            return "You are not in a fight."
+        enemy_name = self.current_enemy.name
+        nimbleness = self.current_player.attributes.get("nimbleness", 10)
+        if self.dice.d20() + (nimbleness - 10) // 2 >= 10:
+            result = self.end_combat(f"You escape from the {enemy_name}.")
+        else:
+            result = f"The {enemy_name} blocks your escape!"
+        self.update_session_memory(f"tried to flee from the {enemy_name}", result)
+        return result
+
+    def combat_narration_args(self) -> Optional[Tuple[tuple, tuple, str]]:
+        """
+        Arguments for GroqEngine.generate_combat_description describing the
+        last attack, with HP reduced to health buckets so cached narration is
+        reused across similar turns.
+
+        Returns:
+            (player_tuple, enemy_tuple, outcome), or None if nothing to narrate
+        """
+        if not self.last_attack or not self.current_player:
+            return None
+        attack = self.last_attack
+        player = self.current_player
+        player_tuple = (
+            player.name,
+            player.character_class,
+            player.level,
+            combat.health_bucket(player.hit_points, player.calculate_hit_points())
+        )
+        enemy_tuple = (
+            attack["enemy"],
+            attack["enemy_level"],
+            combat.health_bucket(attack["enemy_hp"], attack["enemy_max_hp"])
+        )
+        return player_tuple, enemy_tuple, attack["outcome"]
+
+    def start_encounter(self, encounter: encounters.Encounter) -> str:
+        """
+        Enter combat with the enemies of an encounter, one at a time.
+
+        Args:
+            encounter: An encounter rolled by self.encounters
+
+        Returns:
+            str: Message announcing the encounter
+        """
+        self.combat_mode = True
+        self.current_enemy = encounter.enemies[0]
+        self.current_encounter = list(encounter.enemies[1:])
+        self.current_enemy_max_hp = None
+        self.add_important_event(
+            event_type="combat",
+            description=encounter.describe(),
+            location=encounter.location,
+            importance=6
+        )
+        return f"{encounter.describe()} Type 'attack' to fight or 'flee' to escape."
 
     def end_combat(self, message: str) -> str:
         """End combat mode with a message."""
         self.combat_mode = False
         self.current_enemy = None
+        self.current_enemy_max_hp = None
+        self.current_encounter = []
         return message
 
     def show_inventory(self):
@@ -3459,44 +4139,83 @@ Weight: {item.stats.get('weight', 0)} kg
 Attributes: {json.dumps(item.stats, indent=2)}
 """
     
-    def save_game(self, filename: str = None) -> str:
+    def save_game(self, filename: str = None, journal: bool = False, binary: bool = False,
+                  chunked: bool = False) -> str:
         """
         Save the current game state to a file, including NPC system data.
         
         Args:
             filename: Optional filename to save to. If not provided, uses a timestamp.
+            journal: Append only what changed since the last journaled save of this
+                file to its journal (see save_journal.py) instead of rewriting it.
+                The first journaled save of a file writes a full snapshot.
+            binary: Write the compact binary format (see save_format.py) instead of JSON.
+                Journaled saves are always JSON.
+            chunked: Keep large sections (events, NPCs) in the save directory's
+                chunk store (see chunk_store.py), shared with other saves, so the
+                file only costs what changed. Ignored for journaled and binary saves.
             
         Returns:
             str: Status message indicating success or failure
         """
         if not self.current_player:
             return "No active game to save."
+
+        if self.store is not None and not (journal or binary):
+            session = self._store_session_name(filename) or \
+                f"{self.current_player.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            try:
+                self._save_to_store(session)
+                return f"Game saved successfully to {session}"
+            except Exception as e:
+                logger.error(f"Error saving game to the save store: {e}")
+                return f"Failed to save game: {e}"
             
         # Create saves directory if it doesn't exist
         os.makedirs(self.save_dir, exist_ok=True)
         
         # Generate filename if not provided
+        binary = binary and not journal
+        chunked = chunked and not (journal or binary)
+        extension = save_format.BINARY_EXTENSION if binary else '.json'
         if not filename:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{self.current_player.name}_{timestamp}.json"
-        elif not filename.endswith('.json'):
-            filename += '.json'
+            filename = f"{self.current_player.name}_{timestamp}{extension}"
+        elif not filename.endswith(save_system.SAVE_EXTENSIONS):
+            filename += extension
             
         save_path = os.path.join(self.save_dir, filename)
         
         try:
-            # Prepare game data for saving
-            save_data = {
-                "player": self.current_player.to_dict(),
-                "session_memory": self.session_memory,
-                "npc_memory": self.npc_memory.to_dict(),
+            if filename.endswith(save_format.BINARY_EXTENSION):
+                save_data = self._build_save_data()
+                save_system.write_atomic(save_path, lambda f: save_format.dump(save_data, f))
+            elif journal:
+                self._save_journaled(save_path)
+            elif chunked:
+                chunks = chunk_store.for_dir(self.save_dir)
+                save_data, digests = chunks.split(self._build_save_data())
+                # Pin the chunks before the file refers to them, drop the old ones after
+                chunks.retain(filename, digests)
+                save_system.write_json_atomic(save_path, save_data, indent=2)
+                chunks.commit(filename, digests)
+            else:
+                # Save to a temp file and rename it into place, so a crash can't leave a torn save
+                save_system.write_json_atomic(save_path, self._build_save_data(), indent=2)
+            if not (journal or binary):
+                # A full save replaces any journal the file had
+                save_journal.discard_journal(save_path)
+                if self._journal and self._journal.snapshot_path == save_path:
+                    self._journal = None
+            if not chunked:
+                # Chunks an earlier save to this file used are no longer needed
+                chunk_store.for_dir(self.save_dir).release(filename)
+
+            # Keep the save manifest current so listing saves never opens them
+            save_system.record_save(filename, {
+                "player": {"name": self.current_player.name, "level": self.current_player.level},
                 "timestamp": datetime.now().isoformat(),
-                "version": "1.1.0"  # Bump version for NPC system
-            }
-            
-            # Save to file
-            with open(save_path, 'w', encoding='utf-8') as f:
-                json.dump(save_data, f, indent=2, ensure_ascii=False, default=str)
+            }, self.save_dir)
                 
             return f"Game saved successfully to {filename}"
             
@@ -3514,142 +4233,453 @@ Attributes: {json.dumps(item.stats, indent=2)}
         Returns:
             str: Status message indicating success or failure
         """
-        if not filename.endswith('.json'):
-            filename += '.json'
-            
-        save_path = os.path.join(self.save_dir, filename)
-        
-        if not os.path.exists(save_path):
-            return f"Save file '{filename}' not found."
+        session = self._store_session_name(filename)
+        if self.store is not None and self.store.exists(session):
+            save_path = None
+        else:
+            session = None
+            if not filename.endswith(save_system.SAVE_EXTENSIONS):
+                binary_name = filename + save_format.BINARY_EXTENSION
+                filename += '.json'
+                if not os.path.exists(os.path.join(self.save_dir, filename)) and os.path.exists(os.path.join(self.save_dir, binary_name)):
+                    filename = binary_name
+
+            save_path = os.path.join(self.save_dir, filename)
+
+            if not os.path.exists(save_path):
+                return f"Save file '{filename}' not found."
             
+        lazy_sections = {}
+        read_npc = None
         try:
-            with open(save_path, 'r', encoding='utf-8') as f:
-                save_data = json.load(f)
+            if session is not None:
+                save_data = self.store.load(session, max_actions=ACTIONS_WINDOW)
+            elif save_format.is_binary_save(save_path):
+                # With a section offset table, NPCs and events are read when first needed
+                sections = save_format.save_sections(save_path) or []
+                for section in LAZY_SAVE_SECTIONS:
+                    if any(found[:len(section)] == section for found in sections):
+                        lazy_sections[section] = functools.partial(save_format.read_section, save_path, section)
+                save_data = save_format.read_save(save_path, exclude=list(lazy_sections))
+                if ("npc_memory",) in lazy_sections:
+                    read_npc = functools.partial(save_format.read_entry, save_path, ("npc_memory", "npcs"))
+            else:
+                # Snapshot plus any journaled changes
+                save_data = save_journal.load_state(save_path)
+                if chunk_store.is_chunked(save_data):
+                    # Chunked sections are read from the chunk store when first needed
+                    lazy_sections, read_npc = self._chunked_sections(save_data)
                 
             # Verify version compatibility
             save_version = save_data.get('version', '1.0.0')  # Default to 1.0.0 for backward compatibility
-            if save_version not in ["1.0.0", "1.1.0"]:
+            if save_version not in SUPPORTED_SAVE_VERSIONS:
                 return f"Incompatible save file version: {save_version}"
             
             # Load player data
-            player_data = save_data.get('player', {})
-            if not player_data:
+            if not save_data.get('player'):
                 return "Invalid save file: Missing player data"
-                
-            # Create player from saved data
-            self.current_player = Character(
-                name=player_data['name'],
-                character_class=player_data['character_class'],
-                level=player_data['level']
-            )
-            
-            # Restore player state
-            if 'hit_points' in player_data:
-                self.current_player.hit_points = player_data['hit_points']
-            
-            # Restore inventory
-            if 'inventory' in player_data:
-                self.current_player.inventory = [
-                    Item(
-                        item['name'], 
-                        item['item_type'], 
-                        item.get('stats', {}),
-                        item.get('stackable', False), 
-                        item.get('max_stack', 1),
-                        item.get('temporary', False)  # Load the temporary flag, default to False for backward compatibility
-                    )
-                    for item in player_data['inventory']
-                ]
-            
-            # Restore equipped items
-            if 'equipped' in player_data:
-                equipped = player_data['equipped']
-                if 'weapon' in equipped and equipped['weapon']:
-                    w = equipped['weapon']
-                    self.current_player.equipped['weapon'] = Item(
-                        w['name'], 
-                        w['item_type'], 
-                        w.get('stats', {}),
-                        w.get('stackable', False),
-                        w.get('max_stack', 1),
-                        w.get('temporary', False)  # Load the temporary flag for equipped weapon
-                    )
-                    
-                if 'armor' in equipped and equipped['armor']:
-                    a = equipped['armor']
-                    self.current_player.equipped['armor'] = Item(
-                        a['name'], 
-                        a['item_type'], 
-                        a.get('stats', {}),
-                        a.get('stackable', False),
-                        a.get('max_stack', 1),
-                        a.get('temporary', False)  # Load the temporary flag for equipped armor
-                    )
-                
-                if 'accessories' in equipped:
-                    self.current_player.equipped['accessories'] = [
-                        Item(
-                            acc['name'], 
-                            acc['item_type'], 
-                            acc.get('stats', {}),
-                            acc.get('stackable', False),
-                            acc.get('max_stack', 1),
-                            acc.get('temporary', False)  # Load the temporary flag for accessories
-                        )
-                        for acc in equipped['accessories']
-                    ]
-            
-            # Restore session memory
-            self.session_memory = save_data.get('session_memory', {})
-            
-            # Convert lists back to sets for compatibility
-            if 'visited_locations' in self.session_memory and isinstance(self.session_memory['visited_locations'], list):
-                self.session_memory['visited_locations'] = set(self.session_memory['visited_locations'])
-            if 'npcs_met' in self.session_memory and isinstance(self.session_memory['npcs_met'], list):
-                self.session_memory['npcs_met'] = set(self.session_memory['npcs_met'])
-            
-            # Load NPC memory if available (version 1.1.0+)
-            if save_version >= "1.1.0" and 'npc_memory' in save_data:
-                self.npc_memory = NPCMemory.from_dict(save_data['npc_memory'])
-            else:
-                # For older saves, initialize with default NPCs and update with any met NPCs
-                self._initialize_npcs()
-                if 'npcs_met' in self.session_memory:
-                    for npc_name in self.session_memory['npcs_met']:
-                        if npc_name in self.npc_memory.npcs:
-                            self.npc_memory.npcs[npc_name].last_seen = datetime.now()
-            
-            # Restore game state
-            self.current_enemy = save_data.get('current_enemy')
-            self.combat_mode = save_data.get('combat_mode', False)
-            self.current_time = save_data.get('current_time', time.time())
-            self.current_weather = save_data.get('current_weather', 'clear')
-            
-            # Invalidate location cache to force refresh
-            self._current_location_cache = None
-            self._last_known_player_location = self.current_player.current_location
-            
-            # Update the location cache
-            self.get_current_location(force_refresh=True)
-            
-            # Update NPC last seen times if needed
-            current_time = datetime.now()
-            for npc in self.npc_memory.npcs.values():
-                if not hasattr(npc, 'last_seen'):
-                    npc.last_seen = current_time
+
+            self._restore_save_data(save_data, lazy_sections, read_npc)
+            if session is not None:
+                # Later saves to this session only write what changes from here
+                self._store_session = session
+                self._store_marks = self._current_journal_marks()
             
             return f"Game loaded successfully. Welcome back, {self.current_player.name}!"
             
         except Exception as e:
             logger.error(f"Error loading game: {e}")
             return f"Failed to load game: {str(e)}"
+
+    def _build_save_data(self, large_sections: bool = True) -> Dict[str, Any]:
+        """
+        Everything save_game writes, as plain JSON-ready data.
+
+        Args:
+            large_sections: False leaves out NPCs and events (LAZY_SAVE_SECTIONS)
+        """
+        return {
+            "player": self.current_player.to_dict(),
+            "session_memory": self._session_memory_for_save(events=large_sections),
+            "summaries": self.summaries.to_dict(),
+            **({"npc_memory": self.npc_memory.to_dict()} if large_sections else {}),
+            "game_time": dict(self.game_time),
+            "timestamp": datetime.now().isoformat(),
+            "version": SAVE_VERSION
+        }
+
+    def _restore_save_data(self, save_data: Dict[str, Any],
+                           lazy_sections: Optional[Dict[Tuple[str, ...], Callable[[], Any]]] = None,
+                           read_npc: Optional[Callable[[str], Optional[Dict]]] = None) -> None:
+        """
+        Restore the game from data written by _build_save_data (or an older save).
+
+        The player, session memory and current location are restored right
+        away. NPCs, the event store and the memory index are built on first
+        use, and meanwhile on a background thread, so the player can carry on
+        however big the save is.
+
+        Args:
+            save_data: The save, possibly without the LAZY_SAVE_SECTIONS
+            lazy_sections: Readers for the sections left out of save_data
+            read_npc: Reads one saved NPC by lowercase name, without reading the rest
+        """
+        lazy_sections = lazy_sections or {}
+        save_version = save_data.get('version', '1.0.0')
+        self.current_player = Character.from_dict(save_data['player'])
+        
+        # Restore session memory
+        self.session_memory = save_data.get('session_memory', {})
+        self.session_memory['actions'] = session_log.ActionLog.from_entries(
+            self.session_memory.get('actions', []), ACTIONS_WINDOW
+        )
+        saved_events = self.session_memory.pop('important_events', [])
+        raw_events = lazy_load.Lazy(lazy_sections.get(("session_memory", "important_events"), lambda: saved_events),
+                                    "saved events")
+        events = lazy_load.Lazy(lambda: event_store.EventStore.from_list(raw_events.get() or []), "event store")
+        self.session_memory['important_events'] = events
+        # Location memories refer to events by id; older saves held copies of the events
+        location_memories = self.session_memory.get('location_memories', {})
+        if any(not isinstance(event_id, int) for loc_mem in location_memories.values()
+               for event_id in loc_mem.get('important_events', [])):
+            for location_name, loc_mem in location_memories.items():
+                loc_mem['important_events'] = self._event_store().ids_at(location_name)
+        self.summaries = summaries.SummaryTree.from_dict(save_data.get('summaries', {}), self.groq_engine.summarize)
+        if 'game_time' in save_data:
+            self.game_time.update(save_data['game_time'])
+        
+        # Convert lists back to sets for compatibility
+        if 'visited_locations' in self.session_memory and isinstance(self.session_memory['visited_locations'], list):
+            self.session_memory['visited_locations'] = set(self.session_memory['visited_locations'])
+        if 'npcs_met' in self.session_memory and isinstance(self.session_memory['npcs_met'], list):
+            self.session_memory['npcs_met'] = set(self.session_memory['npcs_met'])
+        
+        # Load NPC memory if available (version 1.1.0+)
+        raw_npcs = saved_sections = None
+        if save_version >= "1.1.0" and ('npc_memory' in save_data or ("npc_memory",) in lazy_sections):
+            saved_npcs = save_data.get('npc_memory')
+            raw_npcs = lazy_load.Lazy(lazy_sections.get(("npc_memory",), lambda: saved_npcs), "saved NPCs")
+            # The timeline's first snapshot (see below) takes its NPCs and events from the save
+            saved_sections = lazy_load.Lazy(lambda: snapshots.freeze({
+                "session_memory": {"important_events": raw_events.get() or []},
+                "npc_memory": raw_npcs.get() or {},
+            }), "saved sections")
+            read_one = read_npc or (lambda key: (raw_npcs.get() or {}).get("npcs", {}).get(key))
+
+            def read_all():
+                # Copied for the timeline before live NPCs take over (and change) the saved data
+                saved_sections.get()
+                return raw_npcs.get()
+
+            self.npc_memory = LazyNPCMemory(read_all, lambda key: copy.deepcopy(read_one(key)))
+        else:
+            # For older saves, initialize with default NPCs and update with any met NPCs
+            self._initialize_npcs()
+            if 'npcs_met' in self.session_memory:
+                for npc_name in self.session_memory['npcs_met']:
+                    if npc_name in self.npc_memory.npcs:
+                        self.npc_memory.npcs[npc_name].last_seen = datetime.now()
+        
+        # Restore game state
+        self.current_enemy = save_data.get('current_enemy')
+        self.combat_mode = save_data.get('combat_mode', False)
+        self.current_time = save_data.get('current_time', time.time())
+        self.current_weather = save_data.get('current_weather', 'clear')
+        
+        # Invalidate location cache to force refresh
+        self._current_location_cache = None
+        self._last_known_player_location = self.current_player.current_location
+        
+        # Update the location cache (reads only the NPCs that are here)
+        self.get_current_location(force_refresh=True)
+
+        history = list(self.session_history)
+        memory_index = lazy_load.Lazy(
+            lambda: self._memory_index_from_save(history, raw_events.get(), raw_npcs.get() if raw_npcs else None),
+            "memory index")
+        self.memory_index = memory_index
+        loads = [events.get, memory_index.get]
+        if isinstance(self.npc_memory, LazyNPCMemory):
+            loads.insert(1, self.npc_memory.materialize)
+        lazy_load.prefetch(loads, name="save-loader")
+        # The next journaled or store save starts from a full write
+        self._journal = None
+        self._store_session = None
+        if saved_sections is None:
+            self.timeline.reset()
+            return
+        # The game as loaded, for the first checkpoint: small sections copied now, the rest from the save
+        loaded = snapshots.freeze(self._build_save_data(large_sections=False))
+
+        def root() -> Dict[str, Any]:
+            sections = saved_sections.get()
+            return {**loaded, "session_memory": {**loaded["session_memory"], **sections["session_memory"]},
+                    "npc_memory": sections["npc_memory"]}
+
+        self.timeline.reset(root)
+
+    def footprint(self) -> Dict[str, int]:
+        """
+        Counts of what this game holds in memory (NPCs, events, indexed
+        memories, snapshots), without building anything still loading lazily.
+        """
+        memory = self.npc_memory
+        events = self.session_memory.get('important_events')
+        index = self._memory_index
+        return {
+            "npcs": len(memory.npcs) if not isinstance(memory, LazyNPCMemory) or memory.materialized else 0,
+            "events": len(events) if isinstance(events, (event_store.EventStore, list)) else 0,
+            "memories": len(index) if isinstance(index, memory_search.MemoryIndex) else 0,
+            "snapshots": len(self.timeline.history()),
+        }
+
+    def _snapshot_extras(self) -> Tuple:
+        """Combat state, which saves leave out but undo brings back (see snapshots.Snapshot)."""
+        return copy.deepcopy((self.combat_mode, self.current_enemy, self.current_enemy_max_hp, self.current_encounter))
+
+    def _rewind(self, current: Dict[str, Any], target: Dict[str, Any], actions_total: int, extras: Tuple) -> None:
+        """
+        Bring the live game from one snapshot state to another (see snapshots.py),
+        rebuilding only the parts that differ between the two.
+
+        Args:
+            current: State of the snapshot the game is at
+            target: State of the snapshot to go to
+            actions_total: Actions taken up to the target (ActionLog.total)
+            extras: The target's _snapshot_extras()
+        """
+        thaw = snapshots.thaw
+        if target['player'] is not current['player']:
+            self.current_player = Character.from_dict(thaw(target['player']))
+        if target.get('game_time') is not current.get('game_time'):
+            self.game_time.update(thaw(target.get('game_time') or {}))
+        if target.get('summaries') is not current.get('summaries'):
+            self.summaries = summaries.SummaryTree.from_dict(thaw(target.get('summaries') or {}), self.groq_engine.summarize)
+
+        old_memory, new_memory = current['session_memory'], target['session_memory']
+        for key in old_memory.keys() | new_memory.keys():
+            value = new_memory.get(key)
+            if value is old_memory.get(key):
+                continue
+            if key == 'important_events':
+                # Keep the events both states share and replace the rest
+                events = self._event_store()
+                kept = value.common_prefix(old_memory[key])
+                events.truncate(kept)
+                events.extend(value.iter_from(kept))
+            elif key == 'actions':
+                actions = session_log.ActionLog.from_entries(thaw(value), ACTIONS_WINDOW)
+                actions.total = actions_total
+                self.session_memory['actions'] = actions
+            elif key not in new_memory:
+                self.session_memory.pop(key, None)
+            elif key in ('visited_locations', 'npcs_met'):
+                self.session_memory[key] = set(value)
+            else:
+                self.session_memory[key] = thaw(value)
+
+        old_npcs, new_npcs = current['npc_memory'], target['npc_memory']
+        if new_npcs['npcs'] is not old_npcs['npcs']:
+            for key in new_npcs['npcs'].changed_keys(old_npcs['npcs']):
+                data = new_npcs['npcs'].get(key)
+                if data is None:
+                    self.npc_memory.remove_npc(key)
+                else:
+                    self.npc_memory.add_npc(NPC.from_dict(thaw(data)))
+        if new_npcs.get('factions') is not old_npcs.get('factions'):
+            self.npc_memory.factions = thaw(new_npcs.get('factions') or {})
+
+        self.combat_mode, self.current_enemy, self.current_enemy_max_hp, self.current_encounter = copy.deepcopy(extras)
+        # Rebuilt from the restored state on next use
+        self._current_location_cache = None
     
-    def list_saves(self) -> List[str]:
-        """List all available save files."""
-        save_dir = Path("saves")
-        if not save_dir.exists():
-            return []
-        return [f.name for f in save_dir.glob("*.json") if f.is_file()]
+    def _chunked_sections(self, save_data: Dict[str, Any]) -> Tuple[Dict[Tuple[str, ...], Callable[[], Any]],
+                                                                    Optional[Callable[[str], Optional[Dict]]]]:
+        """Lazy section readers (see _restore_save_data) for the chunk references in a chunked save."""
+        chunks = chunk_store.for_dir(self.save_dir)
+        lazy_sections, read_npc = {}, None
+        events_ref = (save_data.get('session_memory') or {}).get('important_events')
+        if chunk_store.is_chunk_ref(events_ref):
+            lazy_sections[("session_memory", "important_events")] = functools.partial(chunks.load_ref, events_ref)
+        npc_memory = save_data.get('npc_memory') or {}
+        if chunk_store.is_chunk_ref(npc_memory.get('npcs')):
+            lazy_sections[("npc_memory",)] = lambda: {**npc_memory, "npcs": chunks.load_ref(npc_memory['npcs'])}
+            read_npc = functools.partial(chunks.load_entry, npc_memory['npcs'])
+        return lazy_sections, read_npc
+
+    def _session_memory_for_save(self, events: bool = True) -> Dict[str, Any]:
+        """session_memory as plain data: the action log and event store flattened to lists, sets to sorted lists."""
+        memory = {
+            **{key: sorted(value) if isinstance(value, set) else value for key, value in self.session_memory.items()
+               if key != "important_events"},
+            "actions": list(self.session_memory.get("actions", [])),
+        }
+        if events:
+            memory["important_events"] = list(self._event_store())
+        return memory
+
+    def _save_journaled(self, save_path: str) -> None:
+        """Append the changes since the last journaled save, or start a new journal with a snapshot."""
+        if self._journal is None or self._journal.snapshot_path != save_path:
+            self._journal = save_journal.SaveJournal(save_path)
+            self._journal.write_snapshot(self._build_save_data())
+            self._journal_marks = self._current_journal_marks()
+            return
+        self._journal.append(self._journal_ops())
+
+    @staticmethod
+    def _store_session_name(filename: Optional[str]) -> Optional[str]:
+        """Save store session for a save name: the name without its file extension."""
+        if filename and filename.endswith(save_system.SAVE_EXTENSIONS):
+            return os.path.splitext(filename)[0]
+        return filename
+
+    def _save_to_store(self, session: str) -> None:
+        """Write the rows changed since the last save of this session, or all of it the first time."""
+        if self._store_session != session:
+            self.store.write_state(session, self._build_save_data())
+            self._store_session = session
+            self._store_marks = self._current_journal_marks()
+            return
+        self.store.apply(session, self._journal_ops(self._store_marks))
+
+    def _current_journal_marks(self) -> Dict[str, Any]:
+        """What the state looks like right now, for comparing at the next journaled save."""
+        memory = {}
+        for key, value in self.session_memory.items():
+            if key in ("actions", "important_events"):
+                continue
+            if isinstance(value, dict):
+                memory[key] = {sub: _dumps(sub_value) for sub, sub_value in value.items()}
+            else:
+                memory[key] = _dumps(sorted(value) if isinstance(value, set) else value)
+        # NPCs still loading from a save are as saved: None stands for that (see _journal_ops)
+        npcs_loading = isinstance(self.npc_memory, LazyNPCMemory) and not self.npc_memory.materialized
+        return {
+            "player": _dumps(self.current_player.to_dict()),
+            "memory": memory,
+            "actions": getattr(self.session_memory.get("actions"), "total", 0),
+            "events": len(self._event_store()),
+            "summaries": (self.summaries.generation, self.summaries.version),
+            "action_log": getattr(self.session_memory.get("actions"), "generation", None),
+            "event_log": self._event_store().generation,
+            "npc_memory": self.npc_memory.generation,
+            "npc_version": None if npcs_loading else self.npc_memory.version,
+            "factions": None if npcs_loading else _dumps(self.npc_memory.factions),
+            "game_time": _dumps(self.game_time),
+        }
+
+    def _journal_ops(self, marks: Optional[Dict[str, Any]] = None) -> List[list]:
+        """
+        Ops (see save_journal.apply_ops) for everything that changed since the
+        last journaled save. Append-only data (actions, events) and NPCs are
+        tracked by counters, so the cost follows the number of changes.
+        
+        Args:
+            marks: State as of the previous call, from _current_journal_marks
+                (defaults to the save journal's); updated in place
+        """
+        marks = self._journal_marks if marks is None else marks
+        ops = []
+
+        def set_if_changed(path: List[str], value: Any, mark_key: str, marks_dict: Dict[str, Any]) -> None:
+            encoded = _dumps(value)
+            if marks_dict.get(mark_key) != encoded:
+                ops.append(["set", path, value])
+                marks_dict[mark_key] = encoded
+
+        set_if_changed(["player"], self.current_player.to_dict(), "player", marks)
+        set_if_changed(["game_time"], dict(self.game_time), "game_time", marks)
+
+        # Small session_memory entries: compared key by key, dicts entry by entry
+        memory_marks = marks["memory"]
+        for key, value in self.session_memory.items():
+            if key in ("actions", "important_events"):
+                continue
+            if isinstance(value, dict):
+                sub_marks = memory_marks.get(key)
+                if not isinstance(sub_marks, dict):
+                    ops.append(["set", ["session_memory", key], value])
+                    memory_marks[key] = {sub: _dumps(sub_value) for sub, sub_value in value.items()}
+                    continue
+                for sub, sub_value in value.items():
+                    set_if_changed(["session_memory", key, sub], sub_value, sub, sub_marks)
+                for sub in [sub for sub in sub_marks if sub not in value]:
+                    ops.append(["del", ["session_memory", key, sub]])
+                    del sub_marks[sub]
+            else:
+                set_if_changed(["session_memory", key], sorted(value) if isinstance(value, set) else value, key, memory_marks)
+        for key in [key for key in memory_marks if key not in self.session_memory]:
+            ops.append(["del", ["session_memory", key]])
+            del memory_marks[key]
+
+        # Append-only logs: only the new entries
+        actions = self.session_memory.get("actions")
+        total = getattr(actions, "total", 0)
+        generation = getattr(actions, "generation", None)
+        if total < marks["actions"] or generation != marks.get("action_log"):
+            ops.append(["set", ["session_memory", "actions"], list(actions or [])])
+        elif total > marks["actions"]:
+            new_actions = actions.recent(min(total - marks["actions"], ACTIONS_WINDOW))
+            ops.append(["extend", ["session_memory", "actions"], new_actions, ACTIONS_WINDOW])
+        marks["actions"] = total
+        marks["action_log"] = generation
+
+        events = self._event_store()
+        event_log = events.generation
+        if len(events) < marks["events"] or event_log != marks.get("event_log"):
+            ops.append(["set", ["session_memory", "important_events"], events.to_list()])
+        elif len(events) > marks["events"]:
+            ops.append(["extend", ["session_memory", "important_events"],
+                        [events.get(i) for i in range(marks["events"], len(events))]])
+        marks["events"] = len(events)
+        marks["event_log"] = event_log
+
+        summaries_mark = (self.summaries.generation, self.summaries.version)
+        if summaries_mark != marks["summaries"]:
+            ops.append(["set", ["summaries"], self.summaries.to_dict()])
+            marks["summaries"] = summaries_mark
+
+        # NPCs: only the ones changed since the last save
+        handed_out = None
+        if marks["npc_version"] is None and isinstance(self.npc_memory, LazyNPCMemory):
+            handed_out = self.npc_memory.handed_out()
+        if handed_out is not None:
+            # Still loading from the save: only NPCs handed out so far can differ from it
+            handed_out_marks = marks.setdefault("handed_out", {})
+            for npc in handed_out:
+                set_if_changed(["npc_memory", "npcs", npc.name.lower()], npc.to_dict(), npc.name.lower(), handed_out_marks)
+        else:
+            if self.npc_memory.generation != marks["npc_memory"]:
+                ops.append(["set", ["npc_memory", "npcs"], self.npc_memory.to_dict()["npcs"]])
+                marks["npc_memory"] = self.npc_memory.generation
+            else:
+                since = marks["npc_version"]
+                if since is None:
+                    since = self.npc_memory.loaded_version
+                for name in self.npc_memory.changed_since(since):
+                    npc = self.npc_memory.npcs.get(name)
+                    if npc is None:
+                        ops.append(["del", ["npc_memory", "npcs", name]])
+                    else:
+                        ops.append(["set", ["npc_memory", "npcs", name], npc.to_dict()])
+            marks["npc_version"] = self.npc_memory.version
+            set_if_changed(["npc_memory", "factions"], self.npc_memory.factions, "factions", marks)
+
+        if ops:
+            ops.append(["set", ["timestamp"], datetime.now().isoformat()])
+        return ops
+
+    def list_saves(self, character: Optional[str] = None) -> List[str]:
+        """
+        List available saves, newest first: save store sessions (if there is
+        a store), then save files from the save manifest.
+        
+        Args:
+            character: Only saves of this character
+        """
+        stored = [session['name'] for session in self.store.list_sessions(character)] if self.store is not None else []
+        return stored + [save['filename'] for save in save_system.list_saves(self.save_dir, character=character)]
         
     # ===== Memory Management Methods =====
     
@@ -3687,7 +4717,8 @@ Attributes: {json.dumps(item.stats, indent=2)}
         if self.combat_mode:
             summary_parts.append("\nCurrently in combat!")
             if self.current_enemy:
-                summary_parts.append(f"Fighting: {self.current_enemy.get('name', 'an enemy')}")
+                enemy_name = self.current_enemy.get('name', 'an enemy') if isinstance(self.current_enemy, dict) else getattr(self.current_enemy, 'name', 'an enemy')
+                summary_parts.append(f"Fighting: {enemy_name}")
         
         return "\n".join(summary_parts)
     
@@ -3723,31 +4754,102 @@ Attributes: {json.dumps(item.stats, indent=2)}
             location: Where the event occurred (defaults to current location)
             importance: Importance level (1-10)
         """
-        if 'important_events' not in self.session_memory:
-            self.session_memory['important_events'] = []
-            
-        event = {
-            'type': event_type,
-            'description': description,
-            'timestamp': datetime.now().isoformat(),
-            'location': location or (self.current_player.current_location if self.current_player else 'unknown'),
-            'importance': max(1, min(10, importance))  # Clamp between 1-10
-        }
-        
-        self.session_memory['important_events'].append(event)
+        events = self._event_store()
+        location = location or (self.current_player.current_location if self.current_player else 'unknown')
+        event_id = events.add(event_type, description, location, importance, event_store.game_minutes(self.game_time))
+        self.memory_index.add(description, "event", location=location)
         
-        # Also add to location memories if applicable
-        if event['location'] != 'unknown':
+        # Location memories reference the event by id rather than holding a copy
+        if location != 'unknown':
             if 'location_memories' not in self.session_memory:
                 self.session_memory['location_memories'] = {}
-            if event['location'] not in self.session_memory['location_memories']:
-                self.session_memory['location_memories'][event['location']] = {
+            if location not in self.session_memory['location_memories']:
+                self.session_memory['location_memories'][location] = {
                     'first_visited': datetime.now().isoformat(),
                     'visit_count': 0,
                     'last_visited': datetime.now().isoformat(),
                     'important_events': []
                 }
-            self.session_memory['location_memories'][event['location']]['important_events'].append(event)
+            self.session_memory['location_memories'][location]['important_events'].append(event_id)
+
+    def _event_store(self) -> event_store.EventStore:
+        """The session's event store, upgrading a plain list from older session data."""
+        events = self.session_memory.get('important_events')
+        if isinstance(events, lazy_load.Lazy):
+            events = events.get()
+            self.session_memory['important_events'] = events
+        elif not isinstance(events, event_store.EventStore):
+            events = event_store.EventStore.from_list(events or [])
+            self.session_memory['important_events'] = events
+        return events
+
+    def get_notable_events(self, location: str = None, k: int = 5, days: float = 3) -> List[Dict[str, Any]]:
+        """
+        The most important recent events, for building prompts.
+        
+        Args:
+            location: Restrict to this location (None for anywhere)
+            k: Maximum number of events
+            days: How many in-game days to look back
+            
+        Returns:
+            list: Event dicts, most important first
+        """
+        return self._event_store().top(k, location=location, days=days, now=event_store.game_minutes(self.game_time))
+
+    def remember_npc_fact(self, npc_name: str, fact: str) -> None:
+        """
+        Record something an NPC now knows about the player, e.g. what was
+        said in a conversation. Only that NPC will recall it.
+        """
+        npc = self.npc_memory.get_npc(npc_name)
+        if npc and self.current_player:
+            player_id = f"player_{self.current_player.name.lower().replace(' ', '_')}"
+            npc.get_relationship(player_id).add_fact(fact)
+        location = self.current_player.current_location if self.current_player else None
+        self.memory_index.add(fact, "npc", npc=npc_name, location=location)
+
+    def recall_memories(self, query: str, npc_name: str = None, k: int = 4) -> List[str]:
+        """
+        Memories most relevant to what the player just said or did.
+        
+        Args:
+            query: The player's input
+            npc_name: NPC being spoken to, so their own memories are included
+            k: Maximum number of memories
+            
+        Returns:
+            list: Memory texts, most relevant first
+        """
+        location = self.current_player.current_location if self.current_player else None
+        return self.memory_index.recall(query, k, npc=npc_name, location=location)
+
+    @staticmethod
+    def _memory_index_from_save(history: List[Dict[str, Any]], events: Optional[List[Dict[str, Any]]],
+                                npc_memory: Optional[Dict[str, Any]]) -> memory_search.MemoryIndex:
+        """Build the memory index from saved data, without touching live game objects (safe on any thread)."""
+        index = memory_search.MemoryIndex()
+        for entry in history:
+            index.add(f"{entry['action']}: {entry['response']}", "history", location=entry['location'])
+        for event in events or []:
+            index.add(event.get('description', ''), "event", location=event.get('location', 'unknown'))
+        for npc in (npc_memory or {}).get("npcs", {}).values():
+            for relationship in npc.get("relationships", {}).values():
+                for fact in relationship.get("known_facts", []):
+                    index.add(fact, "npc", npc=npc["name"])
+        return index
+
+    def _rebuild_memory_index(self) -> None:
+        """Re-index memories after loading a game."""
+        self.memory_index = memory_search.MemoryIndex()
+        for entry in self.session_history:
+            self.memory_index.add(f"{entry['action']}: {entry['response']}", "history", location=entry['location'])
+        for event in self._event_store():
+            self.memory_index.add(event['description'], "event", location=event['location'])
+        for npc in self.npc_memory.npcs.values():
+            for relationship in npc.relationships.values():
+                for fact in relationship.known_facts:
+                    self.memory_index.add(fact, "npc", npc=npc.name)
     
     def get_memory_summary(self) -> Dict[str, Any]:
         """
@@ -3766,7 +4868,8 @@ Attributes: {json.dumps(item.stats, indent=2)}
             'current_location': self.session_memory.get('current_location', {}).get('name', 'Unknown'),
             'locations_visited': len(self.session_memory.get('visited_locations', [])),
             'npcs_met': len(self.session_memory.get('npcs_met', [])),
-            'important_events': self.session_memory.get('important_events', []),
+            'important_events': self._event_store().top(10),
+            'event_count': len(self._event_store()),
             'session_duration': self._calculate_session_duration()
         }
         
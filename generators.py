@@ -0,0 +1,260 @@
+import re
+import random
+import logging
+from collections.abc import Mapping
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_DICE_RE = re.compile(r"^(\d*)d(\d+)$", re.IGNORECASE)
+_RANGE_RE = re.compile(r"^(\d+)\s*[-–]\s*(\d+)$")
+
+
+def dice_outcomes(die: str) -> Optional[Dict[int, float]]:
+    """
+    Probability of every outcome of a table die.
+
+    Supports digit dice ("d66", "d666": each d6 read as one digit) and summed
+    dice ("1d6", "2d6", "3d8").
+
+    Returns:
+        Dict mapping roll to probability, or None if the die isn't recognized
+    """
+    die = die.strip().lower()
+    if re.fullmatch(r"d6{2,}", die):
+        outcomes = {0: 1.0}
+        for _ in range(len(die) - 1):
+            outcomes = {roll * 10 + face: p / 6 for roll, p in outcomes.items() for face in range(1, 7)}
+        return outcomes
+    match = _DICE_RE.match(die)
+    if not match:
+        return None
+    count, sides = int(match.group(1) or 1), int(match.group(2))
+    outcomes = {0: 1.0}
+    for _ in range(count):
+        step: Dict[int, float] = {}
+        for total, p in outcomes.items():
+            for face in range(1, sides + 1):
+                step[total + face] = step.get(total + face, 0.0) + p / sides
+        outcomes = step
+    return outcomes
+
+
+def _key_rolls(key: str) -> List[int]:
+    """Rolls covered by a table key: "14", or a range such as "2-4"."""
+    key = str(key).strip()
+    if key.isdigit():
+        return [int(key)]
+    match = _RANGE_RE.match(key)
+    if match:
+        low, high = int(match.group(1)), int(match.group(2))
+        return list(range(low, high + 1))
+    return []
+
+
+class AliasSampler:
+    """
+    Walker/Vose alias table: O(n) to build, O(1) per sample.
+    """
+
+    __slots__ = ("entries", "_prob", "_alias", "_n")
+
+    def __init__(self, entries: Sequence[Any], weights: Sequence[float]):
+        if not entries or len(entries) != len(weights):
+            raise ValueError("Sampler needs one weight per entry")
+        total = float(sum(weights))
+        if total <= 0:
+            raise ValueError("Sampler weights must sum to a positive value")
+        n = len(entries)
+        scaled = [w * n / total for w in weights]
+        prob = [0.0] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in small + large:
+            prob[i] = 1.0
+        self.entries = list(entries)
+        self._prob = prob
+        self._alias = alias
+        self._n = n
+
+    def __len__(self) -> int:
+        return self._n
+
+    def sample_index(self, rng: random.Random) -> int:
+        x = rng.random() * self._n
+        i = int(x)
+        return i if (x - i) < self._prob[i] else self._alias[i]
+
+    def sample(self, rng: random.Random) -> Any:
+        return self.entries[self.sample_index(rng)]
+
+    def sample_many(self, rng: random.Random, count: int) -> List[Any]:
+        entries, prob, alias, n = self.entries, self._prob, self._alias, self._n
+        rand = rng.random
+        out = []
+        append = out.append
+        for _ in range(count):
+            x = rand() * n
+            i = int(x)
+            append(entries[i] if (x - i) < prob[i] else entries[alias[i]])
+        return out
+
+
+def compile_table(table: Any, die: Optional[str] = None) -> Optional[AliasSampler]:
+    """
+    Compile one random table into an alias sampler.
+
+    Args:
+        table: Either a list of entries (uniform) or a dict keyed by roll
+            ("11", "2-4", ...)
+        die: Die notation for dict tables, used to weight the keys by how
+            likely each roll is (e.g. "2d6" makes 7 the most common result)
+
+    Entries that are dicts with a numeric "weight" field have that weight
+    multiplied in.
+    """
+    if isinstance(table, list):
+        entries = list(table)
+        weights = [1.0] * len(entries)
+    elif isinstance(table, Mapping):
+        outcomes = dice_outcomes(die) if die else None
+        entries, weights = [], []
+        for key, entry in table.items():
+            rolls = _key_rolls(key)
+            if not rolls:
+                continue
+            if outcomes is not None:
+                weight = sum(outcomes.get(roll, 0.0) for roll in rolls)
+            else:
+                weight = float(len(rolls))
+            entries.append(entry)
+            weights.append(weight)
+    else:
+        return None
+
+    for i, entry in enumerate(entries):
+        if isinstance(entry, Mapping) and isinstance(entry.get("weight"), (int, float)):
+            weights[i] *= entry["weight"]
+
+    if not entries or sum(weights) <= 0:
+        return None
+    return AliasSampler(entries, weights)
+
+
+def compile_rule_file(data: Any) -> Dict[str, AliasSampler]:
+    """
+    Compile every *_generator table in a rule file.
+
+    Returns:
+        Dict mapping table name to sampler. Tables are named after their
+        generator without the suffix ("feature"); sub-tables of a generator
+        holding several tables are named "mission.dossier".
+    """
+    samplers: Dict[str, AliasSampler] = {}
+    if not isinstance(data, Mapping):
+        return samplers
+    for key, generator in data.items():
+        if not str(key).endswith('_generator') or not isinstance(generator, Mapping):
+            continue
+        name = key[:-len('_generator')]
+        for die, table in generator.items():
+            if die == "tables" and isinstance(table, Mapping):
+                for sub_name, sub_table in table.items():
+                    sampler = compile_table(sub_table)
+                    if sampler:
+                        samplers[f"{name}.{sub_name}"] = sampler
+                continue
+            sampler = compile_table(table, die)
+            if sampler:
+                samplers[name] = sampler
+            else:
+                logger.warning("Could not compile generator table '%s' (%s).", key, die)
+    return samplers
+
+
+class GeneratorEngine:
+    """
+    Procedural content from the *_generator tables in the rule files.
+
+    Tables are compiled into alias samplers the first time a rule file is
+    used. All sampling goes through a seeded random.Random, so a given seed
+    always reproduces the same batch.
+    """
+
+    def __init__(self, rules: Any):
+        """
+        Args:
+            rules: Rule loader (e.g. LazyRuleLoader) or dict of parsed rule files
+        """
+        self.rules = rules
+        self._compiled: Dict[str, Dict[str, AliasSampler]] = {}
+
+    def samplers(self, rule_filename: str) -> Dict[str, AliasSampler]:
+        """Compiled samplers for a rule file, keyed by table name."""
+        if not rule_filename.endswith('.json'):
+            rule_filename += '.json'
+        if rule_filename not in self._compiled:
+            self._compiled[rule_filename] = compile_rule_file(self.rules.get(rule_filename, {}))
+        return self._compiled[rule_filename]
+
+    def tables(self) -> Dict[str, List[str]]:
+        """Every rule file that has generator tables, with its table names."""
+        result = {}
+        for rule_filename in self.rules.keys():
+            names = list(self.samplers(rule_filename))
+            if names:
+                result[rule_filename] = names
+        return result
+
+    def invalidate(self, rule_filename: Optional[str] = None) -> None:
+        """Drop compiled samplers for one rule file, or for all of them."""
+        if rule_filename is None:
+            self._compiled.clear()
+        else:
+            self._compiled.pop(rule_filename, None)
+
+    def roll(self, rule_filename: str, table: str, count: int = 1, seed: Optional[int] = None) -> List[Any]:
+        """
+        Roll on a single table.
+
+        Args:
+            rule_filename: e.g. "cults.json" (the extension may be omitted)
+            table: Table name, e.g. "feature"
+            count: Number of results
+            seed: Seed for a reproducible batch
+
+        Raises:
+            KeyError: If the table doesn't exist
+        """
+        samplers = self.samplers(rule_filename)
+        if table not in samplers:
+            raise KeyError(f"No generator table '{table}' in {rule_filename}")
+        return samplers[table].sample_many(random.Random(seed), count)
+
+    def generate(self, rule_filename: str, count: int = 1, seed: Optional[int] = None,
+                 tables: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Generate complete entries, one roll on every table of a rule file.
+
+        Example:
+            engine.generate("cults.json", 10000, seed=7) returns 10,000 dicts
+            like {"description": ..., "feature": ..., "prophecy": ...}.
+
+        Args:
+            rule_filename: e.g. "corporations.json" (the extension may be omitted)
+            count: Number of entries
+            seed: Seed for a reproducible batch
+            tables: Optional subset of table names to roll on
+        """
+        samplers = self.samplers(rule_filename)
+        names: Tuple[str, ...] = tuple(tables) if tables else tuple(samplers)
+        rng = random.Random(seed)
+        columns = [samplers[name].sample_many(rng, count) for name in names]
+        return [dict(zip(names, row)) for row in zip(*columns)] if names else [{} for _ in range(count)]
@@ -0,0 +1,137 @@
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Seconds a finished job's result is kept for its client to collect
+JOB_TTL = 10 * 60
+# Jobs waiting or running, in total and per session, before new ones are refused
+MAX_PENDING = 256
+MAX_PENDING_PER_SESSION = 8
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+class Job:
+    """One slow operation handed off by a request, and its outcome once finished."""
+
+    __slots__ = ("id", "session_id", "label", "status", "status_code", "result", "created", "finished")
+
+    def __init__(self, session_id: str, label: str):
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.label = label  # What was asked for, e.g. the request path
+        self.status = PENDING
+        self.status_code: Optional[int] = None  # HTTP status the operation would have answered with
+        self.result: Any = None
+        self.created = time.time()
+        self.finished: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {"job_id": self.id, "label": self.label, "status": self.status, "created": self.created}
+        if self.status != PENDING:
+            data.update(status_code=self.status_code, result=self.result, finished=self.finished)
+        return data
+
+
+class JobQueue:
+    """
+    Tracks operations that run in the background while their request returns
+    at once with a job id.
+
+    submit() starts the work (e.g. on the session's actor, see
+    SessionActors) and records its Future; the client then polls get() or
+    waits on wait() (the SSE channel) for the outcome. Like NarrationQueue,
+    it refuses new jobs rather than queueing without limit once max_pending
+    (or max_per_session for one session) are in progress. Finished jobs are
+    kept for ttl seconds.
+    """
+
+    def __init__(self, max_pending: int = MAX_PENDING, max_per_session: int = MAX_PENDING_PER_SESSION,
+                 ttl: float = JOB_TTL):
+        self.max_pending = max_pending
+        self.max_per_session = max_per_session
+        self.ttl = ttl
+        self._jobs: Dict[str, Job] = {}
+        self._cond = threading.Condition()
+
+    def submit(self, session_id: str, label: str, start: Callable[[], Future],
+               convert: Optional[Callable[[Any], Any]] = None) -> Optional[Job]:
+        """
+        Start a job for a session.
+
+        Args:
+            session_id: Session the job belongs to; only it can look the job up
+            label: What the job does, shown to the client
+            start: Starts the work and returns a Future for its result
+            convert: Turns the result into (status_code, JSON-serializable result)
+
+        Returns:
+            The new job, or None if too many are already in progress
+        """
+        with self._cond:
+            self._prune()
+            pending = [job for job in self._jobs.values() if job.status == PENDING]
+            if (len(pending) >= self.max_pending
+                    or sum(1 for job in pending if job.session_id == session_id) >= self.max_per_session):
+                logger.info(f"Job queue full; refusing {label}.")
+                return None
+            job = Job(session_id, label)
+            self._jobs[job.id] = job
+        try:
+            future = start()
+        except Exception as e:
+            self._finish(job, FAILED, getattr(e, 'code', None) or 500, {"error": str(e)})
+            return job
+        future.add_done_callback(lambda done: self._complete(job, done, convert))
+        return job
+
+    def _complete(self, job: Job, future: Future, convert: Optional[Callable[[Any], Any]]) -> None:
+        try:
+            result = future.result()
+            status_code, result = convert(result) if convert else (200, result)
+        except Exception as e:
+            logger.error(f"Job {job.label} failed: {e}")
+            # HTTP errors (e.g. werkzeug's) carry their status code
+            self._finish(job, FAILED, getattr(e, 'code', None) or 500, {"error": str(e)})
+        else:
+            self._finish(job, DONE if status_code < 400 else FAILED, status_code, result)
+
+    def _finish(self, job: Job, status: str, status_code: int, result: Any) -> None:
+        with self._cond:
+            job.status_code = status_code
+            job.result = result
+            job.finished = time.time()
+            job.status = status
+            self._cond.notify_all()
+
+    def get(self, session_id: str, job_id: str) -> Optional[Job]:
+        """A job of the session (None if unknown, expired or another session's)."""
+        with self._cond:
+            self._prune()
+            job = self._jobs.get(job_id)
+            return job if job is not None and job.session_id == session_id else None
+
+    def wait(self, session_id: str, job_id: str, timeout: Optional[float] = None) -> Optional[Job]:
+        """get() once the job has finished, or still pending after timeout seconds."""
+        job = self.get(session_id, job_id)
+        if job is not None:
+            with self._cond:
+                self._cond.wait_for(lambda: job.status != PENDING, timeout=timeout)
+        return job
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(1 for job in self._jobs.values() if job.status == PENDING)
+
+    def _prune(self) -> None:
+        """Drop finished jobs older than ttl. Call with self._cond held."""
+        cutoff = time.time() - self.ttl
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished and job.finished < cutoff]:
+            del self._jobs[job_id]
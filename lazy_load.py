@@ -0,0 +1,60 @@
+import logging
+import threading
+from typing import Any, Callable, Generic, Iterable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Lazy(Generic[T]):
+    """
+    A value built on first use, at most once.
+
+    get() builds it (or waits for a build already running on another thread)
+    and returns the same object from then on. The build callable is dropped
+    once it has run, releasing whatever raw data it held on to. If it raises,
+    nothing is stored and the next get() tries again.
+    """
+
+    def __init__(self, build: Callable[[], T], name: str = ""):
+        self.name = name
+        self._build: Optional[Callable[[], T]] = build
+        self._value: Optional[T] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._build is None
+
+    def get(self) -> T:
+        if self._build is None:
+            return self._value
+        with self._lock:
+            if self._build is not None:
+                self._value = self._build()
+                self._build = None
+        return self._value
+
+    def __repr__(self) -> str:
+        return f"<Lazy {self.name or 'value'} ({'ready' if self.ready else 'not built'})>"
+
+
+def prefetch(loads: Iterable[Callable[[], Any]], name: str = "lazy-prefetch") -> threading.Thread:
+    """
+    Run loads (e.g. Lazy.get) in order on a background thread, so lazy values
+    are usually ready by the time they are first needed. Failures are logged
+    and left for the thread that needs the value to retry.
+    """
+    loads = list(loads)
+
+    def run():
+        for load in loads:
+            try:
+                load()
+            except Exception as e:
+                logger.warning(f"Background load ({getattr(load, '__qualname__', load)}) failed: {e}")
+
+    thread = threading.Thread(target=run, name=name, daemon=True)
+    thread.start()
+    return thread
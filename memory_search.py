@@ -0,0 +1,178 @@
+import math
+import zlib
+import logging
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from rules_search import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Number of hash buckets for terms. Vectors are stored sparsely, so this only
+# sets the size of the query vector and the document-frequency table.
+HASH_DIM = 1 << 16
+
+
+def _bucket(token: str) -> int:
+    return zlib.crc32(token.encode('utf-8')) & (HASH_DIM - 1)
+
+
+class MemoryIndex:
+    """
+    Local TF-IDF retrieval over game memories: history entries, important
+    events and NPC facts.
+
+    Each memory is tokenized once, its terms hashed into HASH_DIM buckets and
+    stored as a sparse vector in flat NumPy arrays. A search builds a dense
+    query vector and scores every memory with one gather and one
+    reduceat, so thousands of turns are ranked in well under a millisecond
+    without any network or GPU.
+    """
+
+    def __init__(self):
+        self._texts: List[str] = []
+        self._meta: List[Dict[str, Any]] = []
+        self._doc_freq = np.zeros(HASH_DIM, dtype=np.int32)
+        # Sparse rows: terms of memory i are _terms[_starts[i]:_starts[i] + _lengths[i]]
+        self._terms = np.zeros(1024, dtype=np.int32)
+        self._weights = np.zeros(1024, dtype=np.float32)
+        self._size = 0
+        self._starts: List[int] = []
+        self._lengths: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._size + extra
+        if needed <= len(self._terms):
+            return
+        capacity = max(needed, len(self._terms) * 2)
+        self._terms = np.resize(self._terms, capacity)
+        self._weights = np.resize(self._weights, capacity)
+
+    def add(self, text: str, kind: str = "history", npc: Optional[str] = None,
+            location: Optional[str] = None) -> int:
+        """
+        Index one memory.
+
+        Args:
+            text: The memory text
+            kind: "history", "event" or "npc"
+            npc: NPC the memory belongs to; only that NPC will recall it
+            location: Where it happened
+
+        Returns:
+            The memory's id
+        """
+        counts: Dict[int, int] = {}
+        for token in tokenize(text):
+            bucket = _bucket(token)
+            counts[bucket] = counts.get(bucket, 0) + 1
+
+        memory_id = len(self._texts)
+        self._texts.append(text)
+        self._meta.append({"kind": kind, "npc": npc.lower() if npc else None, "location": location})
+
+        # Sublinear tf, length-normalized; idf is applied at query time since it keeps changing
+        tf = {bucket: 1.0 + math.log(count) for bucket, count in counts.items()}
+        norm = math.sqrt(sum(w * w for w in tf.values())) or 1.0
+        self._reserve(len(tf))
+        start = self._size
+        if tf:
+            buckets = np.fromiter(tf.keys(), dtype=np.int32, count=len(tf))
+            self._terms[start:start + len(tf)] = buckets
+            self._weights[start:start + len(tf)] = np.fromiter(tf.values(), dtype=np.float32, count=len(tf)) / norm
+            self._doc_freq[buckets] += 1
+        self._size += len(tf)
+        self._starts.append(start)
+        self._lengths.append(len(tf))
+        return memory_id
+
+    def entries(self, start: int = 0) -> List[Tuple[str, str, Optional[str], Optional[str]]]:
+        """(text, kind, npc, location) of the memories from id start on, as add() takes them."""
+        return [(text, meta["kind"], meta["npc"], meta["location"])
+                for text, meta in zip(self._texts[start:], self._meta[start:])]
+
+    def truncate(self, count: int) -> None:
+        """Forget the memories with id >= count, e.g. when the game is rewound."""
+        if count >= len(self._texts):
+            return
+        # Rows are contiguous, so the dropped memories' terms are everything from this row on
+        start = self._starts[count]
+        np.subtract.at(self._doc_freq, self._terms[start:self._size], 1)
+        self._size = start
+        del self._texts[count:], self._meta[count:], self._starts[count:], self._lengths[count:]
+
+    def search(self, query: str, k: int = 5, npc: Optional[str] = None,
+               kinds: Optional[Sequence[str]] = None, location: Optional[str] = None) -> List[Tuple[float, str, Dict[str, Any]]]:
+        """
+        Rank memories against free text.
+
+        Args:
+            query: e.g. the player's input
+            k: Number of memories to return
+            npc: The NPC being spoken to. Memories belonging to other NPCs are
+                excluded and this NPC's own memories get a boost.
+            kinds: Only these kinds of memory
+            location: Memories from this location get a small boost
+
+        Returns:
+            Up to k (score, text, meta) tuples, best first
+        """
+        n_docs = len(self._texts)
+        if not n_docs or self._size == 0:
+            return []
+        buckets = [_bucket(token) for token in tokenize(query)]
+        if not buckets:
+            return []
+
+        idf = np.log1p(n_docs / (1.0 + self._doc_freq[buckets]))
+        query_vec = np.zeros(HASH_DIM, dtype=np.float32)
+        np.add.at(query_vec, buckets, idf)
+
+        # Score every memory: sum of query weight * doc weight over its terms
+        contrib = query_vec[self._terms[:self._size]] * self._weights[:self._size]
+        starts = np.asarray(self._starts, dtype=np.int64)
+        lengths = np.asarray(self._lengths)
+        scores = np.zeros(n_docs, dtype=np.float32)
+        # Rows are contiguous, so summing from each non-empty row's start to
+        # the next one's covers exactly that row's terms
+        nonempty = lengths > 0
+        if nonempty.any():
+            scores[nonempty] = np.add.reduceat(contrib, starts[nonempty])
+
+        npc_key = npc.lower() if npc else None
+        candidates = np.flatnonzero(scores > 0)
+        results = []
+        for i in candidates[np.argsort(-scores[candidates], kind='stable')]:
+            meta = self._meta[i]
+            if kinds and meta["kind"] not in kinds:
+                continue
+            if meta["npc"] and meta["npc"] != npc_key:
+                continue
+            score = float(scores[i])
+            if npc_key and meta["npc"] == npc_key:
+                score *= 1.5
+            if location and meta["location"] == location:
+                score *= 1.2
+            results.append((score, self._texts[i], meta))
+            if len(results) >= k * 3:
+                break
+        results.sort(key=lambda r: r[0], reverse=True)
+        return results[:k]
+
+    def recall(self, query: str, k: int = 5, npc: Optional[str] = None, location: Optional[str] = None,
+               token_budget: int = 200) -> List[str]:
+        """
+        Memory texts for a prompt, best first, within a rough LLM token budget.
+        """
+        selected, used = [], 0
+        for _, text, _ in self.search(query, k, npc=npc, location=location):
+            cost = max(1, len(text) // 4)
+            if used + cost > token_budget:
+                continue
+            selected.append(text)
+            used += cost
+        return selected
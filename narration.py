@@ -0,0 +1,65 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class NarrationQueue:
+    """
+    Runs LLM narration off the request path.
+
+    Game mechanics are resolved and sent to the player first; flavour text
+    is generated here and streamed afterwards if it arrives in time. Requests
+    for the same key share one in-flight call, and when max_pending calls are
+    already queued new requests are dropped rather than queued, so a slow or
+    rate-limited LLM never holds up play.
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 8):
+        """
+        Args:
+            max_workers: Narration calls running at the same time
+            max_pending: Calls running or waiting before new requests are skipped
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="narration")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+
+    def submit(self, key: Hashable, fn: Callable[..., Any], *args: Any) -> Optional[Future]:
+        """
+        Schedule fn(*args) unless the queue is saturated.
+
+        Args:
+            key: Identifies the request; a call already in flight for the same
+                key is reused
+            fn: The narration function, e.g. GroqEngine.generate_combat_description
+
+        Returns:
+            A Future for the narration text, or None if it was skipped
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future
+            if not self._slots.acquire(blocking=False):
+                logger.info("Narration queue saturated; skipping narration.")
+                return None
+            future = self._executor.submit(fn, *args)
+            self._in_flight[key] = future
+        future.add_done_callback(lambda _: self._release(key))
+        return future
+
+    def _release(self, key: Hashable) -> None:
+        with self._lock:
+            self._in_flight.pop(key, None)
+        self._slots.release()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,356 @@
+import os
+import sys
+import json
+import mmap
+import marshal
+import struct
+import logging
+import tempfile
+import threading
+import weakref
+from collections.abc import Mapping
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PACK_FILENAME = ".rules.pack"
+PACK_MAGIC = b"DMRP"
+PACK_VERSION = 1
+
+# Magic, format version, header length
+_PREAMBLE = struct.Struct("<4sHI")
+
+
+def default_pack_path(rules_dir: str) -> str:
+    """Return the default location of the compiled pack for a rules directory."""
+    return os.path.join(rules_dir, PACK_FILENAME)
+
+
+def source_signature(rules_dir: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Fingerprint every rule file in a directory.
+
+    Args:
+        rules_dir: Directory holding the *.json rule files
+
+    Returns:
+        Dict mapping filename to (mtime_ns, size)
+    """
+    signature = {}
+    try:
+        with os.scandir(rules_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('.json') and entry.is_file():
+                    st = entry.stat()
+                    signature[entry.name] = (st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        logger.warning("Rules directory '%s' not found.", rules_dir)
+    return signature
+
+
+def build_pack(rules_dir: str, pack_path: Optional[str] = None) -> str:
+    """
+    Compile all rule files in a directory into a single binary pack.
+
+    The pack starts with a small header (sources signature plus an index of
+    byte ranges) followed by one marshalled blob per top-level section of
+    each rule file, so readers can decode a single section without touching
+    the rest of the pack.
+
+    Args:
+        rules_dir: Directory holding the *.json rule files
+        pack_path: Where to write the pack. Defaults to <rules_dir>/.rules.pack
+
+    Returns:
+        str: The path the pack was written to
+    """
+    pack_path = pack_path or default_pack_path(rules_dir)
+    signature = source_signature(rules_dir)
+
+    body = bytearray()
+    index: Dict[str, Any] = {}
+    for filename in sorted(signature):
+        filepath = os.path.join(rules_dir, filename)
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (IOError, json.JSONDecodeError) as e:
+            logger.warning("Skipping rule file '%s' while building pack: %s", filepath, e)
+            data = {}
+
+        if isinstance(data, dict):
+            sections = {}
+            for key, value in data.items():
+                blob = marshal.dumps(value)
+                sections[key] = (len(body), len(blob))
+                body += blob
+            index[filename] = {"sections": sections}
+        else:
+            # Non-object rule files are stored as a single blob
+            blob = marshal.dumps(data)
+            index[filename] = {"whole": (len(body), len(blob))}
+            body += blob
+
+    header = marshal.dumps({
+        "python": tuple(sys.version_info[:2]),
+        "signature": signature,
+        "index": index,
+    })
+
+    # A temp file of our own, so concurrent builds (several workers, or the
+    # rules watcher) never write into the same file before the rename
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(pack_path)}.", suffix=".tmp",
+                                    dir=os.path.dirname(pack_path) or ".")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_PREAMBLE.pack(PACK_MAGIC, PACK_VERSION, len(header)))
+            f.write(header)
+            f.write(body)
+        os.replace(tmp_path, pack_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    logger.info("Compiled %d rule files into '%s'.", len(index), pack_path)
+    return pack_path
+
+
+def parse_header(buffer) -> Tuple[Dict[str, Any], int]:
+    """
+    Parse the header of a pack held in a bytes-like buffer.
+
+    Returns:
+        Tuple of (header dict, offset where the body starts)
+
+    Raises:
+        ValueError: If the buffer is not a pack this code can read
+    """
+    if len(buffer) < _PREAMBLE.size:
+        raise ValueError("Rules pack is truncated")
+    magic, version, header_len = _PREAMBLE.unpack_from(buffer, 0)
+    if magic != PACK_MAGIC or version != PACK_VERSION:
+        raise ValueError("Unrecognized rules pack format")
+    start = _PREAMBLE.size
+    header = marshal.loads(bytes(buffer[start:start + header_len]))
+    if tuple(header.get("python", ())) != tuple(sys.version_info[:2]):
+        raise ValueError("Rules pack was built by a different Python version")
+    return header, start + header_len
+
+
+class RulesPack:
+    """
+    A compiled rules pack loaded into memory with a single read.
+
+    Rule files are decoded on first access; the file list is held in memory
+    so listing rules never touches the filesystem.
+    """
+
+    def __init__(self, buffer: bytes, header: Dict[str, Any], body_offset: int):
+        self._buffer = buffer
+        self._body_offset = body_offset
+        self.signature: Dict[str, Tuple[int, int]] = header["signature"]
+        self.index: Dict[str, Any] = header["index"]
+
+    @classmethod
+    def open(cls, pack_path: str) -> 'RulesPack':
+        """Read a pack from disk."""
+        with open(pack_path, 'rb') as f:
+            buffer = f.read()
+        header, body_offset = parse_header(buffer)
+        return cls(buffer, header, body_offset)
+
+    def _decode(self, span: Tuple[int, int]) -> Any:
+        offset, length = span
+        start = self._body_offset + offset
+        return marshal.loads(self._buffer[start:start + length])
+
+    def keys(self) -> List[str]:
+        return list(self.index)
+
+    def __contains__(self, rule_filename: str) -> bool:
+        return rule_filename in self.index
+
+    def section(self, rule_filename: str, key: str, default: Any = None) -> Any:
+        """Decode a single top-level section of a rule file."""
+        entry = self.index.get(rule_filename)
+        if not entry or key not in entry.get("sections", {}):
+            return default
+        return self._decode(entry["sections"][key])
+
+    def load(self, rule_filename: str) -> Any:
+        """Decode a whole rule file."""
+        entry = self.index[rule_filename]
+        if "whole" in entry:
+            return self._decode(entry["whole"])
+        return {key: self._decode(span) for key, span in entry["sections"].items()}
+
+    def is_fresh(self, rules_dir: str) -> bool:
+        """Check the pack against the current rule files on disk."""
+        current = source_signature(rules_dir)
+        return {k: tuple(v) for k, v in self.signature.items()} == current
+
+    def acquire(self) -> bool:
+        """Start using the pack; False if it was closed. Pair with release()."""
+        return True
+
+    def release(self) -> None:
+        pass
+
+    def retire(self) -> None:
+        """Give the pack up once nothing uses it any more (e.g. after a reload replaced it)."""
+
+
+class LazyRuleFile(Mapping):
+    """
+    Read-only view of one rule file in a mapped pack.
+
+    Top-level sections are decoded from the shared mapping the first time
+    they are accessed; untouched sections never leave the page cache.
+    """
+
+    def __init__(self, store: 'MappedRulesStore', rule_filename: str, sections: Dict[str, Tuple[int, int]]):
+        self._store = store
+        self._rule_filename = rule_filename
+        self._sections = sections
+        self._decoded: Dict[str, Any] = {}
+        # Keeps the mapping open for as long as this view is alive
+        weakref.finalize(self, store.release)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._decoded:
+            self._decoded[key] = self._store._decode(self._sections[key])
+        return self._decoded[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._sections)
+
+    def __len__(self) -> int:
+        return len(self._sections)
+
+    def __repr__(self) -> str:
+        return f"<LazyRuleFile {self._rule_filename!r} sections={list(self._sections)}>"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Decode every section into a plain dict."""
+        return {key: self[key] for key in self._sections}
+
+
+class MappedRulesStore(RulesPack):
+    """
+    A rules pack backed by a read-only memory map.
+
+    Every worker process that opens the same pack shares one physical copy
+    of the rules through the OS page cache, and a section is only decoded
+    into process memory when it is looked up.
+    """
+
+    def __init__(self, file_obj, mapping: mmap.mmap, header: Dict[str, Any], body_offset: int):
+        super().__init__(mapping, header, body_offset)
+        self._file = file_obj
+        self._lock = threading.Lock()
+        self._users = 0  # Live LazyRuleFile views and callers between acquire() and release()
+        self._retired = False
+        self._closed = False
+
+    @classmethod
+    def open(cls, pack_path: str) -> 'MappedRulesStore':
+        """Map a pack from disk."""
+        f = open(pack_path, 'rb')
+        try:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            f.close()
+            raise
+        try:
+            header, body_offset = parse_header(mapping)
+        except Exception:
+            mapping.close()
+            f.close()
+            raise
+        return cls(f, mapping, header, body_offset)
+
+    def load(self, rule_filename: str) -> Any:
+        """Return a lazily decoded view of a rule file. Call between acquire() and release()."""
+        entry = self.index[rule_filename]
+        if "whole" in entry:
+            return self._decode(entry["whole"])
+        self.acquire()  # Released when the view is garbage collected
+        return LazyRuleFile(self, rule_filename, entry["sections"])
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self._closed:
+                return False
+            self._users += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self._users -= 1
+            if not (self._retired and self._users == 0):
+                return
+        self.close()
+
+    def retire(self) -> None:
+        """Close the mapping as soon as no view or reader uses it any more."""
+        with self._lock:
+            self._retired = True
+            if self._users:
+                return
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._buffer.close()
+        self._file.close()
+
+
+def load_or_build(rules_dir: str, pack_path: Optional[str] = None, mapped: bool = False) -> Optional[RulesPack]:
+    """
+    Open the compiled pack for a rules directory, rebuilding it if any
+    source file was added, removed or modified since it was compiled.
+
+    Args:
+        rules_dir: Directory holding the *.json rule files
+        pack_path: Optional location of the pack file
+        mapped: Open the pack as a shared MappedRulesStore instead of
+            reading it into process memory
+
+    Returns:
+        RulesPack, or None if the pack could neither be read nor built
+    """
+    pack_path = pack_path or default_pack_path(rules_dir)
+    pack_cls = MappedRulesStore if mapped else RulesPack
+    try:
+        pack = pack_cls.open(pack_path)
+        if pack.is_fresh(rules_dir):
+            return pack
+        if mapped:
+            pack.close()
+        logger.info("Rules pack '%s' is stale, rebuilding.", pack_path)
+    except FileNotFoundError:
+        pass
+    except (ValueError, EOFError, TypeError) as e:
+        logger.warning("Could not read rules pack '%s': %s", pack_path, e)
+
+    try:
+        # Readers that still map the old pack keep their inode; on Windows the
+        # replace fails while it is mapped and callers fall back to plain JSON.
+        build_pack(rules_dir, pack_path)
+        return pack_cls.open(pack_path)
+    except (IOError, OSError, ValueError) as e:
+        logger.warning("Could not build rules pack '%s': %s", pack_path, e)
+        return None
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    rules_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "Json Files")
+    build_pack(rules_dir)
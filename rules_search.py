@@ -0,0 +1,305 @@
+import os
+import re
+import sys
+import json
+import math
+import heapq
+import marshal
+import logging
+import tempfile
+import threading
+from collections.abc import Mapping
+from typing import Dict, Any, List, Optional, Tuple
+
+import rules_pack
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = ".rules.index"
+INDEX_VERSION = 1
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Sections are grouped until they reach roughly this many words
+SNIPPET_WORDS = 80
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset("""
+a an and are as at be been but by can do does for from has have he her his how i if in into is it its
+me my no not of on or our she so than that the their them then there these they this to too up us was
+we were what when where which who why will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, split on non-alphanumerics, drop stopwords and fold simple plurals."""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (about four characters per token)."""
+    return max(1, len(text) // 4)
+
+
+def _humanize(key: str) -> str:
+    return str(key).replace('_', ' ')
+
+
+def _scalar_text(value: Any) -> str:
+    if isinstance(value, list):
+        return ", ".join(str(v) for v in value)
+    return str(value)
+
+
+def _is_flat(node: Any) -> bool:
+    """True if a node only holds scalars or lists of scalars."""
+    children = node.values() if isinstance(node, Mapping) else node
+    for child in children:
+        if isinstance(child, Mapping):
+            return False
+        if isinstance(child, list) and any(isinstance(c, (dict, list)) for c in child):
+            return False
+    return True
+
+
+def flatten_rules(rule_filename: str, data: Any) -> List[Tuple[str, str]]:
+    """
+    Split a rule file into (title, text) snippets.
+
+    Small flat objects (e.g. one FAQ entry) become a single snippet; larger
+    structures are walked recursively. Random *_generator tables are skipped
+    since they carry no rules text worth grounding a prompt in.
+
+    Args:
+        rule_filename: Name of the rule file, used for snippet titles
+        data: Parsed rule file
+
+    Returns:
+        List of (title, text) tuples
+    """
+    snippets: List[Tuple[str, str]] = []
+    source = data.get("section", rule_filename[:-5]) if isinstance(data, Mapping) else rule_filename[:-5]
+
+    def walk(node: Any, path: List[str]) -> None:
+        title = " > ".join([source] + path)
+        if isinstance(node, Mapping):
+            items = [(k, v) for k, v in node.items() if not str(k).endswith('_generator') and k != "section"]
+            if items and _is_flat(dict(items)):
+                text = "; ".join(f"{_humanize(k)}: {_scalar_text(v)}" for k, v in items)
+                if len(text.split()) <= SNIPPET_WORDS:
+                    snippets.append((title, text))
+                    return
+            for key, value in items:
+                walk(value, path + [_humanize(key)])
+        elif isinstance(node, list):
+            if node and _is_flat(node):
+                text = "; ".join(_scalar_text(v) for v in node)
+                if len(text.split()) <= SNIPPET_WORDS:
+                    snippets.append((title, text))
+                    return
+            for i, value in enumerate(node):
+                walk(value, path + [str(i + 1)])
+        elif node is not None and str(node).strip():
+            snippets.append((title, str(node)))
+
+    walk(data, [])
+    return snippets
+
+
+class RulesIndex:
+    """
+    BM25 inverted index over flattened rule sections.
+
+    Posting weights are fully precomputed at build time, so a query is just
+    a sum over the postings of its terms.
+    """
+
+    def __init__(self, snippets: List[Tuple[str, str]], postings: Dict[str, List[Tuple[int, float]]],
+                 signature: Optional[Dict[str, Tuple[int, int]]] = None):
+        self.snippets = snippets
+        self.postings = postings
+        self.signature = signature or {}
+
+    @classmethod
+    def build(cls, rules: Dict[str, Any], signature: Optional[Dict[str, Tuple[int, int]]] = None) -> 'RulesIndex':
+        """
+        Build an index from parsed rule files.
+
+        Args:
+            rules: Mapping of rule filename to parsed content
+            signature: Source signature the index was built from
+        """
+        snippets: List[Tuple[str, str]] = []
+        for rule_filename in sorted(rules):
+            snippets.extend(flatten_rules(rule_filename, rules[rule_filename]))
+
+        doc_terms = [tokenize(f"{title} {text}") for title, text in snippets]
+        avgdl = (sum(len(t) for t in doc_terms) / len(doc_terms)) if doc_terms else 1.0
+        n_docs = len(doc_terms)
+
+        term_freqs: Dict[str, Dict[int, int]] = {}
+        for doc_id, terms in enumerate(doc_terms):
+            for term in terms:
+                tf = term_freqs.setdefault(term, {})
+                tf[doc_id] = tf.get(doc_id, 0) + 1
+
+        postings: Dict[str, List[Tuple[int, float]]] = {}
+        for term, tf_by_doc in term_freqs.items():
+            df = len(tf_by_doc)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            entries = []
+            for doc_id, tf in tf_by_doc.items():
+                norm = tf + K1 * (1 - B + B * len(doc_terms[doc_id]) / avgdl)
+                entries.append((doc_id, idf * tf * (K1 + 1) / norm))
+            postings[term] = entries
+
+        return cls(snippets, postings, signature)
+
+    def save(self, index_path: str) -> None:
+        """Persist the index next to the rule files."""
+        payload = marshal.dumps({
+            "version": INDEX_VERSION,
+            "python": tuple(sys.version_info[:2]),
+            "signature": self.signature,
+            "snippets": self.snippets,
+            "postings": self.postings,
+        })
+        # A temp file of our own (as in rules_pack.build_pack), so concurrent
+        # rebuilds never write into the same file before the rename
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(index_path)}.", suffix=".tmp",
+                                        dir=os.path.dirname(index_path) or ".")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, index_path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def open(cls, index_path: str) -> 'RulesIndex':
+        """
+        Read a persisted index.
+
+        Raises:
+            ValueError: If the file was written by an incompatible version
+        """
+        with open(index_path, 'rb') as f:
+            data = marshal.loads(f.read())
+        if data.get("version") != INDEX_VERSION or tuple(data.get("python", ())) != tuple(sys.version_info[:2]):
+            raise ValueError("Incompatible rules index")
+        return cls(data["snippets"], data["postings"], data["signature"])
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[float, str, str]]:
+        """
+        Rank rule snippets against a free-text query.
+
+        Returns:
+            Up to k (score, title, text) tuples, best first
+        """
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            for doc_id, weight in self.postings.get(term, ()):
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight
+        if not scores:
+            return []
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(score, *self.snippets[doc_id]) for doc_id, score in best]
+
+    def retrieve(self, player_input: str, location: str = "", k: int = 3, token_budget: int = 300) -> List[str]:
+        """
+        Pick rule snippets to ground a DM prompt.
+
+        Args:
+            player_input: What the player typed
+            location: Current location name, blended into the query
+            k: Maximum number of snippets
+            token_budget: Approximate LLM token budget for all snippets together
+
+        Returns:
+            List of formatted "title: text" snippets that fit the budget
+        """
+        selected = []
+        used = 0
+        for _, title, text in self.search(f"{player_input} {location}", k):
+            snippet = f"{title}: {text}"
+            cost = estimate_tokens(snippet)
+            if used + cost > token_budget:
+                continue
+            selected.append(snippet)
+            used += cost
+        return selected
+
+
+# Indexes opened by this process, by path. They are read-only, so every game
+# shares one copy for as long as the rule files are unchanged.
+_open_indexes: Dict[str, RulesIndex] = {}
+_open_lock = threading.Lock()
+
+
+def default_index_path(rules_dir: str) -> str:
+    return os.path.join(rules_dir, INDEX_FILENAME)
+
+
+def load_or_build(rules: Any, rules_dir: str, index_path: Optional[str] = None) -> RulesIndex:
+    """
+    Open the persisted index for a rules directory, rebuilding it when the
+    rule files have changed since it was written.
+
+    Args:
+        rules: Rule loader (e.g. LazyRuleLoader) used when a rebuild is needed
+        rules_dir: Directory holding the *.json rule files
+        index_path: Optional location of the index file
+    """
+    index_path = index_path or default_index_path(rules_dir)
+    signature = rules_pack.source_signature(rules_dir)
+    with _open_lock:
+        index = _open_indexes.get(index_path)
+    if index is not None and {k: tuple(v) for k, v in index.signature.items()} == signature:
+        return index
+    try:
+        index = RulesIndex.open(index_path)
+        if {k: tuple(v) for k, v in index.signature.items()} == signature:
+            with _open_lock:
+                _open_indexes[index_path] = index
+            return index
+    except FileNotFoundError:
+        pass
+    except (ValueError, EOFError, TypeError, KeyError) as e:
+        logger.warning("Could not read rules index '%s': %s", index_path, e)
+
+    index = RulesIndex.build({name: rules[name] for name in rules.keys()}, signature)
+    try:
+        index.save(index_path)
+    except OSError as e:
+        logger.warning("Could not persist rules index '%s': %s", index_path, e)
+    logger.info("Indexed %d rule snippets.", len(index.snippets))
+    with _open_lock:
+        _open_indexes[index_path] = index
+    return index
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    rules_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Json Files")
+    rules = {}
+    for name in sorted(os.listdir(rules_dir)):
+        if name.endswith('.json'):
+            with open(os.path.join(rules_dir, name), 'r', encoding='utf-8') as f:
+                rules[name] = json.load(f)
+    index = RulesIndex.build(rules, rules_pack.source_signature(rules_dir))
+    index.save(default_index_path(rules_dir))
+    for snippet in index.retrieve(" ".join(sys.argv[1:]) or "how does armor reduce damage"):
+        print("-", snippet)
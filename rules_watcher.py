@@ -0,0 +1,78 @@
+import threading
+import logging
+from typing import Any, Dict, Optional, Set, Tuple
+
+import rules_pack
+
+logger = logging.getLogger(__name__)
+
+
+def diff_signatures(old: Dict[str, Tuple[int, int]], new: Dict[str, Tuple[int, int]]) -> Set[str]:
+    """Filenames that were added, removed or modified between two signatures."""
+    return {name for name in old.keys() | new.keys() if tuple(old.get(name, ())) != tuple(new.get(name, ()))}
+
+
+class RulesWatcher:
+    """
+    Polls a rules directory for edits and hot-reloads the changed files.
+
+    Polling uses one os.scandir per check. The interval doubles while nothing
+    changes (up to max_interval) and drops back to min_interval after an
+    edit, so an idle server pays almost nothing while a designer iterating on
+    a rule file sees changes within a second or two.
+    """
+
+    def __init__(self, loader: Any, min_interval: float = 1.0, max_interval: float = 30.0):
+        """
+        Args:
+            loader: A LazyRuleLoader (anything with rules_dir_path and reload())
+            min_interval: Seconds between polls right after a change
+            max_interval: Upper bound for the backed-off poll interval
+        """
+        self.loader = loader
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._interval = min_interval
+        self._signature = rules_pack.source_signature(loader.rules_dir_path)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check(self) -> Set[str]:
+        """
+        Poll once and reload any changed rule files.
+
+        Returns:
+            The set of filenames that changed (empty if none)
+        """
+        signature = rules_pack.source_signature(self.loader.rules_dir_path)
+        changed = diff_signatures(self._signature, signature)
+        if changed:
+            self._signature = signature
+            self.loader.reload(changed)
+        return changed
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            try:
+                changed = self.check()
+            except Exception as e:
+                logger.error(f"Error checking rule files for changes: {e}")
+                changed = set()
+            if changed:
+                self._interval = self.min_interval
+            else:
+                self._interval = min(self._interval * 2, self.max_interval)
+
+    def start(self) -> 'RulesWatcher':
+        """Start polling on a daemon thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="rules-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
@@ -0,0 +1,386 @@
+import io
+import json
+import lzma
+import zlib
+import struct
+import logging
+from typing import BinaryIO, Dict, Any, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# File layout (all integers little-endian):
+#   header: MAGIC, format version (H), compression (B)
+#   frames: kind (B), path length (H), payload length (I), path (JSON list of keys), payload
+#   end:    a frame of kind FRAME_END with an empty path and payload
+#   index:  section offset table (JSON), then its offset (Q) and INDEX_MAGIC
+# A frame's payload is compact JSON, compressed on its own, so a reader can
+# stream frames one at a time and skip the ones it does not need. The index
+# maps each section (the first INDEX_DEPTH keys of a frame path) to the byte
+# range of its frames, so one section can be read without scanning the rest.
+# Large dicts in SPLIT_SECTIONS (e.g. the NPCs) are batched by a hash of the
+# key, and the index lists each batch, so one entry can be read on its own.
+# Readers that stop at the end frame never see the index.
+MAGIC = b"RPGSAVE\x00"
+INDEX_MAGIC = b"RPGSIDX\x00"
+FORMAT_VERSION = 1
+BINARY_EXTENSION = ".rpgs"
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_LZMA = 2
+COMPRESSIONS = {"none": COMPRESSION_NONE, "zlib": COMPRESSION_ZLIB, "lzma": COMPRESSION_LZMA}
+
+FRAME_VALUE = 1  # Payload is the whole value at path
+FRAME_ITEMS = 2  # Payload is a dict merged into the dict at path
+FRAME_EXTEND = 3  # Payload is a list appended to the list at path
+FRAME_END = 255
+
+# Containers with more entries than this are written as several frames
+BATCH_SIZE = 1000
+# Section paths in the index are at most this deep
+INDEX_DEPTH = 2
+# Top-level dicts whose entries are written as separate sections, so they can
+# be loaded on their own (e.g. the events in session_memory)
+SPLIT_SECTIONS = ("session_memory", "npc_memory")
+
+_HEADER = struct.Struct("<8sHB")
+_FRAME = struct.Struct("<BHI")
+_TRAILER = struct.Struct("<Q8s")
+
+# A section path, or a bare top-level key
+Section = Union[str, Sequence[str]]
+
+
+def _default(value: Any) -> Any:
+    return sorted(value) if isinstance(value, (set, frozenset)) else str(value)
+
+
+_dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_default).encode
+
+
+def _compress(data: bytes, compression: int) -> bytes:
+    if compression == COMPRESSION_ZLIB:
+        return zlib.compress(data, 6)
+    if compression == COMPRESSION_LZMA:
+        return lzma.compress(data, preset=1)
+    return data
+
+
+def _decompress(data: bytes, compression: int) -> bytes:
+    if compression == COMPRESSION_ZLIB:
+        return zlib.decompress(data)
+    if compression == COMPRESSION_LZMA:
+        return lzma.decompress(data)
+    return data
+
+
+def _prefix(section: Section) -> Tuple[str, ...]:
+    return (section,) if isinstance(section, str) else tuple(section)
+
+
+def _starts_with(path: Sequence[str], prefix: Tuple[str, ...]) -> bool:
+    return tuple(path[:len(prefix)]) == prefix
+
+
+def _wanted(path: Sequence[str], paths: Optional[List[Tuple[str, ...]]], exclude: List[Tuple[str, ...]]) -> bool:
+    """Whether a frame at path belongs to the requested sections."""
+    if any(_starts_with(path, prefix) for prefix in exclude):
+        return False
+    # A frame holding a container above a requested section (e.g. the empty
+    # dict written before its entries) is needed to rebuild it
+    return paths is None or any(_starts_with(path, prefix) or _starts_with(prefix, path) for prefix in paths)
+
+
+def is_binary_save(path: str) -> bool:
+    """True if the file starts with the binary save header."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class SaveWriter:
+    """
+    Streaming writer for binary saves.
+
+    Large dicts and lists (e.g. thousands of NPCs) are split into frames of
+    BATCH_SIZE entries, each encoded and compressed as it is written, so the
+    whole save never exists as one string in memory.
+    """
+
+    def __init__(self, fileobj: BinaryIO, compression: str = "zlib"):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression '{compression}', expected one of {', '.join(COMPRESSIONS)}")
+        self.fileobj = fileobj
+        self.compression = COMPRESSIONS[compression]
+        self.bytes_written = 0
+        # Section path -> [start, end] byte range of its frames
+        self.index: Dict[Tuple[str, ...], List[int]] = {}
+        # Path of a dict batched by key hash -> [start, end] of each batch
+        self.keyed: Dict[Tuple[str, ...], List[List[int]]] = {}
+        self._write(_HEADER.pack(MAGIC, FORMAT_VERSION, self.compression))
+
+    def _write(self, data: bytes) -> None:
+        self.fileobj.write(data)
+        self.bytes_written += len(data)
+
+    def frame(self, kind: int, path: List[str], value: Any) -> None:
+        """Write one frame holding value at path."""
+        encoded_path = _dumps(path).encode('utf-8')
+        payload = _compress(_dumps(value).encode('utf-8'), self.compression) if kind != FRAME_END else b""
+        start = self.bytes_written
+        self._write(_FRAME.pack(kind, len(encoded_path), len(payload)) + encoded_path + payload)
+        if kind != FRAME_END:
+            section = tuple(path[:INDEX_DEPTH])
+            self.index.setdefault(section, [start, 0])[1] = self.bytes_written
+
+    def write(self, path: List[str], value: Any, keyed: bool = False) -> None:
+        """
+        Write value at path, splitting large containers into batches.
+
+        Args:
+            keyed: Batch a large dict by key hash and index the batches, for read_entry()
+        """
+        if isinstance(value, dict):
+            if keyed and len(value) > BATCH_SIZE:
+                self.frame(FRAME_VALUE, path, {})
+                batches: List[Dict[str, Any]] = [{} for _ in range(-(-len(value) // BATCH_SIZE))]
+                for key, item in value.items():
+                    batches[_bucket(str(key), len(batches))][key] = item
+                spans = self.keyed[tuple(path)] = []
+                for batch in batches:
+                    start = self.bytes_written
+                    self.frame(FRAME_ITEMS, path, batch)
+                    spans.append([start, self.bytes_written])
+                return
+            if len(value) > BATCH_SIZE:
+                self.frame(FRAME_VALUE, path, {})
+                batch = {}
+                for key, item in value.items():
+                    batch[key] = item
+                    if len(batch) >= BATCH_SIZE:
+                        self.frame(FRAME_ITEMS, path, batch)
+                        batch = {}
+                if batch:
+                    self.frame(FRAME_ITEMS, path, batch)
+                return
+            large = [key for key, item in value.items() if _is_large(item)]
+            if large:
+                self.frame(FRAME_VALUE, path, {key: item for key, item in value.items() if key not in large})
+                for key in large:
+                    self.write(path + [str(key)], value[key])
+                return
+        elif isinstance(value, (list, tuple, set)) and len(value) > BATCH_SIZE:
+            self.frame(FRAME_VALUE, path, [])
+            items = list(value)
+            for start in range(0, len(items), BATCH_SIZE):
+                self.frame(FRAME_EXTEND, path, items[start:start + BATCH_SIZE])
+            return
+        self.frame(FRAME_VALUE, path, value)
+
+    def close(self) -> None:
+        """Write the end marker and the section index."""
+        self.frame(FRAME_END, [], None)
+        index_offset = self.bytes_written
+        self._write(_dumps({
+            "sections": [[list(section), start, end] for section, (start, end) in self.index.items()],
+            "keyed": [[list(path), spans] for path, spans in self.keyed.items()],
+        }).encode('utf-8'))
+        self._write(_TRAILER.pack(index_offset, INDEX_MAGIC))
+
+
+def _bucket(key: str, buckets: int) -> int:
+    return zlib.crc32(key.encode('utf-8')) % buckets
+
+
+def _is_large(value: Any) -> bool:
+    if isinstance(value, dict):
+        return len(value) > BATCH_SIZE or any(_is_large(item) for item in value.values() if isinstance(item, (dict, list)))
+    return isinstance(value, (list, tuple, set)) and len(value) > BATCH_SIZE
+
+
+class SaveReader:
+    """Streaming reader for binary saves."""
+
+    def __init__(self, fileobj: BinaryIO):
+        self.fileobj = fileobj
+        header = fileobj.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError("Not a binary save: file too short")
+        magic, self.version, self.compression = _HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError("Not a binary save: bad header")
+        if self.version > FORMAT_VERSION:
+            raise ValueError(f"Binary save format {self.version} is newer than supported ({FORMAT_VERSION})")
+        self._start = fileobj.tell()
+        self._index: Optional[Dict[Tuple[str, ...], Tuple[int, int]]] = None
+        self._keyed: Dict[Tuple[str, ...], List[List[int]]] = {}
+
+    def index(self) -> Optional[Dict[Tuple[str, ...], Tuple[int, int]]]:
+        """Section path -> (start, end) byte range, or None for saves written without an index."""
+        if self._index is None:
+            position = self.fileobj.tell()
+            try:
+                self.fileobj.seek(-_TRAILER.size, io.SEEK_END)
+                index_offset, magic = _TRAILER.unpack(self.fileobj.read(_TRAILER.size))
+                if magic != INDEX_MAGIC:
+                    return None
+                end = self.fileobj.seek(0, io.SEEK_END) - _TRAILER.size
+                self.fileobj.seek(index_offset)
+                entries = json.loads(self.fileobj.read(end - index_offset))
+                self._index = {tuple(section): (start, stop) for section, start, stop in entries["sections"]}
+                self._keyed = {tuple(path): spans for path, spans in entries["keyed"]}
+            finally:
+                self.fileobj.seek(position)
+        return self._index
+
+    def sections(self) -> Optional[List[Tuple[str, ...]]]:
+        """The section paths in the index (None without one)."""
+        index = self.index()
+        return list(index) if index is not None else None
+
+    def _ranges(self, paths: Optional[List[Tuple[str, ...]]], exclude: List[Tuple[str, ...]]) -> List[Tuple[int, int]]:
+        """Byte ranges holding the wanted frames: from the index, or the whole file without one."""
+        index = self.index()
+        if index is None or paths is None and not exclude:
+            return [(self._start, -1)]
+        return sorted(span for section, span in index.items() if _wanted(section, paths, exclude))
+
+    def read_entry(self, path: Sequence[str], key: str) -> Any:
+        """
+        One entry of the dict at path, or None. Reads a single batch when the
+        dict was written keyed (see SaveWriter.write), else the whole dict.
+        """
+        self.index()
+        spans = self._keyed.get(tuple(path))
+        if spans is None:
+            value: Any = self.read([path])
+            for part in path:
+                value = value.get(part) if isinstance(value, dict) else None
+            return value.get(key) if isinstance(value, dict) else None
+        start, end = spans[_bucket(key, len(spans))]
+        self.fileobj.seek(start)
+        kind, path_length, payload_length = _FRAME.unpack(self.fileobj.read(_FRAME.size))
+        self.fileobj.seek(path_length, io.SEEK_CUR)
+        batch = json.loads(_decompress(self.fileobj.read(payload_length), self.compression))
+        return batch.get(key)
+
+    def frames(self, paths: Optional[Iterable[Section]] = None,
+               exclude: Iterable[Section] = ()) -> Iterator[Tuple[int, List[str], Any]]:
+        """
+        Yield (kind, path, value) for each frame.
+
+        Args:
+            paths: Only decode frames under these sections (top-level keys or
+                key paths); others are skipped unread
+            exclude: Skip frames under these sections
+        """
+        paths = None if paths is None else [_prefix(section) for section in paths]
+        exclude = [_prefix(section) for section in exclude]
+        for start, end in self._ranges(paths, exclude):
+            self.fileobj.seek(start)
+            while end < 0 or self.fileobj.tell() < end:
+                head = self.fileobj.read(_FRAME.size)
+                if len(head) < _FRAME.size:
+                    raise ValueError("Truncated binary save")
+                kind, path_length, payload_length = _FRAME.unpack(head)
+                if kind == FRAME_END:
+                    break
+                path = json.loads(self.fileobj.read(path_length))
+                if not _wanted(path, paths, exclude):
+                    self.fileobj.seek(payload_length, io.SEEK_CUR)
+                    continue
+                payload = self.fileobj.read(payload_length)
+                yield kind, path, json.loads(_decompress(payload, self.compression))
+
+    def read(self, paths: Optional[Iterable[Section]] = None, exclude: Iterable[Section] = ()) -> Dict[str, Any]:
+        """Reassemble the saved dict (or just the given sections)."""
+        data: Dict[str, Any] = {}
+        for kind, path, value in self.frames(paths, exclude):
+            parent = data
+            for key in path[:-1]:
+                parent = parent.setdefault(key, {})
+            if kind == FRAME_VALUE:
+                parent[path[-1]] = value
+            elif kind == FRAME_ITEMS:
+                parent.setdefault(path[-1], {}).update(value)
+            elif kind == FRAME_EXTEND:
+                parent.setdefault(path[-1], []).extend(value)
+            else:
+                logger.warning(f"Unknown frame kind {kind} in binary save ignored")
+        return data
+
+
+def dump(data: Dict[str, Any], fileobj: BinaryIO, compression: str = "zlib",
+         split: Tuple[str, ...] = SPLIT_SECTIONS) -> int:
+    """
+    Write a save dict in the binary format.
+
+    Args:
+        split: Top-level dicts whose entries are written as sections of their own
+
+    Returns:
+        Bytes written
+    """
+    writer = SaveWriter(fileobj, compression)
+    for key, value in data.items():
+        if key in split and isinstance(value, dict):
+            writer.frame(FRAME_VALUE, [key], {})
+            for child, item in value.items():
+                writer.write([key, str(child)], item, keyed=True)
+        else:
+            writer.write([key], value)
+    writer.close()
+    return writer.bytes_written
+
+
+def load(fileobj: BinaryIO, paths: Optional[Iterable[Section]] = None, exclude: Iterable[Section] = ()) -> Dict[str, Any]:
+    """Read a binary save written by dump()."""
+    return SaveReader(fileobj).read(paths, exclude)
+
+
+def read_save(path: str, paths: Optional[Iterable[Section]] = None, exclude: Iterable[Section] = ()) -> Dict[str, Any]:
+    """
+    Read a save file in either format: binary (detected by its header) or JSON.
+    For JSON, paths and exclude only filter top-level keys.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) == MAGIC:
+            f.seek(0)
+            return load(f, paths, exclude)
+        f.seek(0)
+        data = json.load(f)
+    keys = None if paths is None else {_prefix(section)[0] for section in paths}
+    skip = {_prefix(section)[0] for section in exclude if len(_prefix(section)) == 1}
+    return {key: value for key, value in data.items() if (keys is None or key in keys) and key not in skip}
+
+
+def read_section(path: str, section: Section) -> Any:
+    """The value at one section path of a save file (None if it is not there)."""
+    value: Any = read_save(path, [section])
+    for key in _prefix(section):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def read_entry(path: str, section: Section, key: str) -> Any:
+    """One entry of the dict at a section path of a save file (None if it is not there)."""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) == MAGIC:
+            f.seek(0)
+            return SaveReader(f).read_entry(_prefix(section), key)
+    value = read_section(path, section)
+    return value.get(key) if isinstance(value, dict) else None
+
+
+def save_sections(path: str) -> Optional[List[Tuple[str, ...]]]:
+    """Section paths of a binary save with an offset table; None for JSON or older binary saves."""
+    try:
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            f.seek(0)
+            return SaveReader(f).sections()
+    except OSError:
+        return None
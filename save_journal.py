@@ -0,0 +1,207 @@
+import os
+import json
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+
+import save_system
+
+logger = logging.getLogger(__name__)
+
+# Journal entries appended before the snapshot is compacted in the background
+COMPACT_EVERY = 50
+
+
+def journal_path_for(snapshot_path: str) -> str:
+    """Journal file that goes with a snapshot: saves/Name.json -> saves/Name.journal.jsonl"""
+    return os.path.splitext(snapshot_path)[0] + ".journal.jsonl"
+
+
+def discard_journal(snapshot_path: str) -> None:
+    """Remove the journal of a save, e.g. when it is overwritten by a full save."""
+    try:
+        os.remove(journal_path_for(snapshot_path))
+    except FileNotFoundError:
+        pass
+
+
+def apply_ops(state: Dict[str, Any], ops: List[list]) -> Dict[str, Any]:
+    """
+    Apply journal ops to a save dict, in place.
+
+    Ops are lists of [op, path, ...] where path is a list of keys:
+        ["set", path, value]
+        ["del", path]
+        ["extend", path, values, maxlen]  (maxlen optional; keeps the last maxlen items)
+    """
+    for op in ops:
+        kind, path = op[0], op[1]
+        parent = state
+        for key in path[:-1]:
+            parent = parent.setdefault(key, {})
+        last = path[-1]
+        if kind == "set":
+            parent[last] = op[2]
+        elif kind == "del":
+            parent.pop(last, None)
+        elif kind == "extend":
+            items = parent.setdefault(last, [])
+            items.extend(op[2])
+            if len(op) > 3 and op[3]:
+                del items[:-op[3]]
+        else:
+            logger.warning(f"Unknown journal op '{kind}' ignored")
+    return state
+
+
+def _read_entries(journal_path: str, after_seq: int, end: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Journal entries with seq > after_seq, reading at most end bytes."""
+    entries = []
+    try:
+        with open(journal_path, 'rb') as f:
+            data = f.read() if end is None else f.read(end)
+    except FileNotFoundError:
+        return entries
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            # A torn last line from a crash mid-append; everything before it is intact
+            logger.warning(f"Skipping unreadable journal entry in {journal_path}")
+            continue
+        if entry.get("seq", 0) > after_seq:
+            entries.append(entry)
+    return entries
+
+
+def load_state(snapshot_path: str) -> Dict[str, Any]:
+    """
+    Load a journaled save: the snapshot with every later journal entry replayed.
+    Works for plain saves too (they have no journal).
+    """
+    with open(snapshot_path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    for entry in _read_entries(journal_path_for(snapshot_path), state.get("journal_seq", 0)):
+        apply_ops(state, entry["ops"])
+    return state
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    save_system.write_atomic(path, lambda f: f.write(json.dumps(data, ensure_ascii=False, default=str).encode('utf-8')))
+
+
+def _last_seq(journal_path: str) -> int:
+    """Highest seq in a journal left on disk (0 if there is none)."""
+    return max((entry.get("seq", 0) for entry in _read_entries(journal_path, 0)), default=0)
+
+
+class SaveJournal:
+    """
+    Append-only journal of state deltas for one save file.
+
+    A journaled save is a snapshot (the usual save JSON, tagged with the
+    journal_seq it includes) plus a JSON-lines journal of ops applied after
+    it. Saving appends one line holding only what changed, so its cost
+    follows the size of the changes rather than the world. Every
+    compact_every entries the snapshot is rebuilt in a background thread by
+    replaying the journal onto it, without touching the live game.
+    """
+
+    def __init__(self, snapshot_path: str, compact_every: int = COMPACT_EVERY):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path_for(snapshot_path)
+        self.compact_every = compact_every
+        # Continue after any journal already on disk, so the next snapshot's
+        # journal_seq covers its entries: if a crash leaves them behind after
+        # write_snapshot, load_state skips them instead of replaying them
+        self.seq = _last_seq(self.journal_path)
+        self._entries = 0  # Entries currently in the journal file
+        self._generation = 0  # Bumped by write_snapshot so stale compactions are dropped
+        self._lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+
+    def write_snapshot(self, state: Dict[str, Any]) -> None:
+        """Write a full snapshot and start an empty journal."""
+        with self._lock:
+            self.seq += 1
+            self._generation += 1
+            _write_json(self.snapshot_path, {**state, "journal_seq": self.seq})
+            open(self.journal_path, 'w').close()
+            self._entries = 0
+
+    def append(self, ops: List[list]) -> int:
+        """
+        Append one save's worth of ops.
+
+        Returns:
+            The entry's sequence number (unchanged if there was nothing to write)
+        """
+        if not ops:
+            return self.seq
+        with self._lock:
+            self.seq += 1
+            line = json.dumps({"seq": self.seq, "ops": ops}, ensure_ascii=False, default=str)
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+            self._entries += 1
+            seq = self.seq
+        if self._entries >= self.compact_every:
+            self.compact_in_background()
+        return seq
+
+    def compact_in_background(self) -> Optional[threading.Thread]:
+        """Start a compaction unless one is already running."""
+        if self._compactor and self._compactor.is_alive():
+            return None
+        self._compactor = threading.Thread(target=self.compact, name="save-journal-compactor", daemon=True)
+        self._compactor.start()
+        return self._compactor
+
+    def compact(self) -> None:
+        """Fold the journal into a new snapshot. Saves can keep appending meanwhile."""
+        with self._lock:
+            generation = self._generation
+            try:
+                end = os.path.getsize(self.journal_path)
+            except FileNotFoundError:
+                return
+        try:
+            # Heavy work outside the lock: replay the journal as of `end` onto the snapshot
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            entries = _read_entries(self.journal_path, state.get("journal_seq", 0), end)
+            if not entries:
+                return
+            for entry in entries:
+                apply_ops(state, entry["ops"])
+            state["journal_seq"] = entries[-1]["seq"]
+            tmp_path = f"{self.snapshot_path}.compact"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False, default=str)
+                f.flush()
+                os.fsync(f.fileno())
+
+            with self._lock:
+                if generation != self._generation:
+                    os.remove(tmp_path)
+                    return
+                # Entries already in the new snapshot would be skipped on load
+                # anyway (seq <= journal_seq), so a crash between these two
+                # steps is harmless
+                os.replace(tmp_path, self.snapshot_path)
+                with open(self.journal_path, 'rb') as f:
+                    f.seek(end)
+                    rest = f.read()
+                # Atomically, so a crash keeps either the whole journal or its tail
+                save_system.write_atomic(self.journal_path, lambda f: f.write(rest))
+                self._entries = max(0, self._entries - len(entries))
+            logger.info(f"Compacted {len(entries)} journal entries into {self.snapshot_path}")
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to compact save journal {self.journal_path}: {e}")
+
+    def wait(self) -> None:
+        """Wait for a running compaction to finish."""
+        if self._compactor:
+            self._compactor.join()
@@ -0,0 +1,457 @@
+import os
+import json
+import sqlite3
+import logging
+import threading
+from typing import Callable, Dict, Any, Iterable, List, Optional, Tuple
+
+from save_journal import apply_ops
+
+logger = logging.getLogger(__name__)
+
+# Actions returned by load(); the store itself keeps the whole history
+LOAD_ACTIONS = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    name TEXT PRIMARY KEY,
+    version TEXT,
+    updated_at TEXT,
+    game_time TEXT,
+    memory TEXT,
+    summaries TEXT,
+    factions TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at);
+
+CREATE TABLE IF NOT EXISTS players (
+    session TEXT PRIMARY KEY,
+    name TEXT,
+    character_class TEXT,
+    level INTEGER,
+    location TEXT,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS players_name ON players (name);
+
+CREATE TABLE IF NOT EXISTS npcs (
+    session TEXT,
+    key TEXT,
+    name TEXT,
+    role TEXT,
+    location TEXT,
+    faction TEXT,
+    data TEXT,
+    PRIMARY KEY (session, key)
+);
+CREATE INDEX IF NOT EXISTS npcs_location ON npcs (session, location);
+CREATE INDEX IF NOT EXISTS npcs_faction ON npcs (session, faction);
+
+CREATE TABLE IF NOT EXISTS relationships (
+    session TEXT,
+    npc TEXT,
+    entity TEXT,
+    affinity INTEGER,
+    interaction_count INTEGER,
+    last_interaction TEXT,
+    known_facts TEXT,
+    PRIMARY KEY (session, npc, entity)
+);
+CREATE INDEX IF NOT EXISTS relationships_entity ON relationships (session, entity, affinity);
+
+CREATE TABLE IF NOT EXISTS events (
+    session TEXT,
+    id INTEGER,
+    type TEXT,
+    location TEXT,
+    importance INTEGER,
+    game_time INTEGER,
+    timestamp TEXT,
+    description TEXT,
+    PRIMARY KEY (session, id)
+);
+CREATE INDEX IF NOT EXISTS events_location ON events (session, location, importance);
+CREATE INDEX IF NOT EXISTS events_type ON events (session, type, importance);
+CREATE INDEX IF NOT EXISTS events_time ON events (session, game_time);
+
+CREATE TABLE IF NOT EXISTS actions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session TEXT,
+    timestamp TEXT,
+    location TEXT,
+    action TEXT,
+    response TEXT
+);
+CREATE INDEX IF NOT EXISTS actions_session ON actions (session, id);
+"""
+
+# Top-level save keys kept in their own sessions column
+_SESSION_COLUMNS = {"game_time": "game_time", "summaries": "summaries"}
+_TABLES = ("sessions", "players", "npcs", "relationships", "events", "actions")
+
+_dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str).encode
+
+
+def _loads(text: Optional[str], default: Any = None) -> Any:
+    return json.loads(text) if text else default
+
+
+class SaveStore:
+    """
+    SQLite storage for saved games (stdlib sqlite3, WAL mode).
+
+    Each save is a session, split into indexed tables of players, NPCs,
+    relationships, events and conversation history, so one NPC's history or
+    the top events at a location can be read without loading the rest.
+    apply() takes the same ops as the save journal (see save_journal.py) and
+    only rewrites the rows they touch. Every thread gets its own connection;
+    readers never block the writer, and writes are serialized.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self) -> None:
+        """Close every thread's connection."""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def _transaction(self, body: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run body(conn) in one write transaction."""
+        conn = self._connect()
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = body(conn)
+                conn.execute("COMMIT")
+                return result
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    # ===== Writing =====
+
+    def write_state(self, session: str, state: Dict[str, Any]) -> None:
+        """Replace a session with a whole save dict (as built by RPGGame._build_save_data)."""
+        def body(conn):
+            self._delete_rows(conn, session)
+            conn.execute("INSERT INTO sessions (name) VALUES (?)", (session,))
+            self._apply(conn, session, state_to_ops(state))
+        self._transaction(body)
+
+    def apply(self, session: str, ops: List[list]) -> None:
+        """Apply journal ops to a session, writing only the rows they change."""
+        if not ops:
+            return
+
+        def body(conn):
+            conn.execute("INSERT OR IGNORE INTO sessions (name) VALUES (?)", (session,))
+            self._apply(conn, session, ops)
+        self._transaction(body)
+
+    def delete(self, session: str) -> bool:
+        """Delete a session. Returns whether it existed."""
+        return self._transaction(lambda conn: self._delete_rows(conn, session))
+
+    @staticmethod
+    def _delete_rows(conn: sqlite3.Connection, session: str) -> bool:
+        existed = conn.execute("DELETE FROM sessions WHERE name = ?", (session,)).rowcount > 0
+        for table in _TABLES[1:]:
+            conn.execute(f"DELETE FROM {table} WHERE session = ?", (session,))
+        return existed
+
+    def _apply(self, conn: sqlite3.Connection, session: str, ops: List[list]) -> None:
+        # Small JSON columns of the sessions row, updated together at the end
+        row = conn.execute("SELECT * FROM sessions WHERE name = ?", (session,)).fetchone()
+        columns = {
+            "memory": {"session_memory": _loads(row["memory"], {})},
+            "factions": _loads(row["factions"], {}),
+            "extra": _loads(row["extra"], {}),
+        }
+        changed = {}
+
+        for op in ops:
+            kind, path = op[0], op[1]
+            top = path[0]
+            if top == "player":
+                self._write_player(conn, session, op[2] if kind == "set" else None)
+            elif top == "npc_memory" and len(path) >= 2 and path[1] == "npcs":
+                if len(path) == 2:
+                    conn.execute("DELETE FROM npcs WHERE session = ?", (session,))
+                    conn.execute("DELETE FROM relationships WHERE session = ?", (session,))
+                    for key, npc in (op[2] if kind == "set" else {}).items():
+                        self._write_npc(conn, session, key, npc)
+                else:
+                    conn.execute("DELETE FROM relationships WHERE session = ? AND npc = ?", (session, path[2]))
+                    if kind == "set":
+                        self._write_npc(conn, session, path[2], op[2])
+                    else:
+                        conn.execute("DELETE FROM npcs WHERE session = ? AND key = ?", (session, path[2]))
+            elif top == "npc_memory" and path[1:] == ["factions"]:
+                columns["factions"] = op[2] if kind == "set" else {}
+                changed["factions"] = True
+            elif top == "session_memory" and len(path) >= 2 and path[1] == "actions":
+                if kind != "extend":
+                    conn.execute("DELETE FROM actions WHERE session = ?", (session,))
+                self._write_actions(conn, session, op[2] if kind != "del" else [])
+            elif top == "session_memory" and len(path) >= 2 and path[1] == "important_events":
+                if kind != "extend":
+                    conn.execute("DELETE FROM events WHERE session = ?", (session,))
+                self._write_events(conn, session, op[2] if kind != "del" else [])
+            elif top == "session_memory":
+                if len(path) == 1:
+                    value = op[2] if kind == "set" else {}
+                    # Actions and events have their own tables
+                    apply_ops(columns["memory"], [["set", path, {}]])
+                    apply_ops(columns["memory"], [["set", path + [key], item] for key, item in value.items()
+                                                  if key not in ("actions", "important_events")])
+                    self._write_actions(conn, session, value.get("actions", []), replace=True)
+                    self._write_events(conn, session, value.get("important_events", []), replace=True)
+                else:
+                    apply_ops(columns["memory"], [op])
+                changed["memory"] = True
+            elif top in _SESSION_COLUMNS and len(path) == 1:
+                conn.execute(f"UPDATE sessions SET {_SESSION_COLUMNS[top]} = ? WHERE name = ?",
+                             (_dumps(op[2]) if kind == "set" else None, session))
+            elif top == "timestamp" and len(path) == 1:
+                conn.execute("UPDATE sessions SET updated_at = ? WHERE name = ?", (op[2] if kind == "set" else None, session))
+            elif top == "version" and len(path) == 1:
+                conn.execute("UPDATE sessions SET version = ? WHERE name = ?", (op[2] if kind == "set" else None, session))
+            else:
+                # Anything else (e.g. small keys added by newer versions) is kept as JSON
+                apply_ops(columns["extra"], [op])
+                changed["extra"] = True
+
+        for column in changed:
+            value = columns[column]["session_memory"] if column == "memory" else columns[column]
+            conn.execute(f"UPDATE sessions SET {column} = ? WHERE name = ?", (_dumps(value), session))
+
+    @staticmethod
+    def _write_player(conn: sqlite3.Connection, session: str, player: Optional[Dict[str, Any]]) -> None:
+        if player is None:
+            conn.execute("DELETE FROM players WHERE session = ?", (session,))
+            return
+        conn.execute(
+            "INSERT OR REPLACE INTO players (session, name, character_class, level, location, data) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (session, player.get("name"), player.get("character_class"), player.get("level"),
+             player.get("current_location"), _dumps(player)),
+        )
+
+    @staticmethod
+    def _write_npc(conn: sqlite3.Connection, session: str, key: str, npc: Dict[str, Any]) -> None:
+        data = {field: value for field, value in npc.items() if field != "relationships"}
+        conn.execute(
+            "INSERT OR REPLACE INTO npcs (session, key, name, role, location, faction, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (session, key, npc.get("name"), npc.get("role"), npc.get("location"), npc.get("faction"), _dumps(data)),
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO relationships "
+            "(session, npc, entity, affinity, interaction_count, last_interaction, known_facts) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(session, key, entity, rel.get("affinity", 0), rel.get("interaction_count", 0),
+              rel.get("last_interaction"), _dumps(rel.get("known_facts", [])))
+             for entity, rel in npc.get("relationships", {}).items()],
+        )
+
+    @staticmethod
+    def _write_actions(conn: sqlite3.Connection, session: str, actions: Iterable[Dict[str, Any]],
+                       replace: bool = False) -> None:
+        if replace:
+            conn.execute("DELETE FROM actions WHERE session = ?", (session,))
+        conn.executemany(
+            "INSERT INTO actions (session, timestamp, location, action, response) VALUES (?, ?, ?, ?, ?)",
+            [(session, entry.get("timestamp"), entry.get("location"), entry.get("action"), entry.get("response"))
+             for entry in actions if isinstance(entry, dict)],
+        )
+
+    @staticmethod
+    def _write_events(conn: sqlite3.Connection, session: str, events: Iterable[Dict[str, Any]],
+                      replace: bool = False) -> None:
+        if replace:
+            conn.execute("DELETE FROM events WHERE session = ?", (session,))
+        conn.executemany(
+            "INSERT OR REPLACE INTO events "
+            "(session, id, type, location, importance, game_time, timestamp, description) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(session, event.get("id", index), event.get("type"), event.get("location"), event.get("importance", 5),
+              event.get("game_time", 0), event.get("timestamp"), event.get("description"))
+             for index, event in enumerate(events) if isinstance(event, dict)],
+        )
+
+    # ===== Reading =====
+
+    def _read(self) -> sqlite3.Connection:
+        """Connection with a read transaction open, so multi-query reads see one snapshot."""
+        conn = self._connect()
+        conn.execute("BEGIN")
+        return conn
+
+    def exists(self, session: str) -> bool:
+        row = self._connect().execute("SELECT 1 FROM sessions WHERE name = ?", (session,)).fetchone()
+        return row is not None
+
+    def load(self, session: str, sections: Optional[Tuple[str, ...]] = None,
+             max_actions: int = LOAD_ACTIONS) -> Optional[Dict[str, Any]]:
+        """
+        Rebuild a save dict from the store.
+
+        Args:
+            session: Save name
+            sections: Only these top-level keys (e.g. ("player",)); default all
+            max_actions: Most recent actions included in session_memory
+
+        Returns:
+            The save dict, or None if the session does not exist
+        """
+        conn = self._read()
+        try:
+            row = conn.execute("SELECT * FROM sessions WHERE name = ?", (session,)).fetchone()
+            if row is None:
+                return None
+            wanted = lambda key: sections is None or key in sections
+            data: Dict[str, Any] = dict(_loads(row["extra"], {}))
+            if row["version"] is not None:
+                data["version"] = row["version"]
+            if row["updated_at"] is not None:
+                data["timestamp"] = row["updated_at"]
+            for key, column in _SESSION_COLUMNS.items():
+                if row[column] is not None and wanted(key):
+                    data[key] = _loads(row[column])
+            if wanted("player"):
+                player = conn.execute("SELECT data FROM players WHERE session = ?", (session,)).fetchone()
+                if player is not None:
+                    data["player"] = _loads(player["data"])
+            if wanted("session_memory"):
+                memory = _loads(row["memory"], {})
+                memory["actions"] = self._history(conn, session, max_actions)
+                memory["important_events"] = [
+                    _event_dict(event) for event in
+                    conn.execute("SELECT * FROM events WHERE session = ? ORDER BY id", (session,))
+                ]
+                data["session_memory"] = memory
+            if wanted("npc_memory"):
+                npcs = {npc["key"]: _loads(npc["data"]) for npc in
+                        conn.execute("SELECT key, data FROM npcs WHERE session = ?", (session,))}
+                for npc in npcs.values():
+                    npc["relationships"] = {}
+                for rel in conn.execute("SELECT * FROM relationships WHERE session = ?", (session,)):
+                    if rel["npc"] in npcs:
+                        npcs[rel["npc"]]["relationships"][rel["entity"]] = _relationship_dict(rel)
+                data["npc_memory"] = {"npcs": npcs, "factions": _loads(row["factions"], {})}
+            return {key: value for key, value in data.items() if wanted(key)}
+        finally:
+            conn.execute("COMMIT")
+
+    def list_sessions(self, character: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Sessions (name, character, level, location, updated_at), newest first."""
+        query = ("SELECT s.name, p.name AS character, p.level, p.location, s.updated_at "
+                 "FROM sessions s LEFT JOIN players p ON p.session = s.name")
+        params: Tuple = ()
+        if character is not None:
+            query += " WHERE p.name = ? COLLATE NOCASE"
+            params = (character,)
+        query += " ORDER BY s.updated_at DESC"
+        return [dict(row) for row in self._connect().execute(query, params)]
+
+    def npc(self, session: str, name: str) -> Optional[Dict[str, Any]]:
+        """One NPC (as NPC.to_dict), with its relationships."""
+        conn = self._read()
+        try:
+            row = conn.execute("SELECT data FROM npcs WHERE session = ? AND key = ?", (session, name.lower())).fetchone()
+            if row is None:
+                return None
+            npc = _loads(row["data"])
+            npc["relationships"] = {
+                rel["entity"]: _relationship_dict(rel) for rel in
+                conn.execute("SELECT * FROM relationships WHERE session = ? AND npc = ?", (session, name.lower()))
+            }
+            return npc
+        finally:
+            conn.execute("COMMIT")
+
+    def npcs_at(self, session: str, location: str) -> List[str]:
+        """Names of the NPCs at a location."""
+        return [row["name"] for row in self._connect().execute(
+            "SELECT name FROM npcs WHERE session = ? AND location = ? ORDER BY name", (session, location))]
+
+    def relationships_with(self, session: str, entity: str, min_affinity: int = -100) -> List[Dict[str, Any]]:
+        """NPCs' relationships with an entity (e.g. the player), highest affinity first."""
+        return [{"npc": row["npc"], **_relationship_dict(row)} for row in self._connect().execute(
+            "SELECT * FROM relationships WHERE session = ? AND entity = ? AND affinity >= ? ORDER BY affinity DESC",
+            (session, entity, min_affinity))]
+
+    def events(self, session: str, location: Optional[str] = None, event_type: Optional[str] = None,
+               min_importance: int = 1, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most important events of a session, optionally at one location or of one type."""
+        query = "SELECT * FROM events WHERE session = ? AND importance >= ?"
+        params: List[Any] = [session, min_importance]
+        if location is not None:
+            query += " AND location = ?"
+            params.append(location)
+        if event_type is not None:
+            query += " AND type = ?"
+            params.append(event_type)
+        query += " ORDER BY importance DESC, game_time DESC LIMIT ?"
+        params.append(limit)
+        return [_event_dict(row) for row in self._connect().execute(query, params)]
+
+    def history(self, session: str, limit: int = LOAD_ACTIONS) -> List[Dict[str, Any]]:
+        """The most recent actions of a session, oldest first."""
+        return self._history(self._connect(), session, limit)
+
+    @staticmethod
+    def _history(conn: sqlite3.Connection, session: str, limit: int) -> List[Dict[str, Any]]:
+        rows = conn.execute(
+            "SELECT timestamp, action, response, location FROM actions WHERE session = ? ORDER BY id DESC LIMIT ?",
+            (session, limit)).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+
+def _event_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    return {key: row[key] for key in ("id", "type", "description", "timestamp", "location", "importance", "game_time")}
+
+
+def _relationship_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "affinity": row["affinity"],
+        "last_interaction": row["last_interaction"],
+        "interaction_count": row["interaction_count"],
+        "known_facts": _loads(row["known_facts"], []),
+    }
+
+
+def state_to_ops(state: Dict[str, Any]) -> List[list]:
+    """Ops that write a whole save dict, split the way the store keeps it."""
+    ops = []
+    for key, value in state.items():
+        if key == "npc_memory" and isinstance(value, dict):
+            ops.append(["set", ["npc_memory", "npcs"], value.get("npcs", {})])
+            ops.append(["set", ["npc_memory", "factions"], value.get("factions", {})])
+        else:
+            ops.append(["set", [key], value])
+    return ops
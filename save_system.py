@@ -1,55 +1,202 @@
 import os
 import json
 import time
-from typing import Dict, Any, Optional
+import tempfile
+import threading
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, Any, List, Optional, Union
 from pathlib import Path
 
+import save_format
+import save_journal
+import chunk_store
+
 SAVE_DIR = "saves"
+SAVE_EXTENSIONS = ('.json', save_format.BINARY_EXTENSION)
+# Index of the saves in a save directory, so listing never opens save bodies
+MANIFEST_FILE = "saves.index"
+
+_manifest_lock = threading.Lock()
+
+
+def _save_path(filename: str, save_dir: Optional[str] = None) -> str:
+    """Path of a save file; without an extension, the JSON or else the binary save."""
+    filepath = os.path.join(save_dir or SAVE_DIR, filename)
+    if filepath.endswith(SAVE_EXTENSIONS):
+        return filepath
+    binary_path = filepath + save_format.BINARY_EXTENSION
+    if not os.path.exists(filepath + '.json') and os.path.exists(binary_path):
+        return binary_path
+    return filepath + '.json'
 
 def ensure_save_dir() -> None:
     """Ensure the save directory exists."""
     os.makedirs(SAVE_DIR, exist_ok=True)
 
-def list_saves() -> list:
-    """List all available save files."""
-    ensure_save_dir()
-    saves = []
-    for file in os.listdir(SAVE_DIR):
-        if file.endswith('.json'):
-            filepath = os.path.join(SAVE_DIR, file)
+def write_atomic(path: str, write: Callable[[BinaryIO], Any]) -> None:
+    """
+    Write a file so that a crash never leaves it half-written: write to a temp
+    file in the same directory, fsync it, rename it over path, then fsync the
+    directory so the rename itself is durable.
+    
+    Args:
+        path: Final file path
+        write: Called with the temp file (opened 'wb') to write the contents
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+def write_json_atomic(path: str, data: Any, indent: Optional[int] = None) -> None:
+    """write_atomic for a JSON document."""
+    encoded = json.dumps(data, indent=indent, ensure_ascii=False, default=str).encode('utf-8')
+    write_atomic(path, lambda f: f.write(encoded))
+
+def _timestamp_of(data: Dict[str, Any]) -> float:
+    """Epoch seconds a save was made, from save_system metadata or an RPGGame ISO timestamp."""
+    timestamp = data.get('save_metadata', {}).get('timestamp', data.get('timestamp', 0))
+    if isinstance(timestamp, str):
+        try:
+            return datetime.fromisoformat(timestamp).timestamp()
+        except ValueError:
+            return 0.0
+    return float(timestamp or 0)
+
+def manifest_entry(filename: str, data: Dict[str, Any], size: int = 0) -> Dict[str, Any]:
+    """The manifest record for a save, from its data (only metadata, timestamp and player are read)."""
+    timestamp = _timestamp_of(data)
+    return {
+        'filename': filename,
+        'name': data.get('save_metadata', {}).get('save_name', os.path.splitext(filename)[0]),
+        'timestamp': timestamp,
+        'date': time.ctime(timestamp),
+        'character': (data.get('player') or {}).get('name', 'Unknown'),
+        'level': (data.get('player') or {}).get('level'),
+        'format': 'binary' if filename.endswith(save_format.BINARY_EXTENSION) else 'json',
+        'size': size,
+    }
+
+def _read_manifest(save_dir: str) -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(os.path.join(save_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f).get('saves', {})
+    except (IOError, ValueError):
+        return {}
+
+def _write_manifest(save_dir: str, entries: Dict[str, Dict[str, Any]]) -> None:
+    """Replace the manifest atomically: write a temp file, then rename it over the old one."""
+    write_json_atomic(os.path.join(save_dir, MANIFEST_FILE), {'version': 1, 'saves': entries})
+
+def record_save(filename: str, data: Dict[str, Any], save_dir: Optional[str] = None) -> None:
+    """Add or update a save in the manifest. Call after the save file is written."""
+    save_dir = save_dir or SAVE_DIR
+    try:
+        size = os.path.getsize(os.path.join(save_dir, filename))
+    except OSError:
+        size = 0
+    with _manifest_lock:
+        entries = _read_manifest(save_dir)
+        entries[filename] = manifest_entry(filename, data, size)
+        _write_manifest(save_dir, entries)
+
+def forget_save(filename: str, save_dir: Optional[str] = None) -> None:
+    """Remove a save from the manifest."""
+    save_dir = save_dir or SAVE_DIR
+    with _manifest_lock:
+        entries = _read_manifest(save_dir)
+        if entries.pop(filename, None) is not None:
+            _write_manifest(save_dir, entries)
+
+def list_saves(save_dir: Optional[str] = None, character: Optional[str] = None,
+               since: Optional[Union[float, datetime]] = None, until: Optional[Union[float, datetime]] = None,
+               sort_by: str = 'timestamp', reverse: bool = True) -> List[Dict[str, Any]]:
+    """
+    List available save files from the manifest.
+    
+    Only the manifest is read. Save files the manifest does not know yet
+    (e.g. from before it existed) are indexed once; entries whose file is
+    gone are dropped.
+    
+    Args:
+        save_dir: Directory to list (defaults to SAVE_DIR)
+        character: Only saves of this character (case-insensitive)
+        since: Only saves made at or after this time (epoch seconds or datetime)
+        until: Only saves made at or before this time
+        sort_by: Manifest field to sort by ('timestamp', 'name', 'character', 'size')
+        reverse: Sort descending (newest first for timestamps)
+    
+    Returns:
+        list: Manifest entries with filename, name, timestamp, date, character, level, format and size
+    """
+    save_dir = save_dir or SAVE_DIR
+    os.makedirs(save_dir, exist_ok=True)
+    with _manifest_lock:
+        entries = _read_manifest(save_dir)
+        on_disk = {file for file in os.listdir(save_dir) if file.endswith(SAVE_EXTENSIONS)}
+        changed = False
+        for file in on_disk - entries.keys():
+            filepath = os.path.join(save_dir, file)
             try:
-                with open(filepath, 'r') as f:
-                    data = json.load(f)
-                    timestamp = data.get('timestamp', 0)
-                    saves.append({
-                        'filename': file,
-                        'name': data.get('save_name', file[:-5]),  # Remove .json
-                        'timestamp': timestamp,
-                        'date': time.ctime(timestamp),
-                        'character': data.get('player', {}).get('name', 'Unknown')
-                    })
-            except (json.JSONDecodeError, IOError):
+                # Binary saves only decode the sections needed here
+                data = save_format.read_save(filepath, ('save_metadata', 'timestamp', 'player'))
+            except (ValueError, IOError):
                 continue
-    return sorted(saves, key=lambda x: x['timestamp'], reverse=True)
+            entries[file] = manifest_entry(file, data, os.path.getsize(filepath))
+            changed = True
+        for file in entries.keys() - on_disk:
+            del entries[file]
+            changed = True
+        if changed:
+            _write_manifest(save_dir, entries)
+
+    saves = list(entries.values())
+    if character:
+        saves = [save for save in saves if save.get('character', '').lower() == character.lower()]
+    if since is not None:
+        since = since.timestamp() if isinstance(since, datetime) else since
+        saves = [save for save in saves if save['timestamp'] >= since]
+    if until is not None:
+        until = until.timestamp() if isinstance(until, datetime) else until
+        saves = [save for save in saves if save['timestamp'] <= until]
+    return sorted(saves, key=lambda save: (save.get(sort_by) is None, save.get(sort_by) or 0), reverse=reverse)
 
-def save_game(game_data: Dict[str, Any], save_name: Optional[str] = None) -> str:
+def save_game(game_data: Dict[str, Any], save_name: Optional[str] = None, binary: bool = False) -> str:
     """
     Save the game data to a file.
     
     Args:
         game_data: The game data to save
         save_name: Optional custom save name. If None, uses timestamp.
+        binary: Write the compact binary format (see save_format.py) instead of JSON
     
     Returns:
         str: The filename the game was saved to
     """
     ensure_save_dir()
     
+    extension = save_format.BINARY_EXTENSION if binary else '.json'
     if save_name is None:
         timestamp = int(time.time())
-        save_name = f"save_{timestamp}"
-    elif not save_name.endswith('.json'):
-        save_name = f"{save_name}.json"
+        save_name = f"save_{timestamp}{extension}"
+    elif not save_name.endswith(SAVE_EXTENSIONS):
+        save_name = f"{save_name}{extension}"
     
     # Ensure unique filename
     base_name = save_name
@@ -69,8 +216,11 @@ def save_game(game_data: Dict[str, Any], save_name: Optional[str] = None) -> str
     }
     
     try:
-        with open(filepath, 'w') as f:
-            json.dump(game_data, f, indent=2)
+        if save_name.endswith(save_format.BINARY_EXTENSION):
+            write_atomic(filepath, lambda f: save_format.dump(game_data, f))
+        else:
+            write_json_atomic(filepath, game_data, indent=2)
+        record_save(save_name, game_data)
         return f"Game saved successfully as '{save_name}'"
     except IOError as e:
         return f"Error saving game: {str(e)}"
@@ -85,33 +235,35 @@ def load_game(filename: str) -> Dict[str, Any]:
     Returns:
         Dict containing the loaded game data or None if loading failed
     """
-    filepath = os.path.join(SAVE_DIR, filename)
-    if not filepath.endswith('.json'):
-        filepath += '.json'
+    filepath = _save_path(filename)
     
     try:
-        with open(filepath, 'r') as f:
-            return json.load(f)
-    except (IOError, json.JSONDecodeError) as e:
+        data = save_format.read_save(filepath)
+        if chunk_store.is_chunked(data):
+            data = chunk_store.for_dir(os.path.dirname(filepath)).expand(data)
+        return data
+    except (IOError, ValueError) as e:
         raise IOError(f"Failed to load save file: {str(e)}")
 
-def delete_save(filename: str) -> str:
+def delete_save(filename: str, save_dir: Optional[str] = None) -> str:
     """
-    Delete a save file.
+    Delete a save file, its journal and the chunks no other save shares.
     
     Args:
         filename: The name of the save file to delete
+        save_dir: Directory of the save (defaults to SAVE_DIR)
     
     Returns:
         str: Status message
     """
-    filepath = os.path.join(SAVE_DIR, filename)
-    if not filepath.endswith('.json'):
-        filepath += '.json'
+    filepath = _save_path(filename, save_dir)
     
     try:
         if os.path.exists(filepath):
             os.remove(filepath)
+            save_journal.discard_journal(filepath)
+            chunk_store.for_dir(os.path.dirname(filepath)).release(os.path.basename(filepath))
+            forget_save(os.path.basename(filepath), save_dir)
             return f"Deleted save file: {filename}"
         return f"Save file not found: {filename}"
     except IOError as e:
@@ -0,0 +1,225 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, NamedTuple, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Sessions whose work can run at the same time
+DEFAULT_WORKERS = 16
+# Slow tasks (ones that wait on the LLM) running at the same time, on workers of their own
+DEFAULT_SLOW_WORKERS = 16
+
+# The session task running on this thread, for waiting_on_io()
+_local = threading.local()
+
+
+class _Task(NamedTuple):
+    future: Future
+    fn: Callable[..., Any]
+    args: Tuple[Any, ...]
+    slow: bool
+    read_only: bool
+
+
+class _Parked:
+    """A session whose running task waits on I/O: its game, and the reads running on it meanwhile."""
+
+    __slots__ = ("game", "reads", "read_lock")
+
+    def __init__(self, game: Any):
+        self.game = game
+        self.reads = 0
+        self.read_lock = threading.Lock()  # Reads of one session still run one at a time
+
+
+class SessionActors:
+    """
+    Runs each session's work on its own serial queue (one actor per session).
+
+    submit() appends a task to the session's mailbox. A session with work
+    waiting takes one worker from a shared, bounded pool, checks out its game
+    from the SessionRegistry, runs one task and goes to the back of the pool's
+    queue if more are waiting, so a busy session takes turns with the others
+    rather than holding a worker. Tasks of one session therefore run one at a
+    time, in the order they were submitted, and never overlap; tasks of
+    different sessions run in parallel.
+
+    Slow tasks (ones that call the LLM) run on a second pool of their own, so
+    they never hold up other sessions' quick requests. While a task waits on
+    the LLM (see waiting_on_io), its session's read-only tasks run on the game
+    instead of queueing behind it; the task carries on once they are done.
+    The slow task still holds its worker while it waits: max_slow_workers
+    caps how many LLM calls are in flight.
+    """
+
+    def __init__(self, registry: Any, max_workers: int = DEFAULT_WORKERS,
+                 max_slow_workers: int = DEFAULT_SLOW_WORKERS):
+        """
+        Args:
+            registry: SessionRegistry the games are checked out from
+            max_workers: Sessions running a quick task at the same time
+            max_slow_workers: Sessions running a slow task at the same time
+        """
+        self.registry = registry
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="session")
+        self._slow_executor = ThreadPoolExecutor(max_workers=max_slow_workers, thread_name_prefix="session-slow")
+        self._lock = threading.Lock()
+        self._reads_done = threading.Condition(self._lock)
+        # Session -> tasks waiting; a session is in here exactly while a _run is scheduled for it
+        self._mailboxes: Dict[str, Deque[_Task]] = {}
+        # Sessions whose running task is waiting on I/O
+        self._parked: Dict[str, _Parked] = {}
+
+    def submit(self, session_id: str, fn: Callable[..., Any], *args: Any,
+               slow: bool = False, read_only: bool = False) -> Future:
+        """
+        Queue fn(game, *args) to run with the session's game.
+
+        Args:
+            slow: fn waits on the LLM; it runs on the slow workers
+            read_only: fn only reads the game, so it may run while the
+                session's task waits on I/O rather than after it
+
+        Returns:
+            A Future for what fn returns (or raises)
+        """
+        task = _Task(Future(), fn, args, slow, read_only)
+        with self._lock:
+            parked = self._parked.get(session_id) if read_only else None
+            if parked is not None:
+                parked.reads += 1
+            else:
+                mailbox = self._mailboxes.get(session_id)
+                idle = mailbox is None
+                if idle:
+                    mailbox = self._mailboxes[session_id] = deque()
+                mailbox.append(task)
+        if parked is not None:
+            self._start_read(session_id, parked, task)
+        elif idle:
+            self._schedule(session_id)
+        return task.future
+
+    def call(self, session_id: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """submit() and wait for the result."""
+        return self.submit(session_id, fn, *args, **kwargs).result()
+
+    def _run(self, session_id: str) -> None:
+        """Run the oldest task in a session's mailbox, then schedule the next one."""
+        with self._lock:
+            task = self._mailboxes[session_id].popleft()
+        if task.future.set_running_or_notify_cancel():
+            try:
+                game = self.registry.checkout(session_id)
+            except BaseException as e:
+                task.future.set_exception(e)
+            else:
+                _local.current = (self, session_id, game)
+                try:
+                    task.future.set_result(task.fn(game, *task.args))
+                except BaseException as e:
+                    task.future.set_exception(e)
+                finally:
+                    _local.current = None
+                    self.registry.release(session_id)
+        with self._lock:
+            if not self._mailboxes[session_id]:
+                del self._mailboxes[session_id]
+                return
+        self._schedule(session_id)
+
+    def _schedule(self, session_id: str) -> None:
+        """Hand a session with waiting tasks to a pool, or drop its tasks once shutdown() has run."""
+        with self._lock:
+            executor = self._slow_executor if self._mailboxes[session_id][0].slow else self._executor
+        try:
+            executor.submit(self._run, session_id)
+        except RuntimeError:
+            with self._lock:
+                dropped = self._mailboxes.pop(session_id, ())
+            for task in dropped:
+                task.future.cancel()
+            logger.warning(f"Session actors are shut down; dropped {len(dropped)} task(s) of session {session_id[:8]}")
+
+    # ===== Reads while a task waits on I/O =====
+
+    def _park(self, session_id: str, game: Any) -> None:
+        """The session's running task waits on I/O: run its queued reads, and later ones, meanwhile."""
+        with self._lock:
+            parked = self._parked[session_id] = _Parked(game)
+            mailbox = self._mailboxes.get(session_id, ())
+            reads = [task for task in mailbox if task.read_only]
+            for task in reads:
+                mailbox.remove(task)
+            parked.reads = len(reads)
+        for task in reads:
+            self._start_read(session_id, parked, task)
+
+    def _unpark(self, session_id: str) -> None:
+        """The I/O is done: wait for the reads still running before the task goes on."""
+        with self._lock:
+            parked = self._parked.pop(session_id)
+            self._reads_done.wait_for(lambda: parked.reads == 0)
+
+    def _start_read(self, session_id: str, parked: _Parked, task: _Task) -> None:
+        try:
+            self._executor.submit(self._run_read, parked, task)
+        except RuntimeError:
+            task.future.cancel()
+            self._read_finished(parked)
+            logger.warning(f"Session actors are shut down; dropped a read of session {session_id[:8]}")
+
+    def _run_read(self, parked: _Parked, task: _Task) -> None:
+        try:
+            if task.future.set_running_or_notify_cancel():
+                with parked.read_lock:
+                    try:
+                        task.future.set_result(task.fn(parked.game, *task.args))
+                    except BaseException as e:
+                        task.future.set_exception(e)
+        finally:
+            self._read_finished(parked)
+
+    def _read_finished(self, parked: _Parked) -> None:
+        with self._lock:
+            parked.reads -= 1
+            self._reads_done.notify_all()
+
+    def pending(self) -> int:
+        """Tasks submitted and not finished yet, over all sessions."""
+        with self._lock:
+            return (sum(len(mailbox) for mailbox in self._mailboxes.values())
+                    + sum(parked.reads for parked in self._parked.values()))
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop taking work. Tasks a session already has running or scheduled
+        finish (waited for with wait); tasks queued behind them, and any
+        submitted later, are cancelled.
+        """
+        self._slow_executor.shutdown(wait=wait)
+        self._executor.shutdown(wait=wait)
+
+
+@contextmanager
+def waiting_on_io() -> Iterator[None]:
+    """
+    Wrap I/O a session task waits on without touching its game, such as an
+    LLM call: meanwhile the session's read-only tasks run (see SessionActors).
+    Does nothing outside a session task.
+    """
+    current = getattr(_local, "current", None)
+    if current is None:
+        yield
+        return
+    actors, session_id, game = current
+    _local.current = None  # Nested waits are part of this one
+    actors._park(session_id, game)
+    try:
+        yield
+    finally:
+        actors._unpark(session_id)
+        _local.current = current
@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import logging
+import itertools
+from collections import deque
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Unique across every log in the process, unlike id(), which is reused once a log is freed
+_generations = itertools.count(1)
+
+# (epoch seconds, action, response, location)
+Record = Tuple[float, str, str, str]
+
+
+def _to_dict(record: Record) -> Dict[str, str]:
+    created, action, response, location = record
+    return {
+        "timestamp": time.strftime(TIMESTAMP_FORMAT, time.localtime(created)),
+        "action": action,
+        "response": response,
+        "location": location,
+    }
+
+
+def _from_dict(entry: Dict[str, Any]) -> Record:
+    created = entry.get("timestamp")
+    if isinstance(created, str):
+        try:
+            created = time.mktime(time.strptime(created, TIMESTAMP_FORMAT))
+        except ValueError:
+            created = None
+    return (
+        float(created) if isinstance(created, (int, float)) else time.time(),
+        str(entry.get("action", "")),
+        str(entry.get("response", "")),
+        str(entry.get("location", "Unknown")),
+    )
+
+
+class ActionLog:
+    """
+    Bounded log of player actions.
+
+    Entries are stored as plain tuples in a ring buffer, so appending is
+    O(1) and memory stays flat however long the session runs. Reading it
+    (iteration, indexing, slicing) yields the same dicts the old list of
+    actions held: {"timestamp", "action", "response", "location"}.
+
+    When spill_path is set, entries pushed out of the window are appended to
+    that file as JSON lines instead of being dropped; read_all() replays
+    them together with the in-memory window.
+    """
+
+    def __init__(self, maxlen: int = 50, spill_path: Optional[str] = None):
+        """
+        Args:
+            maxlen: Number of most recent entries kept in memory
+            spill_path: Optional JSON-lines file for entries that fall out
+                of the window
+        """
+        self.maxlen = maxlen
+        self.spill_path = spill_path
+        self.total = 0  # Entries ever appended, including spilled ones
+        # New for every log and whenever entries are dropped, so a reader that remembers a count knows to start over
+        self.generation = next(_generations)
+        self._records: deque = deque(maxlen=maxlen)
+        self._spill_file = None
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Dict[str, Any]], maxlen: int = 50,
+                     spill_path: Optional[str] = None) -> 'ActionLog':
+        """Rebuild a log from saved action dicts."""
+        log = cls(maxlen, spill_path)
+        for entry in entries:
+            if isinstance(entry, dict):
+                log._push(_from_dict(entry))
+        return log
+
+    def append(self, action: str, response: str, location: str) -> None:
+        self._push((time.time(), action, response, location))
+
+    def _push(self, record: Record) -> None:
+        if self.spill_path and len(self._records) == self.maxlen:
+            self._spill(self._records[0])
+        self._records.append(record)
+        self.total += 1
+
+    def _spill(self, record: Record) -> None:
+        try:
+            if self._spill_file is None:
+                os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+                self._spill_file = open(self.spill_path, 'a', encoding='utf-8', buffering=1)
+            self._spill_file.write(json.dumps(_to_dict(record), ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not spill session history to {self.spill_path}: {e}")
+            self.spill_path = None
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __bool__(self) -> bool:
+        return bool(self._records)
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        return map(_to_dict, tuple(self._records))
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict[str, str], List[Dict[str, str]]]:
+        if isinstance(index, slice):
+            if index.stop is None and index.step is None and index.start is not None and index.start < 0:
+                return self.recent(-index.start)
+            return [_to_dict(r) for r in list(self._records)[index]]
+        return _to_dict(self._records[index])
+
+    def recent(self, count: int) -> List[Dict[str, str]]:
+        """The last count entries, oldest first."""
+        records = list(itertools.islice(reversed(self._records), count))
+        records.reverse()
+        return [_to_dict(r) for r in records]
+
+    def last(self) -> Optional[Dict[str, str]]:
+        return _to_dict(self._records[-1]) if self._records else None
+
+    def first(self) -> Optional[Dict[str, str]]:
+        return _to_dict(self._records[0]) if self._records else None
+
+    def to_list(self) -> List[Dict[str, str]]:
+        return list(self)
+
+    def read_all(self) -> Iterator[Dict[str, Any]]:
+        """Every entry of the session: spilled ones from disk, then the window."""
+        if self._spill_file is not None:
+            self._spill_file.flush()
+        if self.spill_path and os.path.exists(self.spill_path):
+            with open(self.spill_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        yield from self
+
+    def clear(self) -> None:
+        self._records.clear()
+        self.total = 0
+        self.generation = next(_generations)
+
+    def close(self, spill_window: bool = False) -> None:
+        """
+        Close the spill file.
+
+        Args:
+            spill_window: Spill the in-memory entries as well, so the file
+                holds the whole log for whoever opens it next
+        """
+        if spill_window and self.spill_path:
+            for record in self._records:
+                self._spill(record)
+                if not self.spill_path:
+                    break
+            self._records.clear()
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
@@ -0,0 +1,376 @@
+import os
+import re
+import time
+import shutil
+import logging
+import secrets
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional, Set
+
+import save_format
+import save_system
+from autosave import AUTOSAVE_NAME
+
+logger = logging.getLogger(__name__)
+
+# Where an evicted session's state goes, relative to its game's save_dir.
+# A subdirectory, so it never shows up among the player's own saves.
+EVICTED_SAVE = os.path.join("session", "state" + save_format.BINARY_EXTENSION)
+# Estimated memory of all sessions kept in memory
+DEFAULT_BUDGET = 512 * 1024 * 1024
+# Sessions unused for this long are evicted even when under budget
+DEFAULT_IDLE_SECONDS = 30 * 60
+# Sessions kept on disk (under sessions_dir) before new ones are refused
+DEFAULT_MAX_STORED = 10000
+# Stored sessions unused for this long may be deleted to make room (the session cookie lasts as long)
+DEFAULT_STORED_SECONDS = 30 * 24 * 3600
+# Seconds a count of the stored sessions is reused before sessions_dir is scanned again
+STORED_SCAN_SECONDS = 60.0
+# Rough bytes per game and per thing it holds, for the budget (see RPGGame.footprint)
+GAME_BYTES = 512 * 1024
+FOOTPRINT_BYTES = {"npcs": 4096, "events": 1024, "memories": 512, "snapshots": 4096}
+
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+# Pending rules change meaning "every rule file" (LazyRuleLoader.reload(None))
+_ALL_RULES = object()
+
+
+def new_session_id() -> str:
+    return secrets.token_urlsafe(24)
+
+
+def is_valid_session_id(session_id: Optional[str]) -> bool:
+    """Whether session_id looks like one from new_session_id (it becomes part of a path, so check first)."""
+    return bool(session_id) and bool(_SESSION_ID.match(session_id))
+
+
+def estimate_size(game: Any) -> int:
+    """Rough bytes a game holds in memory."""
+    return GAME_BYTES + sum(FOOTPRINT_BYTES.get(name, 0) * count for name, count in game.footprint().items())
+
+
+class _Session:
+    __slots__ = ("lock", "game", "users", "last_used", "size", "rules_changed")
+
+    def __init__(self):
+        # Held while a request uses the game, or while it is loaded or evicted. A plain
+        # Lock, since a streamed response may hand the game back from another thread.
+        self.lock = threading.Lock()
+        self.game: Optional[Any] = None  # None until loaded, and again once evicted
+        self.users = 0  # Requests holding or waiting for the lock
+        self.last_used = time.monotonic()
+        self.size = 0
+        self.rules_changed: Any = None  # Rule files changed since the game last reloaded them (see reload)
+
+
+class SessionRegistry:
+    """
+    One RPGGame per session, kept in memory while in use.
+
+    checkout() hands out a session's game under that session's lock, so
+    requests for one session run one at a time while different sessions run
+    in parallel. Sessions are kept in least-recently-used order with an
+    estimated size (see estimate_size). When the total goes over
+    budget_bytes, or max_sessions, the least recently used sessions no
+    request is holding are written to disk (EVICTED_SAVE, the compact
+    binary format) and dropped. The same happens to sessions idle for
+    idle_seconds. The next checkout() of an evicted session loads it back,
+    from whichever is newer of that file and its autosave. Sessions are
+    loaded lazily, so this stays fast however big the world is.
+
+    Anyone can make up a session id, so with sessions_dir set, admit()
+    refuses new sessions once max_stored_sessions are kept on disk and none
+    of them has been unused for stored_seconds (those are deleted to make
+    room). Sessions that never saved anything leave nothing on disk.
+
+    Undo history and combat in progress do not survive eviction; they are
+    not part of a save.
+    """
+
+    def __init__(self, factory: Callable[[str], Any], budget_bytes: int = DEFAULT_BUDGET,
+                 max_sessions: Optional[int] = None, idle_seconds: Optional[float] = DEFAULT_IDLE_SECONDS,
+                 on_evict: Optional[Callable[[Any], None]] = None, rules_dir_path: Optional[str] = None,
+                 sessions_dir: Optional[str] = None, max_stored_sessions: Optional[int] = DEFAULT_MAX_STORED,
+                 stored_seconds: Optional[float] = DEFAULT_STORED_SECONDS):
+        """
+        Args:
+            factory: Creates the game of a session id; each session needs its own save_dir
+            budget_bytes: Estimated memory all sessions in memory may use
+            max_sessions: Most sessions kept in memory (no limit by default)
+            idle_seconds: Evict sessions unused for this long (None: only when over budget)
+            on_evict: Called with a game just before it is dropped from memory
+            rules_dir_path: Rules directory, so a RulesWatcher can drive reload()
+            sessions_dir: Directory holding one save_dir per session id, for admit()
+            max_stored_sessions: Most sessions kept in sessions_dir (None: no limit)
+            stored_seconds: Stored sessions unused for this long may be deleted
+                to make room for new ones (None: never)
+        """
+        self.factory = factory
+        self.budget_bytes = budget_bytes
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.on_evict = on_evict
+        self.rules_dir_path = rules_dir_path
+        self._sessions: 'OrderedDict[str, _Session]' = OrderedDict()  # Least recently used first
+        self.sessions_dir = sessions_dir
+        self.max_stored_sessions = max_stored_sessions
+        self.stored_seconds = stored_seconds
+        self._lock = threading.Lock()
+        self._total = 0  # Sum of the sizes of the loaded sessions
+        self._admit_lock = threading.Lock()
+        self._stored: Optional[int] = None  # Sessions in sessions_dir as of _stored_at
+        self._stored_at = 0.0
+
+    def checkout(self, session_id: str) -> Any:
+        """
+        The game of a session, creating or reloading it if needed. Waits while
+        another request uses the session. Every checkout needs a release().
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = _Session()
+            self._sessions.move_to_end(session_id)
+            session.users += 1
+        session.lock.acquire()
+        try:
+            if session.game is None:
+                session.game = self._load(session_id)
+                session.size = estimate_size(session.game)
+                with self._lock:
+                    self._total += session.size
+                    # A game loaded now reads the current rule files anyway
+                    session.rules_changed = None
+            else:
+                self._apply_rules_changes(session)
+            return session.game
+        except BaseException:
+            session.lock.release()
+            self._forget_user(session_id, session)
+            raise
+
+    def release(self, session_id: str) -> None:
+        """Hand back a game from checkout(), then evict sessions if memory is over budget."""
+        with self._lock:
+            session = self._sessions[session_id]
+        if session.game is not None:
+            size = estimate_size(session.game)
+            with self._lock:
+                self._total += size - session.size
+            session.size = size
+        session.last_used = time.monotonic()
+        session.lock.release()
+        self._forget_user(session_id, session)
+        self.evict()
+
+    @contextmanager
+    def session(self, session_id: str) -> Iterator[Any]:
+        """checkout() and release() around a block."""
+        game = self.checkout(session_id)
+        try:
+            yield game
+        finally:
+            self.release(session_id)
+
+    def _forget_user(self, session_id: str, session: _Session) -> None:
+        with self._lock:
+            session.users -= 1
+            # A session without a game (evicted, or its load failed) leaves nothing behind
+            if session.users == 0 and session.game is None and self._sessions.get(session_id) is session:
+                del self._sessions[session_id]
+
+    def admit(self, session_id: str) -> bool:
+        """
+        Whether a session may be used: always for one in memory or on disk, and
+        for a new one while fewer than max_stored_sessions are stored (deleting
+        stored sessions unused for stored_seconds if that makes room).
+        """
+        if self.sessions_dir is None or self.max_stored_sessions is None:
+            return True
+        with self._lock:
+            if session_id in self._sessions:
+                return True
+        if os.path.isdir(os.path.join(self.sessions_dir, session_id)):
+            return True
+        with self._admit_lock:
+            if time.monotonic() - self._stored_at >= STORED_SCAN_SECONDS or self._stored is None:
+                self._stored = self._count_stored()
+                self._stored_at = time.monotonic()
+            if self._stored >= self.max_stored_sessions:
+                self._stored -= self.prune_stored()
+            if self._stored >= self.max_stored_sessions:
+                logger.warning(f"{self._stored} sessions stored; refusing new session {session_id[:8]}")
+                return False
+            return True
+
+    def _count_stored(self) -> int:
+        try:
+            with os.scandir(self.sessions_dir) as entries:
+                return sum(1 for entry in entries if entry.is_dir())
+        except FileNotFoundError:
+            return 0
+
+    def prune_stored(self) -> int:
+        """
+        Delete stored sessions (not in memory) unused for stored_seconds.
+
+        Returns:
+            Number of sessions deleted
+        """
+        if self.sessions_dir is None or self.stored_seconds is None:
+            return 0
+        cutoff = time.time() - self.stored_seconds
+        deleted = 0
+        try:
+            with os.scandir(self.sessions_dir) as entries:
+                expired = [entry.name for entry in entries if entry.is_dir() and entry.stat().st_mtime < cutoff]
+        except FileNotFoundError:
+            return 0
+        for session_id in expired:
+            with self._lock:
+                if session_id in self._sessions:
+                    continue
+            shutil.rmtree(os.path.join(self.sessions_dir, session_id), ignore_errors=True)
+            deleted += 1
+        if deleted:
+            logger.info(f"Deleted {deleted} stored sessions unused for {self.stored_seconds / 86400:.0f} days")
+        return deleted
+
+    def _load(self, session_id: str) -> Any:
+        """A new game for the session, restored from its newest save on disk if it has one."""
+        game = self.factory(session_id)
+        saved = [name for name in (EVICTED_SAVE, AUTOSAVE_NAME) if os.path.exists(os.path.join(game.save_dir, name))]
+        if saved:
+            newest = max(saved, key=lambda name: os.path.getmtime(os.path.join(game.save_dir, name)))
+            result = game.load_game(newest)
+            logger.info(f"Session {session_id[:8]} restored from {newest}: {result}")
+        return game
+
+    # ===== Eviction =====
+
+    def evict(self, force: bool = False) -> int:
+        """
+        Write sessions no request is using to disk and drop them from memory:
+        least recently used first while over budget, and any idle too long.
+
+        Args:
+            force: Evict every session not in use
+
+        Returns:
+            Number of sessions evicted
+        """
+        evicted = 0
+        tried: Set[str] = set()
+        while True:
+            with self._lock:
+                victim = self._pick_victim(force, tried)
+                if victim is None:
+                    return evicted
+                session_id, session = victim
+                tried.add(session_id)
+                # Taken without waiting: nobody holds it, and new users wait for the write
+                session.lock.acquire()
+                session.users += 1
+            try:
+                evicted += self._evict(session_id, session)
+            finally:
+                session.lock.release()
+                self._forget_user(session_id, session)
+
+    def _pick_victim(self, force: bool, tried: Set[str]):
+        """The next session to evict, if any. Call with self._lock held."""
+        loaded = [(session_id, session) for session_id, session in self._sessions.items()
+                  if session.game is not None]
+        over = self._total > self.budget_bytes or (self.max_sessions is not None and len(loaded) > self.max_sessions)
+        now = time.monotonic()
+        for session_id, session in loaded:
+            if session.users or session_id in tried:
+                continue
+            idle = self.idle_seconds is not None and now - session.last_used >= self.idle_seconds
+            if force or over or idle:
+                return session_id, session
+        return None
+
+    def _evict(self, session_id: str, session: _Session) -> bool:
+        game = session.game
+        try:
+            if game.current_player:
+                path = os.path.join(game.save_dir, EVICTED_SAVE)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                save_data = game._build_save_data()
+                save_system.write_atomic(path, lambda f: save_format.dump(save_data, f))
+                # The session directory's mtime is its last use, for prune_stored()
+                os.utime(game.save_dir)
+        except Exception as e:
+            # Keep it in memory rather than lose it; it is tried again on the next eviction
+            logger.error(f"Could not evict session {session_id[:8]}: {e}")
+            session.last_used = time.monotonic()
+            with self._lock:
+                self._sessions.move_to_end(session_id)
+            return False
+        if self.on_evict is not None:
+            self.on_evict(game)
+        if game.current_player:
+            # The whole transcript goes to the history file, which the restored game appends to
+            game.session_history.close(spill_window=True)
+        else:
+            game._discard_history()
+        try:
+            # A game creates its save_dir up front; a session that never saved leaves none behind
+            os.rmdir(game.save_dir)
+        except OSError:
+            pass
+        session.game = None
+        with self._lock:
+            self._total -= session.size
+        session.size = 0
+        logger.info(f"Evicted session {session_id[:8]}")
+        return True
+
+    def close(self) -> None:
+        """Write every session to disk, e.g. when the server stops."""
+        self.evict(force=True)
+
+    # ===== Introspection =====
+
+    def __len__(self) -> int:
+        """Sessions in memory."""
+        with self._lock:
+            return sum(1 for session in self._sessions.values() if session.game is not None)
+
+    @property
+    def total_size(self) -> int:
+        """Estimated bytes of the sessions in memory."""
+        return self._total
+
+    def games(self) -> List[Any]:
+        """Games currently in memory."""
+        with self._lock:
+            return [session.game for session in self._sessions.values() if session.game is not None]
+
+    def reload(self, changed: Optional[Set[str]] = None) -> Set[str]:
+        """
+        Note changed rule files for every game in memory, so one RulesWatcher
+        covers all sessions (games loaded later read the new files anyway).
+
+        Each game reloads them at its session's next checkout(), while its
+        session is held, so a reload never runs in the middle of a request.
+        """
+        with self._lock:
+            for session in self._sessions.values():
+                if session.game is None:
+                    continue
+                if changed is None or session.rules_changed is _ALL_RULES:
+                    session.rules_changed = _ALL_RULES
+                else:
+                    session.rules_changed = (session.rules_changed or set()) | set(changed)
+        return changed or set()
+
+    def _apply_rules_changes(self, session: _Session) -> None:
+        """Reload the rule files changed since the session's game last did. Call with session.lock held."""
+        with self._lock:
+            changed, session.rules_changed = session.rules_changed, None
+        if changed is not None:
+            session.game.rules.reload(None if changed is _ALL_RULES else changed)
@@ -0,0 +1,443 @@
+import copy
+import json
+import time
+import itertools
+import logging
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Turns kept for undo along the current line of play
+MAX_UNDO = 100
+# Items per PersistentLog chunk, and about the number of keys per PersistentMap bucket
+CHUNK_ITEMS = 64
+# Sections of the save data held in persistent containers rather than copied per snapshot
+EVENTS_PATH = ("session_memory", "important_events")
+NPCS_PATH = ("npc_memory", "npcs")
+
+_dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str).encode
+_DELETE = object()
+
+
+class PersistentLog:
+    """
+    Immutable append-only list that shares its items with older versions.
+
+    Items are kept in full chunks of CHUNK_ITEMS (tuples shared by every
+    version that has them) and a short tail, so extend() copies the tail
+    and the list of chunk references, never the items.
+    """
+
+    __slots__ = ("_chunks", "_tail", "_len")
+
+    def __init__(self, items: Iterable[Any] = ()):
+        items = tuple(items)
+        full = len(items) - len(items) % CHUNK_ITEMS
+        self._chunks = tuple(items[start:start + CHUNK_ITEMS] for start in range(0, full, CHUNK_ITEMS))
+        self._tail = items[full:]
+        self._len = len(items)
+
+    def extend(self, items: Iterable[Any]) -> 'PersistentLog':
+        """A new log with items appended; this one is unchanged."""
+        log = PersistentLog(self._tail + tuple(items))
+        log._chunks = self._chunks + log._chunks
+        log._len += len(self._chunks) * CHUNK_ITEMS
+        return log
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[Any]:
+        return self.iter_from(0)
+
+    def iter_from(self, start: int) -> Iterator[Any]:
+        """Items from index start on."""
+        chunked = len(self._chunks) * CHUNK_ITEMS
+        if start < chunked:
+            index, offset = divmod(start, CHUNK_ITEMS)
+            for chunk in self._chunks[index:]:
+                yield from chunk[offset:]
+                offset = 0
+            start = chunked
+        yield from self._tail[start - chunked:]
+
+    def common_prefix(self, other: 'PersistentLog') -> int:
+        """Number of leading items the two logs share (compared by identity, chunk by chunk)."""
+        count = 0
+        for mine, theirs in zip(self._chunks, other._chunks):
+            if mine is not theirs:
+                break
+            count += CHUNK_ITEMS
+        for mine, theirs in zip(self.iter_from(count), other.iter_from(count)):
+            if mine is not theirs:
+                break
+            count += 1
+        return count
+
+
+class PersistentMap:
+    """
+    Immutable dict that shares its entries with older versions.
+
+    Keys are hashed into a power-of-two number of bucket dicts; set() and
+    delete() copy one bucket and the tuple of bucket references, so a change
+    costs O(CHUNK_ITEMS + buckets) however many entries there are.
+    """
+
+    __slots__ = ("_buckets", "_len")
+
+    def __init__(self, items: Optional[Dict[str, Any]] = None):
+        items = items or {}
+        count = 1
+        while count * CHUNK_ITEMS < len(items):
+            count *= 2
+        buckets: List[Dict[str, Any]] = [{} for _ in range(count)]
+        for key, value in items.items():
+            buckets[hash(key) & (count - 1)][key] = value
+        self._buckets = tuple(buckets)
+        self._len = len(items)
+
+    def _with_bucket(self, index: int, bucket: Dict[str, Any], size: int) -> 'PersistentMap':
+        if size > len(self._buckets) * CHUNK_ITEMS * 2:
+            # Grown well past its buckets: rehash into more of them
+            return PersistentMap({**self.to_dict(), **bucket})
+        result = PersistentMap.__new__(PersistentMap)
+        result._buckets = self._buckets[:index] + (bucket,) + self._buckets[index + 1:]
+        result._len = size
+        return result
+
+    def set(self, key: str, value: Any) -> 'PersistentMap':
+        index = hash(key) & (len(self._buckets) - 1)
+        bucket = dict(self._buckets[index])
+        size = self._len + (key not in bucket)
+        bucket[key] = value
+        return self._with_bucket(index, bucket, size)
+
+    def delete(self, key: str) -> 'PersistentMap':
+        index = hash(key) & (len(self._buckets) - 1)
+        if key not in self._buckets[index]:
+            return self
+        bucket = dict(self._buckets[index])
+        del bucket[key]
+        return self._with_bucket(index, bucket, self._len - 1)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._buckets[hash(key) & (len(self._buckets) - 1)].get(key, default)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._buckets[hash(key) & (len(self._buckets) - 1)]
+
+    def __len__(self) -> int:
+        return self._len
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {}
+        for bucket in self._buckets:
+            result.update(bucket)
+        return result
+
+    def changed_keys(self, other: 'PersistentMap') -> List[str]:
+        """Keys whose values differ between the two maps (by identity), skipping shared buckets."""
+        if len(self._buckets) != len(other._buckets):
+            pairs = [(self.to_dict(), other.to_dict())]
+        else:
+            pairs = [(mine, theirs) for mine, theirs in zip(self._buckets, other._buckets) if mine is not theirs]
+        return [key for mine, theirs in pairs for key in mine.keys() | theirs.keys()
+                if mine.get(key, _DELETE) is not theirs.get(key, _DELETE)]
+
+
+def _wrap(path: Tuple[str, ...], value: Any) -> Any:
+    if path == EVENTS_PATH:
+        return PersistentLog(value or [])
+    if path == NPCS_PATH:
+        return PersistentMap(value or {})
+    return value
+
+
+def _assoc(node: Any, path: Tuple[str, ...], update: Callable[[Any], Any]) -> Any:
+    """Copy of node with update applied to the value at path, copying only the containers along it."""
+    if not path:
+        return update(node)
+    key = path[0]
+    if isinstance(node, PersistentMap):
+        value = _assoc(node.get(key), path[1:], update)
+        return node.delete(key) if value is _DELETE else node.set(key, value)
+    node = dict(node) if isinstance(node, dict) else {}
+    value = _assoc(node.get(key), path[1:], update)
+    if value is _DELETE:
+        node.pop(key, None)
+    else:
+        node[key] = value
+    return node
+
+
+def freeze(save_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Snapshot state from save data (see RPGGame._build_save_data): a private copy, with the large sections made persistent."""
+    state = json.loads(_dumps(save_data))
+    for path in (EVENTS_PATH, NPCS_PATH):
+        state = _assoc(state, path, lambda value, path=path: _wrap(path, value))
+    return state
+
+
+def apply_ops(state: Dict[str, Any], ops: List[list]) -> Dict[str, Any]:
+    """
+    New snapshot state with journal ops (see save_journal.apply_ops) applied.
+    state is left as it was; the result shares everything the ops did not touch.
+    """
+    # Private copies of the values, which may still be live game objects' data
+    for op in json.loads(_dumps(ops)):
+        kind, path = op[0], tuple(op[1])
+        if kind == "set":
+            update = lambda old, path=path, value=op[2]: _wrap(path, value)
+        elif kind == "del":
+            update = lambda old: _DELETE
+        elif kind == "extend":
+            def update(old, items=op[2], maxlen=op[3] if len(op) > 3 else None):
+                if isinstance(old, PersistentLog):
+                    return old.extend(items)
+                items = list(old or []) + items
+                return items[-maxlen:] if maxlen else items
+        else:
+            logger.warning(f"Unknown journal op '{kind}' ignored")
+            continue
+        state = _assoc(state, path, update)
+    return state
+
+
+def thaw(value: Any) -> Any:
+    """A private, plain copy of part of a snapshot state, safe to hand to live game objects."""
+    if isinstance(value, PersistentLog):
+        value = list(value)
+    elif isinstance(value, PersistentMap):
+        value = value.to_dict()
+    return copy.deepcopy(value)
+
+
+def branch_key(name: str) -> str:
+    """How a branch name is stored: the console lowercases commands, so names ignore case."""
+    return name.strip().casefold()
+
+
+class Snapshot:
+    """One point of a Timeline. Its state is never modified, so snapshots share it freely."""
+
+    __slots__ = ("id", "parent", "depth", "label", "_state", "extras", "actions_total",
+                 "index_len", "index_added", "created")
+
+    def __init__(self, snapshot_id: int, parent: Optional['Snapshot'], state: Union[Dict[str, Any], Callable[[], Dict[str, Any]]],
+                 extras: Any, actions_total: int, index_len: Optional[int], index_added: Optional[tuple],
+                 label: Optional[str] = None):
+        self.id = snapshot_id
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent else 0
+        self.label = label
+        self._state = state  # Or a function that builds it, called on first use
+        self.extras = extras  # Live state that is not saved (combat), see RPGGame._snapshot_extras
+        self.actions_total = actions_total
+        # Memories indexed so far; None while the index is still waiting to be built from a save
+        self.index_len = index_len
+        # Memories indexed since the parent, as MemoryIndex.entries(); None if they can't be replayed
+        self.index_added = index_added
+        self.created = time.time()
+
+    @property
+    def state(self) -> Dict[str, Any]:
+        if callable(self._state):
+            self._state = self._state()
+        return self._state
+
+    @property
+    def built(self) -> bool:
+        """Whether the state exists yet (see Timeline.reset)."""
+        return not callable(self._state)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary for listings."""
+        player = self.state.get("player", {})
+        return {
+            "id": self.id,
+            "label": self.label,
+            "turn": self.actions_total,
+            "location": player.get("current_location"),
+            "created": self.created,
+        }
+
+    def __repr__(self) -> str:
+        return f"<Snapshot {self.id}{f' {self.label!r}' if self.label else ''} turn {self.actions_total}>"
+
+
+def common_ancestor(first: Snapshot, second: Snapshot) -> Optional[Snapshot]:
+    """The latest snapshot both descend from (None if their history was trimmed apart)."""
+    while first is not None and second is not None and first is not second:
+        if first.depth >= second.depth:
+            first = first.parent
+        else:
+            second = second.parent
+    return first if first is second else None
+
+
+class Timeline:
+    """
+    In-memory snapshots of one RPGGame, for undo and branching.
+
+    checkpoint() records the game's state as a Snapshot. After the first,
+    it only applies the changes since the previous one (RPGGame._journal_ops,
+    the same deltas journaled saves write) to persistent copies of the save
+    data, so each snapshot costs O(changes) and shares everything else with
+    its parent. restore() brings the live game to any snapshot by rebuilding
+    only what differs between that snapshot and the current one, and
+    replaying the memory index from their common ancestor.
+
+    After a load, the first snapshot's state comes from the save itself (see
+    reset) and is only built when some snapshot's state is first needed; the
+    snapshots after it keep their changes until then. Playing on after a
+    load therefore never copies the whole world.
+
+    session_history is left alone: it is the transcript of the session,
+    undone turns included.
+    """
+
+    def __init__(self, game: Any, max_undo: int = MAX_UNDO):
+        self.game = game
+        self.max_undo = max_undo
+        self.head: Optional[Snapshot] = None
+        self.branches: Dict[str, Snapshot] = {}
+        self._marks: Dict[str, Any] = {}
+        self._root: Optional[Callable[[], Dict[str, Any]]] = None
+        self._ids = itertools.count(1)
+
+    def reset(self, root: Optional[Callable[[], Dict[str, Any]]] = None) -> None:
+        """
+        Forget every snapshot, e.g. when another game is loaded.
+
+        Args:
+            root: Builds the state of the game as it is now (e.g. from the
+                save just loaded), for the first checkpoint to use instead of
+                freezing the whole game; it is called when that state is first needed
+        """
+        self.head = None
+        self.branches.clear()
+        self._root = root
+        self._marks = self.game._current_journal_marks() if root is not None else {}
+
+    def checkpoint(self, label: Optional[str] = None) -> Optional[Snapshot]:
+        """
+        Snapshot the game as it is now (or return the latest snapshot if nothing changed).
+
+        Returns:
+            The snapshot, or None if there is no game in progress
+        """
+        game = self.game
+        if not game.current_player:
+            return None
+        extras = game._snapshot_extras()
+        # None while the index is still to be built from a save: nothing was indexed since
+        index = game._memory_index_if_built()
+        index_len = len(index) if index is not None else None
+        parent = self.head
+        if parent is None:
+            if self._root is not None:
+                # Marks were taken by reset()
+                state, self._root = self._root, None
+            else:
+                state = freeze(game._build_save_data())
+                self._marks = game._current_journal_marks()
+        else:
+            ops = game._journal_ops(self._marks)
+            if not ops and extras == parent.extras and index_len == parent.index_len:
+                if label:
+                    parent.label = label
+                return parent
+            if parent.built:
+                state = apply_ops(parent.state, ops)
+            else:
+                # A private copy of the changes, applied once the parent's state is built
+                ops = json.loads(_dumps(ops))
+                state = lambda parent=parent, ops=ops: apply_ops(parent.state, ops)
+        actions_total = getattr(game.session_memory.get("actions"), "total", 0)
+        if parent is None:
+            added = None
+        elif index_len is None:
+            added = ()
+        elif parent.index_len is not None and index_len >= parent.index_len:
+            added = tuple(index.entries(parent.index_len))
+        else:
+            added = None
+        self.head = Snapshot(next(self._ids), parent, state, extras, actions_total, index_len, added, label)
+        self._trim()
+        return self.head
+
+    def _trim(self) -> None:
+        """Drop history more than max_undo snapshots behind the head (named branches stay reachable)."""
+        node = self.head
+        for _ in range(self.max_undo):
+            if node.parent is None:
+                return
+            node = node.parent
+        # Built before its parent goes, so no unbuilt state keeps older snapshots alive
+        node.state
+        node.parent = None
+
+    def restore(self, target: Snapshot) -> None:
+        """Bring the live game to a snapshot, which becomes the head."""
+        current = self.checkpoint()
+        if current is None or target is current:
+            return
+        game = self.game
+        game._rewind(current.state, target.state, target.actions_total, target.extras)
+
+        # The memory index only grows: cut it back to the common ancestor and replay up to target
+        ancestor = common_ancestor(current, target)
+        path, node = [], target
+        while node is not ancestor:
+            path.append(node)
+            node = node.parent
+        if (ancestor is None or ancestor.index_len is None
+                or any(snapshot.index_added is None for snapshot in path)):
+            game._rebuild_memory_index()
+        else:
+            index = game.memory_index
+            index.truncate(ancestor.index_len)
+            for snapshot in reversed(path):
+                for entry in snapshot.index_added:
+                    index.add(*entry)
+
+        self.head = target
+        self._marks = game._current_journal_marks()
+
+    def undo(self, turns: int = 1) -> int:
+        """
+        Go back turns snapshots along the current line of play.
+
+        Returns:
+            Number of snapshots actually gone back (fewer if history runs out)
+        """
+        current = self.checkpoint()
+        target, steps = current, 0
+        while target is not None and steps < turns and target.parent is not None:
+            target = target.parent
+            steps += 1
+        if steps:
+            self.restore(target)
+        return steps
+
+    def branch(self, name: str) -> Optional[Snapshot]:
+        """Name the current state, to return to it later with checkout(name)."""
+        snapshot = self.checkpoint(label=name)
+        if snapshot is not None:
+            self.branches[branch_key(name)] = snapshot
+        return snapshot
+
+    def checkout(self, name: str) -> Snapshot:
+        """Restore a named branch. Raises KeyError if there is no such branch."""
+        target = self.branches[branch_key(name)]
+        self.restore(target)
+        return target
+
+    def history(self) -> List[Snapshot]:
+        """Snapshots along the current line of play, newest first."""
+        snapshots, node = [], self.head
+        while node is not None:
+            snapshots.append(node)
+            node = node.parent
+        return snapshots
@@ -0,0 +1,227 @@
+import re
+import logging
+import itertools
+from collections import OrderedDict, deque
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Unique across every tree in the process, unlike id(), which is reused once a tree is freed
+_generations = itertools.count(1)
+
+# Upper bound on the text sent to one summarization call
+MAX_INPUT_CHARS = 4000
+# Target lengths for each level of the hierarchy
+SCENE_CHARS = 600
+DAY_CHARS = 1200
+REGION_CHARS = 1000
+SYNOPSIS_CHARS = 1500
+# Closed day summaries kept; older days only survive in the synopsis
+MAX_DAYS = 14
+
+# summarize(text, instructions, max_tokens) -> summary, or "" on failure
+Summarizer = Callable[[str, str, int], str]
+
+SCENE_INSTRUCTIONS = (
+    "Summarize this part of the adventure into a few concise facts the DM must remember: "
+    "names, relationships, decisions, promises and anything left unresolved."
+)
+ROLLUP_INSTRUCTIONS = (
+    "Merge the existing summary with the new notes into one concise summary. "
+    "Keep names, open threads and consequences; drop small talk and repetition."
+)
+SYNOPSIS_INSTRUCTIONS = (
+    "Update the story synopsis with the day that just ended. Keep it short: "
+    "the main characters, what the player has achieved and what is still open."
+)
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+def _clip(text: str, limit: int) -> str:
+    """Keep the end of text, starting at a sentence boundary where possible."""
+    text = text.strip()
+    if len(text) <= limit:
+        return text
+    tail = text[-limit:]
+    parts = _SENTENCE_END.split(tail, maxsplit=1)
+    return parts[1] if len(parts) == 2 and parts[1] else tail
+
+
+@dataclass
+class Scene:
+    day: int
+    region: str
+    text: str
+
+
+class SummaryTree:
+    """
+    Hierarchical rolling summaries of a session.
+
+    Scenes (a condensed stretch of conversation, or a short note) roll up
+    into one summary per in-game day and one per region, and each closed day
+    is folded into a bounded top-level synopsis. Every level has a size cap
+    and summaries are folded incrementally, so a summarization call never
+    sees more than about MAX_INPUT_CHARS of text however long the session
+    runs. Without a summarizer (or when it fails) the levels fall back to
+    keeping their most recent sentences.
+    """
+
+    def __init__(self, summarize: Optional[Summarizer] = None, max_scenes: int = 12):
+        """
+        Args:
+            summarize: e.g. GroqEngine.summarize
+            max_scenes: Number of recent scenes kept verbatim
+        """
+        self.summarize = summarize
+        self.scenes: deque = deque(maxlen=max_scenes)
+        self.days: "OrderedDict[int, str]" = OrderedDict()
+        self.regions: Dict[str, str] = {}
+        self.synopsis = ""
+        self.current_day: Optional[int] = None
+        self.version = 0  # Bumped whenever any summary changes
+        self.generation = next(_generations)
+        self._pending_day: List[str] = []
+        self._pending_regions: Dict[str, List[str]] = {}
+
+    def _run(self, text: str, instructions: str, limit: int) -> str:
+        text = _clip(text, MAX_INPUT_CHARS)
+        summary = ""
+        if self.summarize:
+            try:
+                summary = self.summarize(text, instructions, max(64, limit // 4)) or ""
+            except Exception as e:
+                logger.warning(f"Summarization failed, keeping raw text: {e}")
+        return _clip(summary or text, limit)
+
+    def _fold(self, current: str, notes: List[str], limit: int, instructions: str) -> str:
+        if not notes:
+            return current
+        text = "\n".join(filter(None, [current and f"Summary so far: {current}", "New notes:", *notes]))
+        return self._run(text, instructions, limit)
+
+    def add_scene(self, text: str, day: int, region: str, summarize: bool = True) -> str:
+        """
+        Record a scene.
+
+        Args:
+            text: Raw scene text (e.g. a formatted conversation) or a short note
+            day: In-game day the scene happened on; a new day closes the previous one
+            region: Location the scene happened in
+            summarize: Summarize the text first; pass False for notes that are already short
+
+        Returns:
+            The stored scene text
+        """
+        if self.current_day is not None and day != self.current_day:
+            self.close_day()
+        self.current_day = day
+
+        scene_text = self._run(text, SCENE_INSTRUCTIONS, SCENE_CHARS) if summarize else _clip(text, SCENE_CHARS)
+        if not scene_text:
+            return ""
+        self.scenes.append(Scene(day, region, scene_text))
+        self.version += 1
+
+        self._pending_day.append(scene_text)
+        if sum(map(len, self._pending_day)) > MAX_INPUT_CHARS - DAY_CHARS:
+            self._roll_day()
+        pending = self._pending_regions.setdefault(region, [])
+        pending.append(scene_text)
+        if sum(map(len, pending)) > MAX_INPUT_CHARS - REGION_CHARS:
+            self._roll_region(region)
+        return scene_text
+
+    def _roll_day(self) -> None:
+        day = self.current_day
+        self.days[day] = self._fold(self.days.get(day, ""), self._pending_day, DAY_CHARS, ROLLUP_INSTRUCTIONS)
+        self._pending_day = []
+
+    def _roll_region(self, region: str) -> None:
+        notes = self._pending_regions.pop(region, [])
+        self.regions[region] = self._fold(self.regions.get(region, ""), notes, REGION_CHARS, ROLLUP_INSTRUCTIONS)
+
+    def close_day(self) -> None:
+        """Roll the current day up and fold it into the synopsis."""
+        if self.current_day is None:
+            return
+        self._roll_day()
+        for region in list(self._pending_regions):
+            self._roll_region(region)
+        day_summary = self.days.get(self.current_day)
+        if day_summary:
+            self.synopsis = self._fold(self.synopsis, [f"Day {self.current_day}: {day_summary}"],
+                                       SYNOPSIS_CHARS, SYNOPSIS_INSTRUCTIONS)
+        while len(self.days) > MAX_DAYS:
+            self.days.popitem(last=False)
+        self.version += 1
+
+    def today(self) -> str:
+        """Summary of the current day so far, including scenes not yet rolled up."""
+        return "\n".join(filter(None, [self.days.get(self.current_day, ""), *self._pending_day]))
+
+    def region(self, name: str) -> str:
+        """Summary of everything that happened at a region, including scenes not yet rolled up."""
+        return "\n".join(filter(None, [self.regions.get(name, ""), *self._pending_regions.get(name, [])]))
+
+    def for_prompt(self, detail: str = "region", region: Optional[str] = None, limit: int = 1500) -> str:
+        """
+        Summary text at the granularity a prompt needs.
+
+        Args:
+            detail: "synopsis" (whole story, shortest), "day" (synopsis and
+                today), "region" (synopsis and what happened at region) or
+                "scene" (the last few scenes verbatim)
+            region: Location for "region" detail
+            limit: Maximum characters returned
+
+        Returns:
+            The summary, or "" if nothing has happened yet
+        """
+        if detail == "scene":
+            parts = [scene.text for scene in list(self.scenes)[-3:]]
+        elif detail == "day":
+            parts = [self.synopsis, self.today()]
+        elif detail == "region" and region:
+            parts = [self.synopsis, self.region(region)]
+        else:
+            parts = [self.synopsis]
+        return _clip("\n".join(filter(None, parts)), limit)
+
+    def __bool__(self) -> bool:
+        return bool(self.synopsis or self.scenes or self.days)
+
+    def __str__(self) -> str:
+        return self.for_prompt("day")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "synopsis": self.synopsis,
+            "current_day": self.current_day,
+            "days": {str(day): text for day, text in self.days.items()},
+            "regions": dict(self.regions),
+            "scenes": [asdict(scene) for scene in self.scenes],
+            "pending_day": list(self._pending_day),
+            "pending_regions": {name: list(notes) for name, notes in self._pending_regions.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], summarize: Optional[Summarizer] = None) -> 'SummaryTree':
+        tree = cls(summarize)
+        tree.synopsis = data.get("synopsis", "")
+        tree.current_day = data.get("current_day")
+        tree.days = OrderedDict((int(day), text) for day, text in data.get("days", {}).items())
+        tree.regions = dict(data.get("regions", {}))
+        tree.scenes.extend(Scene(**scene) for scene in data.get("scenes", []))
+        tree._pending_day = list(data.get("pending_day", []))
+        tree._pending_regions = {name: list(notes) for name, notes in data.get("pending_regions", {}).items()}
+        return tree
+
+    @classmethod
+    def from_text(cls, text: str, summarize: Optional[Summarizer] = None) -> 'SummaryTree':
+        """Start from a flat memory summary, as stored by older saves."""
+        tree = cls(summarize)
+        tree.synopsis = _clip(text or "", SYNOPSIS_CHARS)
+        return tree
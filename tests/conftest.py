@@ -0,0 +1,28 @@
+import os
+import sys
+import json
+
+import pytest
+
+# The game's modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game import RPGGame, GroqEngine
+
+
+@pytest.fixture
+def new_game(tmp_path):
+    """Makes games that share one save directory, on an engine with no LLM key."""
+    engine = GroqEngine()
+    return lambda: RPGGame(engine, save_dir=str(tmp_path / "saves"))
+
+
+@pytest.fixture
+def game_state():
+    """A game's save data as plain JSON, without the wall-clock times in it."""
+    def state(game):
+        data = json.loads(json.dumps(game._build_save_data(), default=str))
+        data.pop("timestamp", None)
+        data.get("game_time", {}).pop("last_updated", None)
+        return data
+    return state
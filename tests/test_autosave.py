@@ -0,0 +1,70 @@
+import os
+import time
+
+import pytest
+
+import save_system
+from autosave import AUTOSAVE_NAME, AutosaveService
+
+
+@pytest.fixture
+def service():
+    service = AutosaveService(delay=60.0, max_delay=60.0)
+    yield service
+    service.shutdown()
+
+
+def test_a_failed_write_keeps_the_old_file(tmp_path):
+    path = str(tmp_path / "hero.json")
+    save_system.write_json_atomic(path, {"hp": 10})
+
+    def crash(f):
+        f.write(b'{"hp": ')
+        raise OSError("disk full")
+    with pytest.raises(OSError):
+        save_system.write_atomic(path, crash)
+
+    with open(path) as f:
+        assert f.read() == '{"hp": 10}'
+    assert os.listdir(tmp_path) == ["hero.json"]
+
+
+def test_flush_writes_every_captured_change(new_game, game_state, service):
+    game = new_game()
+    game.create_character("Ara", "Warrior")
+    service.request(game)
+    for n in range(5):
+        game.update_session_memory(f"action {n}", "ok")
+        game.current_player.hit_points -= 1
+        service.request(game)
+    assert not os.path.exists(os.path.join(game.save_dir, AUTOSAVE_NAME))
+
+    service.flush(game)
+    loaded = new_game()
+    loaded.load_game(AUTOSAVE_NAME)
+    assert game_state(loaded) == game_state(game)
+    assert [save["filename"] for save in save_system.list_saves(game.save_dir)] == [AUTOSAVE_NAME]
+
+
+def test_a_quiet_game_is_saved_after_the_delay(new_game):
+    service = AutosaveService(delay=0.05, max_delay=10.0)
+    game = new_game()
+    game.create_character("Ara", "Warrior")
+    path = os.path.join(game.save_dir, AUTOSAVE_NAME)
+    try:
+        service.request(game)
+        deadline = time.monotonic() + 5
+        while not os.path.exists(path) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert os.path.exists(path)
+    finally:
+        service.shutdown()
+
+
+def test_forget_drops_unwritten_changes(new_game, service):
+    game = new_game()
+    game.create_character("Ara", "Warrior")
+    service.request(game)
+    service.forget(game)
+    service.flush()
+    assert not os.path.exists(os.path.join(game.save_dir, AUTOSAVE_NAME))
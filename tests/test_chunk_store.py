@@ -0,0 +1,81 @@
+import os
+
+from chunk_store import CHUNK_ITEMS, ChunkStore, is_chunked
+
+
+def _save(events, npcs=0):
+    return {
+        "player": {"name": "Ara"},
+        "session_memory": {"important_events": [{"id": n, "description": f"event {n}"} for n in range(events)]},
+        "npc_memory": {"npcs": {f"npc {n}": {"name": f"NPC {n}"} for n in range(npcs)}, "factions": {}},
+    }
+
+
+def _chunks_on_disk(store):
+    return {file for directory, _, files in os.walk(store.root)
+            if os.path.basename(directory) != "refs" for file in files}
+
+
+def _write(store, name, state):
+    split, digests = store.split(state)
+    store.retain(name, digests)
+    store.commit(name, digests)
+    return split, set(digests)
+
+
+def test_split_and_expand_round_trip(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    state = _save(events=CHUNK_ITEMS * 3 + 10, npcs=CHUNK_ITEMS * 2 + 5)
+    split, _ = _write(store, "hero", state)
+
+    assert is_chunked(split) and split["player"] == state["player"]
+    assert store.expand(split) == state
+    npcs = split["npc_memory"]["npcs"]
+    assert store.load_entry(npcs, "npc 300") == {"name": "NPC 300"}
+    assert store.load_entry(npcs, "nobody") is None
+    assert not is_chunked(_save(events=3))
+
+
+def test_saves_share_the_chunks_that_did_not_change(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    _, first = _write(store, "monday", _save(events=CHUNK_ITEMS * 4))
+    _, second = _write(store, "tuesday", _save(events=CHUNK_ITEMS * 4 + 10))
+
+    assert len(first & second) == 4 and len(second - first) == 1
+    assert _chunks_on_disk(store) == first | second
+
+
+def test_release_deletes_only_unshared_chunks(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    _, first = _write(store, "monday", _save(events=CHUNK_ITEMS * 4))
+    tuesday, second = _write(store, "tuesday", _save(events=CHUNK_ITEMS * 4 + 10))
+
+    assert store.release("monday") == len(first - second)
+    assert _chunks_on_disk(store) == second
+    assert store.expand(tuesday) == _save(events=CHUNK_ITEMS * 4 + 10)
+    assert store.release("monday") == 0
+    assert store.release("tuesday") == len(second) and not _chunks_on_disk(store)
+
+
+def test_gc_removes_chunks_a_crash_left_behind(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    _, kept = _write(store, "hero", _save(events=CHUNK_ITEMS * 2))
+    store.split(_save(events=CHUNK_ITEMS * 5))  # Never retained: the save crashed
+
+    # A fresh store (as after a restart) has no pins from the crashed save
+    assert ChunkStore(str(tmp_path)).gc() == 3
+    assert _chunks_on_disk(store) == kept
+
+
+def test_chunked_game_saves_load_back(new_game, game_state):
+    game = new_game()
+    game.create_character("Ara", "Warrior")
+    for n in range(CHUNK_ITEMS + 20):
+        game.add_important_event("quest", f"Errand {n}", "Town", n % 10 + 1)
+    game.save_game("monday", chunked=True)
+    game.add_important_event("quest", "One more errand", "Town", 5)
+    game.save_game("tuesday", chunked=True)
+
+    loaded = new_game()
+    loaded.load_game("tuesday")
+    assert game_state(loaded) == game_state(game)
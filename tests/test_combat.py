@@ -0,0 +1,41 @@
+import pytest
+
+import combat
+from dice import DiceRoller
+
+
+def test_from_stats_reads_damage_and_armor_from_text():
+    enemy = combat.Combatant.from_stats("Cultist", {"HP": 5, "equipment": {"weapon": "Knife (1D4 DAMAGE)",
+                                                                           "armor": "Robes (1 ARMOR)"}})
+    assert (enemy.hp, enemy.damage, enemy.armor) == (5, "1D4", 1)
+
+
+def test_seeded_resolve_replays_the_same_fight():
+    hero = combat.Combatant("Hero", hp=20, damage="1D8", attack_bonus=2)
+    goblins = [combat.Combatant(f"Goblin {i}", hp=4, damage="1D4") for i in (1, 2)]
+
+    first = combat.CombatEngine(DiceRoller(5)).resolve([hero], goblins)
+    second = combat.CombatEngine(DiceRoller(5)).resolve([hero], goblins)
+    assert first == second
+    assert first.winner in ("players", "enemies")
+    assert all(hp > 0 for hp in first.survivors.values())
+
+
+def test_simulation_tracks_the_stronger_side():
+    strong = combat.Combatant("Knight", hp=40, damage="2D6", attack_bonus=5, armor=2)
+    weak = combat.Combatant("Rat", hp=3, damage="1D2")
+
+    result = combat.simulate(strong, weak, fights=2000, seed=1)
+    assert result.wins + result.losses + result.draws == 2000
+    assert result.win_rate > 0.99
+    assert result == combat.simulate(strong, weak, fights=2000, seed=1)
+    assert combat.simulate(weak, strong, fights=2000, seed=1).win_rate < 0.01
+
+
+def test_serial_simulation_matches_the_vectorized_one():
+    player = combat.Combatant("Hero", hp=12, damage="1D6")
+    enemy = combat.Combatant("Bandit", hp=8, damage="1D6")
+    fast = combat.simulate(player, enemy, fights=4000, seed=2)
+    serial = combat._simulate_serial(player, enemy, 4000, 1, 2, 100)
+    assert serial.win_rate == pytest.approx(fast.win_rate, abs=0.05)
+    assert serial.mean_ttk == pytest.approx(fast.mean_ttk, rel=0.1)
@@ -0,0 +1,55 @@
+import threading
+
+import pytest
+
+import encounters
+from dice import DiceRoller
+from game import RPGGame, GroqEngine
+from narration import NarrationQueue
+
+
+@pytest.fixture
+def game(tmp_path):
+    game = RPGGame(GroqEngine(), save_dir=str(tmp_path))
+    game.create_character("Ara", "Warrior")
+    game.dice = DiceRoller(1)
+    rat = encounters.Enemy("Rat", 1, 3, "easy")
+    game.start_encounter(encounters.Encounter("Town", encounters.SpawnEntry("rat", "easy", 1, ()), [rat]))
+    return game
+
+
+def test_attack_is_resolved_without_narration(game):
+    outcomes = []
+    while game.combat_mode:
+        game.process_input("attack")
+        outcomes.append(game.last_attack["outcome"])
+        player, enemy, outcome = game.combat_narration_args()
+        assert player == ("Ara", "Warrior", 1, "unhurt")
+        assert enemy[0] == "Rat" and outcome == outcomes[-1]
+
+    assert outcomes[-1] == "kill" and set(outcomes[:-1]) <= {"miss", "hit"}
+    assert game.combat_narration_args()[1] == ("Rat", 1, "down")
+    # Nothing left to narrate once the fight is over
+    game.process_input("attack")
+    assert game.combat_narration_args() is None
+
+
+def test_narration_queue_shares_calls_and_skips_when_saturated():
+    release = threading.Event()
+    calls = []
+
+    def narrate(text):
+        calls.append(text)
+        release.wait(5)
+        return text.upper()
+
+    queue = NarrationQueue(max_workers=1, max_pending=2)
+    first = queue.submit("hit", narrate, "hit")
+    assert queue.submit("hit", narrate, "hit") is first
+    assert queue.submit("miss", narrate, "miss") is not None
+    assert queue.submit("kill", narrate, "kill") is None
+
+    release.set()
+    assert first.result(5) == "HIT"
+    queue.shutdown(wait=True)
+    assert calls == ["hit", "miss"]
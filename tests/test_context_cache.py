@@ -0,0 +1,51 @@
+import encounters
+from context_cache import ContextSections
+from dice import DiceRoller
+from game import RPGGame, GroqEngine
+
+
+def test_sections_render_again_only_when_their_key_changes():
+    state = {"hp": 10, "place": "Town"}
+    renders = []
+
+    def render(name):
+        renders.append(name)
+        return f"{name}: {state[name]}"
+
+    sections = ContextSections()
+    sections.add("hp", lambda: state["hp"], lambda: render("hp"))
+    sections.add("place", lambda: state["place"], lambda: render("place"))
+
+    assert sections.render(["place", "hp"]) == "place: Town\nhp: 10"
+    assert sections.render(["place", "hp"]) == "place: Town\nhp: 10"
+    state["hp"] = 7
+    assert sections.render(["place", "hp"]) == "place: Town\nhp: 7"
+    assert renders == ["place", "hp", "hp"]
+
+    sections.invalidate("place")
+    sections.render(["place", "hp"])
+    assert renders[-1] == "place"
+
+
+def test_game_context_matches_an_uncached_build(tmp_path):
+    game = RPGGame(GroqEngine(), save_dir=str(tmp_path))
+    game.create_character("Ara", "Warrior")
+    game.dice = DiceRoller(6)
+
+    def uncached():
+        return game._build_context_sections().render(game.GROQ_CONTEXT_SECTIONS)
+
+    steps = [
+        lambda: game.update_session_memory("look around", "A quiet street."),
+        lambda: setattr(game.current_player, "hit_points", game.current_player.hit_points - 3),
+        lambda: game.add_important_event("quest", "Accepted the lighthouse job", game.current_player.current_location, 8),
+        lambda: game.start_encounter(encounters.Encounter(
+            "Town", encounters.SpawnEntry("rat", "easy", 1, ()), [encounters.Enemy("Rat", 1, 5, "easy")])),
+        lambda: game.process_input("attack"),
+        lambda: game.process_input("attack"),
+        lambda: game.game_time.update(day=game.game_time["day"] + 5),
+    ]
+    assert game.build_groq_context() == uncached()
+    for step in steps:
+        step()
+        assert game.build_groq_context() == uncached()
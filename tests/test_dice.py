@@ -0,0 +1,37 @@
+import random
+
+import pytest
+
+import dice
+
+
+def test_distribution_is_exact():
+    plan = dice.compile_dice("2D6+1")
+    distribution = plan.distribution()
+    assert sum(distribution.values()) == pytest.approx(1.0)
+    assert (plan.minimum, plan.maximum) == (3, 13)
+    assert distribution[8] == pytest.approx(6 / 36)
+    assert plan.mean() == pytest.approx(8.0)
+    assert plan.chance_at_least(13) == pytest.approx(1 / 36)
+    assert plan.chance_at_least(3) == 1.0
+
+
+def test_parses_rule_file_notation():
+    assert dice.compile_dice("1D6 DAMAGE").maximum == 6
+    assert dice.compile_dice(3).distribution() == {3: 1.0}
+    assert dice.compile_dice("1d4-1d4").distribution()[0] == pytest.approx(4 / 16)
+    with pytest.raises(ValueError):
+        dice.compile_dice("DAMAGE")
+
+
+def test_batched_rolls_stay_in_range_and_track_the_mean():
+    plan = dice.compile_dice("3D6")
+    rolls = list(plan.roll_many(20000, random.Random(3)))
+    assert min(rolls) >= 3 and max(rolls) <= 18
+    assert sum(rolls) / len(rolls) == pytest.approx(10.5, abs=0.1)
+
+
+def test_seeded_roller_is_reproducible():
+    first, second = dice.DiceRoller(seed=11), dice.DiceRoller(seed=11)
+    assert [first.roll("1D20") for _ in range(10)] == [second.roll("1D20") for _ in range(10)]
+    assert list(first.roll_many("2D6", 100)) == list(second.roll_many("2D6", 100))
@@ -0,0 +1,77 @@
+import random
+from collections import Counter
+
+import pytest
+
+import encounters
+from dice import DiceRoller
+from game import RPGGame, GroqEngine
+
+RULES = {
+    "enemies.json": {
+        "enemy_difficulties": {
+            "easy": {"stats": {"hp": 3, "armor": 0, "damage": 3}},
+            "hard": {"stats": {"hp": 6, "armor": 1, "damage": "1D6+1"}},
+        },
+        "premade_enemies": {
+            "street_thug": {"difficulty": "easy", "group_size": "1D6 appear"},
+            "war_droid": {"difficulty": "hard"},
+            "dragon": {"difficulty": "hard", "is_boss": True},
+        },
+    }
+}
+LOCATIONS = {
+    "Docks": {"enemies": ["street_thug"], "encounter_chance": 1.0},
+    "Lab": {"encounter_difficulty": "hard", "encounter_chance": 0.5},
+    "Chapel": {},
+}
+
+
+@pytest.fixture
+def generator():
+    return encounters.EncounterGenerator(RULES, LOCATIONS, seed=3)
+
+
+def test_tables_are_precomputed_per_tier_and_location(generator):
+    assert set(generator.difficulty_tables) == {"easy", "hard"}
+    assert set(generator.location_tables) == {"Docks", "Lab"}
+    assert generator.roll("Chapel") is None
+
+    hard = generator.spawn(difficulty="hard")
+    assert [enemy.name for enemy in hard.enemies] == ["War Droid"]  # Bosses never spawn
+    assert hard.enemies[0].to_combatant().armor == 1
+
+
+def test_group_sizes_follow_the_dice(generator):
+    sizes = Counter(len(generator.spawn("Docks").enemies) for _ in range(6000))
+    assert set(sizes) == set(range(1, 7))
+    assert sizes[1] / 6000 == pytest.approx(1 / 6, abs=0.02)
+
+
+def test_roll_respects_the_encounter_chance(generator):
+    assert all(generator.roll("Docks") for _ in range(50))
+    hits = sum(generator.roll("Lab", random.Random(n)) is not None for n in range(2000))
+    assert hits / 2000 == pytest.approx(0.5, abs=0.05)
+
+
+def test_seeded_generators_agree():
+    first = encounters.EncounterGenerator(RULES, LOCATIONS, seed=9)
+    second = encounters.EncounterGenerator(RULES, LOCATIONS, seed=9)
+    assert [first.spawn("Docks").enemies for _ in range(20)] == [second.spawn("Docks").enemies for _ in range(20)]
+
+
+def test_game_fights_the_group_one_enemy_at_a_time(tmp_path):
+    game = RPGGame(GroqEngine(), save_dir=str(tmp_path))
+    assert game.process_input("flee") == "You are not in a fight."
+    game.create_character("Ara", "Warrior")
+    game.dice = DiceRoller(4)
+    entry = encounters.SpawnEntry("rat", "easy", 1, ())
+    game.start_encounter(encounters.Encounter("Town", entry, [encounters.Enemy(f"Rat {n}", 1, 1, "easy")
+                                                              for n in (1, 2)]))
+
+    while game.current_enemy.name == "Rat 1":
+        game.process_input("attack")
+    assert game.combat_mode and game.current_encounter == []
+    while game.combat_mode:
+        game.process_input("attack")
+    assert game.current_enemy is None
@@ -0,0 +1,70 @@
+import random
+
+from event_store import EventStore, game_minutes
+
+TYPES = ["combat", "quest", "discovery"]
+LOCATIONS = ["Town", "Forest", "Docks"]
+
+
+def _random_store(seed, count=300):
+    rng = random.Random(seed)
+    store = EventStore()
+    clock = 0
+    for n in range(count):
+        # The clock mostly moves forward but sometimes jumps back, as after loading a save
+        clock = max(0, clock + rng.randint(-30, 120))
+        store.add(rng.choice(TYPES), f"event {n}", rng.choice(LOCATIONS), rng.randint(0, 12), clock,
+                  timestamp="2026-01-01T00:00:00")
+    return store
+
+
+def _brute_force(store, event_type=None, location=None, min_importance=1, since=None, until=None):
+    return {event['id'] for event in store
+            if (event_type is None or event['type'] == event_type)
+            and (location is None or event['location'] == location)
+            and event['importance'] >= min_importance
+            and (since is None or event['game_time'] >= since)
+            and (until is None or event['game_time'] <= until)}
+
+
+def test_indexed_queries_match_a_full_scan():
+    store = _random_store(1)
+    rng = random.Random(2)
+    for _ in range(200):
+        filters = {
+            "event_type": rng.choice(TYPES + [None]),
+            "location": rng.choice(LOCATIONS + [None]),
+            "min_importance": rng.randint(1, 10),
+            "since": rng.choice([None, rng.randint(0, 5000)]),
+            "until": rng.choice([None, rng.randint(5000, 20000)]),
+        }
+        assert {event['id'] for event in store.query(**filters)} == _brute_force(store, **filters)
+
+
+def test_top_orders_by_importance_then_recency():
+    store = EventStore()
+    store.add("quest", "old and minor", "Town", 3, 10)
+    store.add("quest", "old and major", "Town", 9, 20)
+    store.add("quest", "new and major", "Town", 9, 30)
+    store.add("quest", "elsewhere", "Forest", 10, 40)
+    assert [e['description'] for e in store.top(2, location="Town")] == ["new and major", "old and major"]
+    assert [e['description'] for e in store.top(5, days=1, now=40)][0] == "elsewhere"
+
+
+def test_truncate_matches_a_store_rebuilt_from_the_kept_events():
+    store = _random_store(3)
+    generation = store.generation
+    store.truncate(120)
+    rebuilt = EventStore.from_list(_random_store(3).to_list()[:120])
+
+    assert store.generation != generation
+    assert store.to_list() == rebuilt.to_list()
+    for location in LOCATIONS:
+        assert store.ids_at(location) == rebuilt.ids_at(location)
+    assert store.query(since=0) == rebuilt.query(since=0)
+    assert store.add("quest", "after", "Town") == 120
+
+
+def test_game_minutes():
+    assert game_minutes({'day': 1}) == 0
+    assert game_minutes({'day': 2, 'hour': 1, 'minute': 5}) == 24 * 60 + 65
@@ -0,0 +1,38 @@
+import random
+from collections import Counter
+
+import pytest
+
+import generators
+
+
+def test_dice_outcomes_sum_to_one():
+    for die in ("1d6", "2d6", "3d8", "d66"):
+        assert sum(generators.dice_outcomes(die).values()) == pytest.approx(1.0)
+    assert generators.dice_outcomes("2d6")[7] == pytest.approx(6 / 36)
+    assert generators.dice_outcomes("banana") is None
+
+
+def test_alias_sampler_follows_the_weights():
+    sampler = generators.AliasSampler(["common", "rare"], [9.0, 1.0])
+    counts = Counter(sampler.sample_many(random.Random(1), 20000))
+    assert counts["common"] / 20000 == pytest.approx(0.9, abs=0.01)
+
+
+def test_dice_weighted_table_favours_likely_rolls():
+    sampler = generators.compile_table({"2-6": "low", "7": "seven", "8-12": "high"}, "2d6")
+    counts = Counter(sampler.sample_many(random.Random(2), 36000))
+    assert counts["seven"] / 36000 == pytest.approx(6 / 36, abs=0.01)
+
+
+def test_generate_is_reproducible_with_a_seed():
+    rules = {"cults.json": {"feature_generator": {"d6": {"1-3": "masks", "4-6": "candles"}},
+                            "prophecy_generator": {"d6": {"1-6": "the end"}}}}
+    engine = generators.GeneratorEngine(rules)
+
+    assert engine.tables() == {"cults.json": ["feature", "prophecy"]}
+    batch = engine.generate("cults", 50, seed=7)
+    assert batch == engine.generate("cults", 50, seed=7)
+    assert {entry["prophecy"] for entry in batch} == {"the end"}
+    with pytest.raises(KeyError):
+        engine.roll("cults", "missing")
@@ -0,0 +1,78 @@
+import os
+import threading
+
+import pytest
+
+import bench_saves
+import lazy_load
+import save_format
+from game import LazyNPCMemory
+
+
+def test_lazy_builds_once_and_retries_after_a_failure():
+    calls = []
+    release = threading.Event()
+
+    def build():
+        calls.append(1)
+        release.wait(5)
+        return object()
+
+    value = lazy_load.Lazy(build)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(value.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and len({id(result) for result in results}) == 1 and value.ready
+
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("save file busy")
+        return "loaded"
+    flaky_value = lazy_load.Lazy(flaky)
+    with pytest.raises(OSError):
+        flaky_value.get()
+    assert not flaky_value.ready and flaky_value.get() == "loaded"
+
+
+@pytest.fixture
+def world_save(new_game):
+    """A binary save with enough NPCs for their section to be batched by key."""
+    game = new_game()
+    os.makedirs(game.save_dir, exist_ok=True)
+    with open(os.path.join(game.save_dir, "world.rpgs"), 'wb') as f:
+        save_format.dump(bench_saves.build_world(save_format.BATCH_SIZE + 500), f)
+    return "world"
+
+
+def test_a_lazy_load_ends_up_equal_to_a_full_one(new_game, game_state, world_save, monkeypatch):
+    full = new_game()
+    full.load_game(world_save)
+    full.npc_memory.materialize()
+
+    # No background prefetch, so nothing is read before it is asked for
+    monkeypatch.setattr(lazy_load, "prefetch", lambda loads, name="": None)
+    lazy = new_game()
+    lazy.load_game(world_save)
+    assert isinstance(lazy.npc_memory, LazyNPCMemory) and not lazy.npc_memory.materialized
+
+    villager = lazy.npc_memory.get_npc("Villager 1234")
+    assert villager.name == "Villager 1234" and not lazy.npc_memory.materialized
+    assert game_state(lazy) == game_state(full)
+    assert lazy.npc_memory.npcs["villager 1234"] is villager
+
+
+def test_npcs_changed_before_the_rest_load_are_kept(new_game, game_state, world_save, monkeypatch):
+    monkeypatch.setattr(lazy_load, "prefetch", lambda loads, name="": None)
+    game = new_game()
+    game.load_game(world_save)
+    game.npc_memory.get_npc("Villager 7").update_relationship("player_ara", affinity_change=30, fact="Saved the mill")
+
+    saved = game_state(game)["npc_memory"]["npcs"]["villager 7"]["relationships"]["player_ara"]
+    assert "Saved the mill" in saved["known_facts"]
@@ -0,0 +1,37 @@
+import gc
+import os
+import json
+
+import rules_pack
+
+
+def _store(tmp_path):
+    with open(os.path.join(tmp_path, "weapons.json"), 'w', encoding='utf-8') as f:
+        json.dump({"melee": {"sword": 6}, "ranged": {"bow": 6}}, f)
+    return rules_pack.MappedRulesStore.open(rules_pack.build_pack(str(tmp_path)))
+
+
+def test_views_decode_sections_from_the_mapping(tmp_path):
+    store = _store(tmp_path)
+    view = store.load("weapons.json")
+
+    assert isinstance(view, rules_pack.LazyRuleFile)
+    assert view["ranged"] == {"bow": 6}
+    assert view.to_dict() == {"melee": {"sword": 6}, "ranged": {"bow": 6}}
+    del view
+    store.close()
+
+
+def test_retired_store_closes_once_its_views_are_gone(tmp_path):
+    store = _store(tmp_path)
+    view = store.load("weapons.json")
+
+    store.retire()
+    # A live view keeps the mapping open
+    assert view["melee"] == {"sword": 6}
+    assert not store._closed
+
+    del view
+    gc.collect()
+    assert store._closed
+    assert not store.acquire()
@@ -0,0 +1,45 @@
+from memory_search import MemoryIndex
+
+
+def _index():
+    index = MemoryIndex()
+    index.add("Bought a silver dagger from the blacksmith", location="Town")
+    index.add("The blacksmith mentioned a dragon in the northern caves", kind="npc", npc="Brom")
+    index.add("Crossed the river at dawn", location="Forest")
+    index.add("Brom owes the innkeeper money", kind="npc", npc="Mira")
+    return index
+
+
+def test_search_ranks_the_matching_memory_first():
+    results = _index().search("where is the silver dagger", k=2)
+    assert results[0][1] == "Bought a silver dagger from the blacksmith"
+    assert [score for score, _, _ in results] == sorted((score for score, _, _ in results), reverse=True)
+
+
+def test_npc_memories_are_private_to_their_npc():
+    index = _index()
+    assert all(meta["npc"] in (None, "brom") for _, _, meta in index.search("blacksmith dragon innkeeper", npc="Brom"))
+    assert index.search("dragon caves", npc="brom")[0][1].startswith("The blacksmith mentioned a dragon")
+    assert not any(meta["npc"] for _, _, meta in index.search("blacksmith dragon innkeeper"))
+    assert index.search("dragon", kinds=["history"]) == []
+
+
+def test_truncate_matches_an_index_rebuilt_from_the_kept_memories():
+    index = _index()
+    index.add("A dragon attacked the river crossing", location="Forest")
+    index.truncate(4)
+
+    rebuilt = MemoryIndex()
+    for text, kind, npc, location in _index().entries():
+        rebuilt.add(text, kind, npc=npc, location=location)
+    assert index.entries() == rebuilt.entries()
+    for query in ("dragon", "river crossing", "silver blacksmith"):
+        assert index.search(query, npc="Brom") == rebuilt.search(query, npc="Brom")
+
+
+def test_recall_stays_within_the_token_budget():
+    index = MemoryIndex()
+    for n in range(20):
+        index.add(f"The lighthouse keeper told story number {n} about the lighthouse")
+    recalled = index.recall("lighthouse keeper", k=20, token_budget=40)
+    assert recalled and sum(len(text) // 4 for text in recalled) <= 40
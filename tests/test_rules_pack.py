@@ -0,0 +1,42 @@
+import os
+import json
+
+import rules_pack
+
+RULES = {
+    "weapons.json": {"melee": {"sword": 6, "axe": 8}, "ranged": {"bow": 6}},
+    "names.json": ["Ara", "Branwen"],
+}
+
+
+def _write_rules(rules_dir, rules=RULES):
+    for filename, data in rules.items():
+        with open(os.path.join(rules_dir, filename), 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+
+def test_pack_round_trips_every_rule_file(tmp_path):
+    _write_rules(tmp_path)
+    pack = rules_pack.RulesPack.open(rules_pack.build_pack(str(tmp_path)))
+
+    assert sorted(pack.keys()) == sorted(RULES)
+    for filename, data in RULES.items():
+        assert pack.load(filename) == data
+    assert pack.section("weapons.json", "ranged") == {"bow": 6}
+    assert pack.section("weapons.json", "missing", "default") == "default"
+    # Only the pack is left behind, no temp files
+    assert sorted(os.listdir(tmp_path)) == sorted([*RULES, rules_pack.PACK_FILENAME])
+
+
+def test_stale_pack_is_rebuilt(tmp_path):
+    _write_rules(tmp_path)
+    assert rules_pack.load_or_build(str(tmp_path)).is_fresh(str(tmp_path))
+
+    changed = {**RULES, "weapons.json": {"melee": {"sword": 10}}}
+    _write_rules(tmp_path, changed)
+    stat = os.stat(tmp_path / "weapons.json")
+    os.utime(tmp_path / "weapons.json", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    pack = rules_pack.load_or_build(str(tmp_path))
+    assert pack.is_fresh(str(tmp_path))
+    assert pack.load("weapons.json") == {"melee": {"sword": 10}}
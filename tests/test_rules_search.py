@@ -0,0 +1,39 @@
+import os
+
+import rules_search
+
+RULES = {
+    "combat.json": {"grappling": "Roll toughness against the target's nimbleness to grapple.",
+                    "cover": "Hiding behind a wall gives cover against ranged attacks."},
+    "travel.json": {"rations": "Each day of travel uses one ration per operative."},
+}
+
+
+def test_search_ranks_the_matching_snippet_first():
+    index = rules_search.RulesIndex.build(RULES)
+
+    results = index.search("how do I grapple the target", k=2)
+    assert results
+    score, title, text = results[0]
+    assert "grapple" in text
+    assert index.search("nothing matches this") == []
+
+
+def test_retrieve_keeps_within_the_token_budget():
+    index = rules_search.RulesIndex.build(RULES)
+
+    snippets = index.retrieve("cover from ranged attacks", k=3, token_budget=1000)
+    assert any("cover" in snippet for snippet in snippets)
+    assert index.retrieve("cover from ranged attacks", k=3, token_budget=1) == []
+
+
+def test_saved_index_opens_unchanged(tmp_path):
+    index = rules_search.RulesIndex.build(RULES, {"combat.json": (1, 2)})
+    path = os.path.join(tmp_path, rules_search.INDEX_FILENAME)
+    index.save(path)
+
+    reopened = rules_search.RulesIndex.open(path)
+    assert reopened.snippets == index.snippets
+    assert reopened.search("rations per day") == index.search("rations per day")
+    # Written through a temp file that does not outlive the save
+    assert os.listdir(tmp_path) == [rules_search.INDEX_FILENAME]
@@ -0,0 +1,40 @@
+import os
+import json
+
+from game import LazyRuleLoader
+from rules_watcher import RulesWatcher, diff_signatures
+
+
+def _write(path, data, bump_ns=0):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    if bump_ns:
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + bump_ns))
+
+
+def test_diff_signatures_reports_added_removed_and_modified():
+    old = {"a.json": (1, 10), "b.json": (2, 20)}
+    new = {"a.json": (1, 10), "b.json": (3, 20), "c.json": (1, 1)}
+    assert diff_signatures(old, new) == {"b.json", "c.json"}
+    assert diff_signatures(new, {}) == set(new)
+
+
+def test_check_reloads_only_the_edited_file(tmp_path):
+    _write(tmp_path / "weapons.json", {"sword": 6})
+    _write(tmp_path / "armor.json", {"leather": 1})
+    loader = LazyRuleLoader(str(tmp_path), use_pack=True)
+    armor = loader["armor.json"]
+    assert loader["weapons.json"] == {"sword": 6}
+    reloads = []
+    loader.add_reload_listener(reloads.append)
+    watcher = RulesWatcher(loader)
+
+    assert watcher.check() == set()
+    _write(tmp_path / "weapons.json", {"sword": 8}, bump_ns=1_000_000)
+    assert watcher.check() == {"weapons.json"}
+
+    assert reloads == [{"weapons.json"}]
+    assert loader["weapons.json"] == {"sword": 8}
+    # Untouched files stay cached
+    assert loader["armor.json"] is armor
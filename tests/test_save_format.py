@@ -0,0 +1,79 @@
+import io
+import json
+
+import pytest
+
+import save_format
+
+
+def _world(npcs=2500):
+    return {
+        "player": {"name": "Ara", "hit_points": 12},
+        "session_memory": {
+            "important_events": [{"id": n, "description": f"event {n}"} for n in range(2200)],
+            "visited_locations": ["Town", "Forest"],
+        },
+        "npc_memory": {"npcs": {f"npc-{n}": {"name": f"NPC {n}", "mood": n % 7} for n in range(npcs)}},
+        "game_time": {"day": 3, "hour": 14},
+    }
+
+
+@pytest.mark.parametrize("compression", sorted(save_format.COMPRESSIONS))
+def test_round_trips_large_saves(compression):
+    data = _world()
+    buffer = io.BytesIO()
+    written = save_format.dump(data, buffer, compression)
+    assert written == len(buffer.getvalue())
+    buffer.seek(0)
+    assert save_format.load(buffer) == data
+
+
+def test_binary_saves_are_smaller_than_json(tmp_path):
+    path = str(tmp_path / "world.rpgs")
+    with open(path, 'wb') as f:
+        save_format.dump(_world(), f)
+    assert save_format.is_binary_save(path)
+    with open(path, 'rb') as f:
+        assert len(f.read()) < len(json.dumps(_world(), indent=2)) / 4
+
+
+def test_sections_and_entries_are_read_on_their_own(tmp_path):
+    path = str(tmp_path / "world.rpgs")
+    with open(path, 'wb') as f:
+        save_format.dump(_world(), f)
+
+    assert ("npc_memory", "npcs") in save_format.save_sections(path)
+    assert save_format.read_section(path, "game_time") == {"day": 3, "hour": 14}
+    assert save_format.read_entry(path, ("npc_memory", "npcs"), "npc-1234") == {"name": "NPC 1234", "mood": 2}
+    assert save_format.read_entry(path, ("npc_memory", "npcs"), "nobody") is None
+    partial = save_format.read_save(path, exclude=[("npc_memory", "npcs"), ("session_memory", "important_events")])
+    assert partial["player"] == {"name": "Ara", "hit_points": 12}
+    assert "npcs" not in partial["npc_memory"] and "important_events" not in partial["session_memory"]
+
+
+def test_json_saves_read_through_the_same_calls(tmp_path):
+    path = str(tmp_path / "world.json")
+    with open(path, 'w') as f:
+        json.dump(_world(npcs=3), f)
+    assert not save_format.is_binary_save(path)
+    assert save_format.save_sections(path) is None
+    assert save_format.read_entry(path, ("npc_memory", "npcs"), "npc-2") == {"name": "NPC 2", "mood": 2}
+    assert set(save_format.read_save(path, exclude=["npc_memory"])) == {"player", "session_memory", "game_time"}
+
+
+def test_unknown_compression_is_rejected():
+    with pytest.raises(ValueError):
+        save_format.dump({}, io.BytesIO(), "snappy")
+
+
+def test_binary_game_saves_load_back(new_game, game_state):
+    game = new_game()
+    game.create_character("Ara", "Rogue")
+    for n in range(5):
+        game.update_session_memory(f"action {n}", "ok")
+    game.add_important_event("quest", "Took the lighthouse job", "Town", 7)
+    assert game.save_game("hero", binary=True) == "Game saved successfully to hero.rpgs"
+
+    loaded = new_game()
+    loaded.load_game("hero")
+    assert game_state(loaded) == game_state(game)
@@ -0,0 +1,70 @@
+import os
+
+from save_journal import SaveJournal, apply_ops, journal_path_for, load_state
+
+
+def _without_seq(state):
+    return {key: value for key, value in state.items() if key != "journal_seq"}
+
+
+def test_apply_ops():
+    state = {"player": {"hp": 10}, "log": [1, 2]}
+    apply_ops(state, [["set", ["player", "hp"], 7], ["del", ["player", "gone"]],
+                      ["extend", ["log"], [3, 4, 5], 3], ["set", ["world", "day"], 2]])
+    assert state == {"player": {"hp": 7}, "log": [3, 4, 5], "world": {"day": 2}}
+
+
+def test_load_replays_the_journal_and_compaction_keeps_the_state(tmp_path):
+    path = str(tmp_path / "hero.json")
+    journal = SaveJournal(path, compact_every=1000)
+    expected = {"player": {"hp": 10}, "log": []}
+    journal.write_snapshot(expected)
+    for hp in range(9, 0, -1):
+        ops = [["set", ["player", "hp"], hp], ["extend", ["log"], [hp], 5]]
+        journal.append(ops)
+        apply_ops(expected, ops)
+
+    assert _without_seq(load_state(path)) == expected
+    journal.compact()
+    assert os.path.getsize(journal_path_for(path)) == 0
+    assert _without_seq(load_state(path)) == expected
+    assert journal.append([]) == journal.seq
+
+
+def test_a_torn_last_line_is_skipped(tmp_path):
+    path = str(tmp_path / "hero.json")
+    journal = SaveJournal(path)
+    journal.write_snapshot({"hp": 10})
+    journal.append([["set", ["hp"], 8]])
+    with open(journal_path_for(path), 'a') as f:
+        f.write('{"seq": 99, "ops": [["set", ["hp"]')
+    assert load_state(path)["hp"] == 8
+
+
+def test_a_journal_left_behind_is_not_replayed_onto_a_new_snapshot(tmp_path):
+    path = str(tmp_path / "hero.json")
+    old = SaveJournal(path)
+    old.write_snapshot({"hp": 10})
+    old.append([["set", ["hp"], 1]])
+
+    # A new process writes a fresh snapshot but crashes before clearing the old journal
+    new = SaveJournal(path)
+    new.write_snapshot({"hp": 20})
+    with open(journal_path_for(path), 'w') as f:
+        f.write('{"seq": %d, "ops": [["set", ["hp"], 1]]}\n' % (new.seq - 1))
+    assert load_state(path)["hp"] == 20
+
+
+def test_journaled_game_saves_load_back(new_game, game_state):
+    game = new_game()
+    game.create_character("Ara", "Warrior")
+    game.save_game("hero", journal=True)
+    for n in range(5):
+        game.update_session_memory(f"action {n}", "ok")
+        game.current_player.hit_points -= 1
+        game.save_game("hero", journal=True)
+    assert os.path.getsize(journal_path_for(os.path.join(game.save_dir, "hero.json"))) > 0
+
+    loaded = new_game()
+    loaded.load_game("hero")
+    assert game_state(loaded) == game_state(game)
@@ -0,0 +1,55 @@
+import os
+import json
+
+import save_format
+import save_system
+
+
+def _write_save(save_dir, filename, name, level, timestamp):
+    data = {"player": {"name": name, "level": level}, "timestamp": timestamp}
+    with open(os.path.join(save_dir, filename), 'w') as f:
+        json.dump(data, f)
+    return data
+
+
+def test_listing_reads_only_the_manifest_once_saves_are_indexed(tmp_path, monkeypatch):
+    save_dir = str(tmp_path)
+    _write_save(save_dir, "old.json", "Ara", 1, "2026-01-01T10:00:00")
+    data = _write_save(save_dir, "new.json", "Brom", 3, "2026-02-01T10:00:00")
+    save_system.record_save("new.json", data, save_dir)
+
+    # The save the manifest didn't know is indexed on first listing
+    assert [save["filename"] for save in save_system.list_saves(save_dir)] == ["new.json", "old.json"]
+
+    def no_parsing(*args, **kwargs):
+        raise AssertionError("save file parsed while listing")
+    monkeypatch.setattr(save_format, "read_save", no_parsing)
+    saves = save_system.list_saves(save_dir, sort_by="name", reverse=False)
+    assert [(save["name"], save["character"], save["level"]) for save in saves] == [("new", "Brom", 3), ("old", "Ara", 1)]
+    assert [save["filename"] for save in save_system.list_saves(save_dir, character="ara")] == ["old.json"]
+    since = save_system.list_saves(save_dir, since=saves[1]["timestamp"] + 1)
+    assert [save["filename"] for save in since] == ["new.json"]
+
+
+def test_deleted_saves_leave_the_manifest(tmp_path):
+    save_dir = str(tmp_path)
+    for filename in ("a.json", "b.json", "c.json"):
+        save_system.record_save(filename, _write_save(save_dir, filename, "Ara", 1, 0), save_dir)
+
+    save_system.delete_save("a.json", save_dir)
+    os.remove(os.path.join(save_dir, "b.json"))
+    assert [save["filename"] for save in save_system.list_saves(save_dir)] == ["c.json"]
+    with open(os.path.join(save_dir, save_system.MANIFEST_FILE)) as f:
+        assert list(json.load(f)["saves"]) == ["c.json"]
+
+
+def test_game_saves_are_recorded_as_they_are_written(new_game):
+    game = new_game()
+    game.create_character("Ara", "Mage")
+    game.save_game("hero")
+    game.save_game("hero", binary=True)
+
+    saves = {save["filename"]: save for save in save_system.list_saves(game.save_dir)}
+    assert set(saves) == {"hero.json", "hero.rpgs"}
+    assert saves["hero.rpgs"]["format"] == "binary" and saves["hero.rpgs"]["character"] == "Ara"
+    assert saves["hero.json"]["size"] == os.path.getsize(os.path.join(game.save_dir, "hero.json"))
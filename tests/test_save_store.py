@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from game import RPGGame, GroqEngine
+from save_journal import apply_ops
+from save_store import SaveStore, state_to_ops
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SaveStore(str(tmp_path / "saves.db"))
+    yield store
+    store.close()
+
+
+def _played_game(new_game):
+    game = new_game()
+    game.create_character("Ara", "Warrior")
+    for n in range(5):
+        game.update_session_memory(f"action {n}", "ok")
+    game.add_important_event("quest", "Took the lighthouse job", "Town", 7)
+    game.add_important_event("combat", "Fought a rat", "Docks", 3)
+    return game
+
+
+def _saved(game):
+    return json.loads(json.dumps(game._build_save_data(), default=str))
+
+
+def test_apply_after_state_to_ops_round_trips_load(new_game, store):
+    state = _saved(_played_game(new_game))
+    store.apply("hero", state_to_ops(state))
+    assert store.load("hero", max_actions=1000) == state
+
+    store.write_state("hero", state)
+    assert store.load("hero", max_actions=1000) == state
+    assert store.load("hero", sections=("player",)) == {"player": state["player"]}
+
+
+def test_journal_ops_update_only_what_changed(new_game, store):
+    game = _played_game(new_game)
+    state = _saved(game)
+    store.write_state("hero", state)
+
+    marks = game._current_journal_marks()
+    game.update_session_memory("open the door", "It creaks open.")
+    game.current_player.hit_points -= 4
+    game.add_important_event("discovery", "Found a cellar", "Town", 9)
+    ops = json.loads(json.dumps(game._journal_ops(marks), default=str))
+    store.apply("hero", ops)
+    apply_ops(state, ops)
+
+    assert store.load("hero", max_actions=1000) == state
+    assert store.events("hero", location="Town")[0]["description"] == "Found a cellar"
+    assert store.history("hero", limit=1)[0]["action"] == "open the door"
+
+
+def test_store_saves_load_back_into_a_game(game_state, tmp_path):
+    engine = GroqEngine()
+    store = SaveStore(str(tmp_path / "game.db"))
+    try:
+        game = RPGGame(engine, save_dir=str(tmp_path / "saves"), store=store)
+        game.create_character("Ara", "Warrior")
+        game.save_game("hero")
+        # The second save only writes the rows that changed
+        game.update_session_memory("open the door", "It creaks open.")
+        game.current_player.hit_points -= 4
+        game.save_game("hero")
+
+        loaded = RPGGame(engine, save_dir=str(tmp_path / "saves"), store=store)
+        assert loaded.load_game("hero").startswith("Game loaded successfully")
+        assert game_state(loaded) == game_state(game)
+        assert [session["name"] for session in store.list_sessions("ara")] == ["hero"]
+    finally:
+        store.close()
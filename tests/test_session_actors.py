@@ -0,0 +1,114 @@
+import time
+import threading
+
+import pytest
+
+from game import RPGGame, GroqEngine
+from session_actors import SessionActors, waiting_on_io
+from session_registry import SessionRegistry
+
+SESSIONS = 8
+THREADS = 16
+UPDATES = 200
+
+
+@pytest.fixture
+def registry(tmp_path):
+    engine = GroqEngine()
+    registry = SessionRegistry(lambda session_id: RPGGame(engine, save_dir=str(tmp_path / session_id)))
+    yield registry
+    registry.close()
+
+
+def _session_ids(registry):
+    session_ids = [f"stress-session-{n:04d}" for n in range(SESSIONS)]
+    for session_id in session_ids:
+        with registry.session(session_id) as game:
+            game.create_character(f"Tester {session_id[-4:]}", "Warrior")
+            game.current_player.hit_points = 0
+            game.stress_order = []
+    return session_ids
+
+
+def _update(game, thread, n):
+    # Read, yield to other threads, write: loses updates unless serialized
+    value = game.current_player.hit_points
+    time.sleep(0)
+    game.current_player.hit_points = value + 1
+    game.stress_order.append((thread, n))
+
+
+def test_no_lost_updates_under_concurrent_submits(registry):
+    session_ids = _session_ids(registry)
+    actors = SessionActors(registry)
+
+    def submit_all(thread):
+        futures = [actors.submit(session_ids[(thread + n) % SESSIONS], _update, thread, n) for n in range(UPDATES)]
+        for future in futures:
+            future.result()
+
+    workers = [threading.Thread(target=submit_all, args=(thread,)) for thread in range(THREADS)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    actors.shutdown()
+
+    total = 0
+    for session_id in session_ids:
+        with registry.session(session_id) as game:
+            total += game.current_player.hit_points
+            for thread in range(THREADS):
+                mine = [n for t, n in game.stress_order if t == thread]
+                assert mine == sorted(mine), f"{session_id}: updates of thread {thread} out of order"
+    assert total == THREADS * UPDATES
+    assert actors.pending() == 0
+
+
+def test_tasks_after_shutdown_are_cancelled(registry):
+    actors = SessionActors(registry)
+    actors.shutdown()
+    future = actors.submit("stress-session-0000", _update, 0, 0)
+    assert future.cancelled()
+    assert actors.pending() == 0
+
+
+def _wait_on_io(game, started, finish):
+    with waiting_on_io():
+        started.set()
+        assert finish.wait(5)
+    return "slow done"
+
+
+def test_reads_run_while_the_session_waits_on_io(registry):
+    session_id = _session_ids(registry)[0]
+    actors = SessionActors(registry)
+    started, finish = threading.Event(), threading.Event()
+    slow = actors.submit(session_id, _wait_on_io, started, finish, slow=True)
+    assert started.wait(5)
+
+    read = actors.submit(session_id, lambda game: game.current_player.name, read_only=True)
+    write = actors.submit(session_id, _update, 0, 0)
+    assert read.result(timeout=5).startswith("Tester")
+    # Writes still wait their turn
+    assert not write.done()
+
+    finish.set()
+    assert slow.result(timeout=5) == "slow done"
+    write.result(timeout=5)
+    actors.shutdown()
+
+
+def test_slow_tasks_do_not_hold_up_other_sessions(registry):
+    first, second = _session_ids(registry)[:2]
+    actors = SessionActors(registry, max_workers=1, max_slow_workers=1)
+    release = threading.Event()
+    blocked = actors.submit(first, lambda game: release.wait(5), slow=True)
+
+    quick = actors.submit(second, _update, 0, 0)
+    quick.result(timeout=5)
+    assert not blocked.done()
+
+    release.set()
+    assert blocked.result(timeout=5)
+    actors.shutdown()
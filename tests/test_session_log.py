@@ -0,0 +1,51 @@
+import os
+
+from game import RPGGame, GroqEngine, HISTORY_WINDOW
+from session_log import ActionLog
+
+
+def test_window_keeps_only_the_latest_entries():
+    log = ActionLog(maxlen=3)
+    for n in range(10):
+        log.append(f"action {n}", f"response {n}", "Town")
+
+    assert len(log) == 3 and log.total == 10
+    assert [entry["action"] for entry in log] == ["action 7", "action 8", "action 9"]
+    assert [entry["action"] for entry in log[-2:]] == ["action 8", "action 9"]
+    assert log.last()["response"] == "response 9"
+    assert set(log[0]) == {"timestamp", "action", "response", "location"}
+
+
+def test_spilled_entries_are_replayed_in_order(tmp_path):
+    path = str(tmp_path / "history" / "session_history.jsonl")
+    log = ActionLog(maxlen=2, spill_path=path)
+    for n in range(5):
+        log.append(f"action {n}", "ok", "Town")
+
+    assert [entry["action"] for entry in log.read_all()] == [f"action {n}" for n in range(5)]
+    log.close(spill_window=True)
+    assert len(log) == 0
+
+    # A log reopened on the same file carries on where the last one stopped
+    reopened = ActionLog(maxlen=2, spill_path=path)
+    reopened.append("action 5", "ok", "Town")
+    assert [entry["action"] for entry in reopened.read_all()] == [f"action {n}" for n in range(6)]
+    reopened.close()
+
+
+def test_from_entries_round_trips_saved_actions():
+    log = ActionLog(maxlen=4)
+    log.append("look", "A quiet street.", "Town")
+    restored = ActionLog.from_entries(log.to_list(), maxlen=4)
+    assert restored.to_list() == log.to_list()
+
+
+def test_starting_over_deletes_the_spill_file(tmp_path):
+    game = RPGGame(GroqEngine(), save_dir=str(tmp_path))
+    for n in range(HISTORY_WINDOW + 5):
+        game.session_history.append(f"action {n}", "ok", "Town")
+    spill = game._history_spill_path()
+    assert os.path.exists(spill)
+
+    game.reset_game_state()
+    assert not os.path.exists(os.path.dirname(spill))
@@ -0,0 +1,86 @@
+import os
+import time
+
+import pytest
+
+from game import RPGGame, GroqEngine
+from session_registry import EVICTED_SAVE, SessionRegistry, is_valid_session_id, new_session_id
+
+
+@pytest.fixture
+def sessions_dir(tmp_path):
+    return str(tmp_path / "sessions")
+
+
+def _registry(sessions_dir, **kwargs):
+    engine = GroqEngine()
+    return SessionRegistry(lambda session_id: RPGGame(engine, save_dir=os.path.join(sessions_dir, session_id)),
+                           sessions_dir=sessions_dir, idle_seconds=None, **kwargs)
+
+
+def _play(registry, session_id, actions=3):
+    with registry.session(session_id) as game:
+        if not game.current_player:
+            game.create_character(f"Hero {session_id[:4]}", "Warrior")
+        for n in range(actions):
+            game.update_session_memory(f"action {n}", "ok")
+        game.add_important_event("quest", f"Quest of {session_id[:4]}", "Town", 7)
+
+
+def test_evicted_sessions_come_back_as_they_were(sessions_dir, game_state):
+    registry = _registry(sessions_dir)
+    session_id = new_session_id()
+    assert is_valid_session_id(session_id) and not is_valid_session_id("../etc")
+    _play(registry, session_id)
+    with registry.session(session_id) as game:
+        before = game_state(game)
+        history = [entry["action"] for entry in game.session_history.read_all()]
+
+    assert registry.evict(force=True) == 1 and len(registry) == 0
+    assert os.path.exists(os.path.join(sessions_dir, session_id, EVICTED_SAVE))
+    with registry.session(session_id) as game:
+        assert game_state(game) == before
+        game.update_session_memory("after the restore", "ok")
+        # The restored game carries on the same transcript
+        assert [entry["action"] for entry in game.session_history.read_all()] == history + ["after the restore"]
+    registry.close()
+
+
+def test_least_recently_used_sessions_are_evicted_first(sessions_dir):
+    registry = _registry(sessions_dir, max_sessions=2)
+    first, second, third = (new_session_id() for _ in range(3))
+    _play(registry, first)
+    _play(registry, second)
+    _play(registry, first)
+    _play(registry, third)
+
+    assert {game.current_player.name for game in registry.games()} == {f"Hero {first[:4]}", f"Hero {third[:4]}"}
+    with registry.session(second) as game:
+        assert game.current_player.name == f"Hero {second[:4]}"
+    registry.close()
+
+
+def test_sessions_that_never_played_leave_nothing_behind(sessions_dir):
+    registry = _registry(sessions_dir)
+    with registry.session(new_session_id()) as game:
+        assert game.current_player is None
+    registry.close()
+    assert os.listdir(sessions_dir) == []
+
+
+def test_admit_refuses_new_sessions_when_full(sessions_dir):
+    registry = _registry(sessions_dir, max_stored_sessions=2, stored_seconds=3600)
+    stored = [new_session_id() for _ in range(2)]
+    for session_id in stored:
+        _play(registry, session_id)
+    registry.close()
+
+    newcomer = new_session_id()
+    assert registry.admit(stored[0])
+    assert not registry.admit(newcomer)
+
+    # Once a stored session has gone unused long enough it makes room
+    old = time.time() - 7200
+    os.utime(os.path.join(sessions_dir, stored[1]), (old, old))
+    assert registry.admit(newcomer)
+    assert sorted(os.listdir(sessions_dir)) == [stored[0]]
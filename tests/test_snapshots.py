@@ -0,0 +1,81 @@
+import pytest
+
+from snapshots import PersistentLog, PersistentMap, branch_key
+
+
+def test_persistent_containers_leave_older_versions_alone():
+    first = PersistentLog(range(100))
+    second = first.extend(range(100, 150))
+    assert list(first) == list(range(100)) and list(second) == list(range(150))
+    assert list(second.iter_from(140)) == list(range(140, 150))
+    assert second.common_prefix(first) == 100
+
+    before = PersistentMap({f"npc {n}": n for n in range(200)})
+    after = before.set("npc 5", "changed").delete("npc 6").set("npc new", 1)
+    assert before.get("npc 5") == 5 and "npc 6" in before and len(before) == 200
+    assert after.get("npc 5") == "changed" and "npc 6" not in after and len(after) == 200
+    assert sorted(after.changed_keys(before)) == ["npc 5", "npc 6", "npc new"]
+
+
+def _play_turn(game, n):
+    """One turn's worth of changes, checkpointed the way process_input does."""
+    game.timeline.checkpoint()
+    game.update_session_memory(f"action {n}", f"response {n}")
+    game.current_player.hit_points -= 1
+    game.add_important_event("quest", f"Event {n}", game.current_player.current_location, n % 10 + 1)
+
+
+@pytest.fixture
+def game(new_game):
+    game = new_game()
+    game.create_character("Ara", "Warrior")
+    return game
+
+
+def test_undo_restores_each_earlier_turn(game, game_state):
+    states, indexes = [], []
+    for n in range(6):
+        states.append(game_state(game))
+        indexes.append(game.memory_index.entries())
+        _play_turn(game, n)
+
+    assert game.timeline.undo(2) == 2
+    assert game_state(game) == states[4] and game.memory_index.entries() == indexes[4]
+    assert game.timeline.undo(3) == 3
+    assert game_state(game) == states[1] and game.memory_index.entries() == indexes[1]
+    assert game.process_input("undo 100").startswith("Undid 1 turn.")
+    assert game_state(game) == states[0]
+    assert game.process_input("undo") == "Nothing to undo."
+
+
+def test_checkout_returns_to_a_branch(game, game_state):
+    _play_turn(game, 0)
+    game.process_input("branch Before The Vault")
+    marked = game_state(game)
+    for n in range(1, 4):
+        _play_turn(game, n)
+    game.timeline.branch("ahead")
+    ahead = game_state(game)
+
+    assert game.process_input("switch before the vault").startswith("Switched to 'before the vault'")
+    assert game_state(game) == marked
+    _play_turn(game, 99)
+    game.timeline.checkout("AHEAD")
+    assert game_state(game) == ahead
+    assert branch_key("  Before The Vault ") == branch_key("before the vault")
+    with pytest.raises(KeyError):
+        game.timeline.checkout("nowhere")
+
+
+def test_undo_after_a_load_returns_to_the_save(game, new_game, game_state):
+    for n in range(3):
+        _play_turn(game, n)
+    game.save_game("hero", binary=True)
+
+    loaded = new_game()
+    loaded.load_game("hero")
+    saved = game_state(loaded)
+    for n in range(3, 6):
+        _play_turn(loaded, n)
+    assert loaded.timeline.undo(10) == 3
+    assert game_state(loaded) == saved
@@ -0,0 +1,48 @@
+import summaries
+from summaries import SummaryTree
+
+
+def test_summarizer_input_and_every_level_stay_bounded():
+    inputs = []
+
+    def summarize(text, instructions, max_tokens):
+        inputs.append(text)
+        return text[:max_tokens * 4]
+
+    tree = SummaryTree(summarize)
+    for day in range(1, 41):
+        for scene in range(15):
+            tree.add_scene(f"Day {day} scene {scene}: the party argued about the map. " * 8, day,
+                           region=f"Region {scene % 3}")
+
+    assert max(map(len, inputs)) <= summaries.MAX_INPUT_CHARS
+    assert len(tree.synopsis) <= summaries.SYNOPSIS_CHARS
+    # Closed days are capped; the day still running comes on top
+    assert len(tree.days) == summaries.MAX_DAYS + 1 and 1 not in tree.days
+    assert all(len(text) <= summaries.DAY_CHARS for text in tree.days.values())
+    assert all(len(text) <= summaries.REGION_CHARS for text in tree.regions.values())
+    assert len(tree.for_prompt("day", limit=800)) <= 800
+
+
+def test_a_failing_summarizer_keeps_the_latest_text():
+    def summarize(text, instructions, max_tokens):
+        raise RuntimeError("rate limited")
+
+    tree = SummaryTree(summarize)
+    tree.add_scene("Met Mira at the inn.", 1, "Town")
+    tree.add_scene("Found the silver key.", 2, "Crypt")
+
+    assert "Met Mira at the inn." in tree.synopsis
+    assert tree.for_prompt("region", region="Crypt").endswith("Found the silver key.")
+    assert tree.for_prompt("scene") == "Met Mira at the inn.\nFound the silver key."
+
+
+def test_round_trips_through_a_dict():
+    tree = SummaryTree()
+    for day, region in ((1, "Town"), (1, "Forest"), (2, "Town")):
+        tree.add_scene(f"Something happened in {region} on day {day}.", day, region, summarize=False)
+
+    restored = SummaryTree.from_dict(tree.to_dict())
+    assert restored.to_dict() == tree.to_dict()
+    assert restored.for_prompt("day") == tree.for_prompt("day")
+    assert SummaryTree.from_text("An old flat summary.").synopsis == "An old flat summary."